@@ -0,0 +1,35 @@
+"""Runs the benchmark suite and writes the results as JSON.
+
+Run from the repository root:
+
+    python -m benchmarks [--quick] [--output results.json] [--filter NAME]
+"""
+
+import argparse
+
+from . import bench_imports, bench_parsing, bench_workflows
+from .harness import write_report
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller inputs and fewer runs')
+    parser.add_argument('--output', default='bench_output.json',
+                        help='where to write the JSON report')
+    parser.add_argument('--filter', default='',
+                        help='only run benchmarks whose name contains this')
+    args = parser.parse_args()
+
+    results = []
+    for bench in (bench_imports.BENCHMARKS + bench_parsing.BENCHMARKS
+                  + bench_workflows.BENCHMARKS):
+        if args.filter not in bench.__name__:
+            continue
+        for result in bench(args.quick):
+            print(result, flush=True)
+            results.append(result)
+    write_report(args.output, results)
+    print(f'Wrote {len(results)} results to {args.output}')
+
+if __name__ == '__main__':
+    main()
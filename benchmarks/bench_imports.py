@@ -0,0 +1,34 @@
+"""Import-time benchmarks. Each run imports the package in a fresh
+interpreter, so the numbers include interpreter startup; the 'python'
+baseline shows how much of that is the package's own.
+"""
+
+import os
+import subprocess
+import sys
+from typing import List
+
+from .harness import Result, measure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = (
+    ('python', 'pass'),
+    ('import_package', 'import gradescope'),
+    ('import_term', 'from gradescope import Term'),
+    ('import_models', 'from gradescope import Assignment, Course, Member'),
+    ('import_client', 'from gradescope import Client'),
+)
+
+def _run(code: str) -> None:
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+def bench_imports(quick: bool) -> List[Result]:
+    runs = 5 if quick else 20
+    results = []
+    for name, code in CASES:
+        results.append(measure(f'startup_{name}',
+                               lambda code=code: _run(code), runs=runs))
+    return results
+
+BENCHMARKS = [bench_imports]
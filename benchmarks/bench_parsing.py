@@ -0,0 +1,177 @@
+"""Parser benchmarks over synthetic pages. No network is involved."""
+
+import gc
+from types import SimpleNamespace
+import tracemalloc
+from typing import Any, Callable, List
+
+import lxml.html
+
+from gradescope import Course, Term, xpaths
+from gradescope.assignment import Assignment
+from gradescope.client import _parse_course_list
+from gradescope.identity import IdentityMap
+from gradescope.member import _parse_roster_row
+from gradescope.response import Response
+from gradescope.roster import Roster
+
+from tests import fixtures
+
+from .harness import Result, measure
+
+# Stands in for the client of objects that parse pages but never send
+# requests. Parsed data is written through to the client's metadata store,
+# if it has one, and parsed objects are looked up in its identity map.
+_OFFLINE_CLIENT: Any = SimpleNamespace(_store=None, _identities=IdentityMap())
+
+def bench_course_list(quick: bool) -> List[Result]:
+    results = []
+    for courses, terms in ((20, 4), (200, 40)) if not quick else ((20, 4),):
+        site = fixtures.generate_site(courses=courses, terms=terms, members=0,
+                                      assignments=0,
+                                      student_courses=courses // 4)
+        page = fixtures.render_home(site).encode('utf-8')
+        def run() -> None:
+            parsed = _parse_course_list(_OFFLINE_CLIENT, lxml.html.fromstring(page))
+            assert len(parsed) == courses
+        results.append(measure('fetch_course_list', run,
+                               runs=5 if quick else 20, items=courses,
+                               courses=courses, terms=terms))
+    return results
+
+def bench_roster(quick: bool) -> List[Result]:
+    results = []
+    sizes = (100, 1000) if quick else (100, 1000, 10000, 50000)
+    for members in sizes:
+        site = fixtures.generate_site(courses=1, members=members,
+                                      assignments=0, student_courses=0)
+        page = fixtures.render_roster(site, site.courses[0]).encode('utf-8')
+        course = Course(100, _OFFLINE_CLIENT)
+        def run() -> None:
+            course._members = None
+            course._apply_roster(lxml.html.fromstring(page))
+        results.append(measure('read_roster', run,
+                               runs=3 if members >= 10000 or quick else 10,
+                               items=members, members=members,
+                               page_bytes=len(page)))
+    return results
+
+def bench_assignments(quick: bool) -> List[Result]:
+    results = []
+    for assignments in (50, 500):
+        site = fixtures.generate_site(courses=1, members=0,
+                                      assignments=assignments,
+                                      student_courses=0)
+        page = fixtures.render_assignments(site,
+                                           site.courses[0]).encode('utf-8')
+        course = Course(100, _OFFLINE_CLIENT)
+        def run() -> None:
+            course._assignments = None
+            course._apply_assignments(lxml.html.fromstring(page))
+        results.append(measure('get_assignments', run,
+                               runs=5 if quick else 20, items=assignments,
+                               assignments=assignments))
+    return results
+
+def bench_settings(quick: bool) -> List[Result]:
+    site = fixtures.generate_site(courses=1, members=0, assignments=5,
+                                  student_courses=0)
+    course = site.courses[0]
+    pages = [(synthetic.id,
+              fixtures.render_assignment_edit(site, course,
+                                              synthetic).encode('utf-8'))
+             for synthetic in course.assignments]
+    gs_course = Course(course.id, _OFFLINE_CLIENT)
+    def run() -> None:
+        for assignment_id, page in pages:
+            assignment = Assignment(assignment_id, _OFFLINE_CLIENT,
+                                    gs_course)
+            assignment._apply_settings(lxml.html.fromstring(page))
+    return [measure('read_settings', run, runs=20 if quick else 200,
+                    items=len(pages), types=len(pages))]
+
+def _retained_bytes(build: Callable[[], Any]) -> int:
+    """Returns the memory still allocated by what build returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+def bench_roster_memory(quick: bool) -> List[Result]:
+    """Compares the memory held by a roster as Member objects and as a
+    columnar Roster.
+    """
+    results = []
+    members = 10000 if quick else 100000
+    site = fixtures.generate_site(courses=1, members=members, assignments=0,
+                                  student_courses=0)
+    page = fixtures.render_roster(site, site.courses[0]).encode('utf-8')
+    course = Course(100, _OFFLINE_CLIENT)
+
+    def build_members() -> Any:
+        course._members = None
+        course._apply_roster(lxml.html.fromstring(page))
+        members, course._members = course._members, None
+        return members
+
+    def build_roster() -> Any:
+        roster = Roster(course)
+        for row in xpaths.ROSTER_ROWS(lxml.html.fromstring(page)):
+            roster.append(_parse_roster_row(row))
+        return roster
+
+    for name, build in (('members', build_members),
+                        ('columnar', build_roster)):
+        result = measure(f'roster_memory_{name}', build, runs=1,
+                         items=members, members=members)
+        size = _retained_bytes(build)
+        result.extra['retained_bytes'] = size
+        result.extra['bytes_per_member'] = round(size / members, 1)
+        results.append(result)
+    return results
+
+def bench_decode(quick: bool) -> List[Result]:
+    """Compares parsing a roster page after decoding it to a str, as
+    responses used to, with handing lxml the raw bytes.
+    """
+    results = []
+    sizes = (1000,) if quick else (1000, 10000)
+    for members in sizes:
+        site = fixtures.generate_site(courses=1, members=members,
+                                      assignments=0, student_courses=0)
+        page = fixtures.render_roster(site, site.courses[0]).encode('utf-8')
+        headers = { 'Content-Type': 'text/html; charset=utf-8' }
+        def parse_text() -> None:
+            lxml.html.fromstring(page.decode('utf-8'))
+        def parse_bytes() -> None:
+            Response(200, headers, '', page, 'utf-8').html
+        for name, run in (('parse_text', parse_text),
+                          ('parse_bytes', parse_bytes)):
+            results.append(measure(name, run, runs=3 if quick else 10,
+                                   items=members, members=members,
+                                   page_bytes=len(page)))
+    return results
+
+def bench_term_parse(quick: bool) -> List[Result]:
+    strings = ['Fall 2020', 'spring2021', 'SUMMER   2019', 'Winter 2022'] * 2500
+    def run() -> None:
+        for s in strings:
+            Term.parse(s)
+    return [measure('term_parse', run, runs=3 if quick else 10,
+                    items=len(strings))]
+
+BENCHMARKS = [
+    bench_course_list,
+    bench_roster,
+    bench_roster_memory,
+    bench_assignments,
+    bench_settings,
+    bench_decode,
+    bench_term_parse,
+]
@@ -0,0 +1,115 @@
+"""End-to-end benchmarks against the local stand-in server."""
+
+from typing import List
+
+from gradescope import Client, RequestScheduler
+
+from tests import fixtures
+from tests.server import StandInServer
+
+from .harness import Result, measure
+
+# Simulated server latency per request, in seconds.
+LATENCY = 0.01
+
+def _hydrate_sequential(client: Client) -> None:
+    for course in client.fetch_course_list():
+        course.get_description(force_update=True)
+        if course.is_instructor:
+            course.get_members(force=True)
+            for assignment in course.get_assignments(force_update=True):
+                assignment._read_settings()
+
+def _hydrate_bulk(client: Client) -> None:
+    course_ids = [course.id for course in client.fetch_course_list()]
+    for course in client.fetch_courses_bulk(course_ids):
+        if course.is_instructor:
+            for _ in course.hydrate_all():
+                pass
+
+def bench_hydrate_all(quick: bool) -> List[Result]:
+    results = []
+    courses = 4 if quick else 10
+    site = fixtures.generate_site(courses=courses, members=200,
+                                  assignments=10, terms=2)
+    with StandInServer(site) as server:
+        server.delay = LATENCY
+        for name, hydrate in (('hydrate_all_sequential', _hydrate_sequential),
+                              ('hydrate_all_bulk', _hydrate_bulk)):
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=server.adapter(pool_maxsize=16),
+                        scheduler=RequestScheduler(max_per_host=16)) \
+                    as client:
+                server.reset_requests()
+                result = measure(name, lambda: hydrate(client),
+                                 runs=1 if quick else 3, courses=courses,
+                                 latency_ms=LATENCY * 1e3)
+                result.extra['requests_per_run'] = \
+                        len(server.requests) // result.runs
+                results.append(result)
+    return results
+
+def bench_fetch_course(quick: bool) -> List[Result]:
+    """Looks up every course by ID, reading the home page for each lookup
+    and from the course index.
+    """
+    results = []
+    courses = 50 if quick else 200
+    site = fixtures.generate_site(courses=courses, members=0, assignments=0,
+                                  terms=courses // 5)
+    course_ids = [course.id for course in site.courses]
+    with StandInServer(site) as server:
+        server.delay = LATENCY
+        for name, max_age in (('fetch_course_uncached', 0.0),
+                              ('fetch_course_indexed', 300.0)):
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=server.adapter(),
+                        course_index_max_age=max_age) as client:
+                def run() -> None:
+                    client._course_index.invalidate()
+                    for course_id in course_ids:
+                        assert client.fetch_course(course_id) is not None
+                server.reset_requests()
+                result = measure(name, run, runs=1 if quick else 3,
+                                 items=courses, courses=courses,
+                                 latency_ms=LATENCY * 1e3)
+                result.extra['requests_per_run'] = \
+                        len(server.requests) // result.runs
+                results.append(result)
+    return results
+
+def bench_transfer(quick: bool) -> List[Result]:
+    """Reads a large roster with and without compressed transfer, reporting
+    the bytes sent over the wire.
+    """
+    results = []
+    members = 2000 if quick else 20000
+    site = fixtures.generate_site(courses=1, members=members, assignments=0,
+                                  student_courses=0)
+    with StandInServer(site) as server:
+        server.delay = LATENCY
+        server.compress = True
+        for name, compress in (('transfer_identity', False),
+                               ('transfer_compressed', True)):
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=server.adapter(), compress=compress) \
+                    as client:
+                course = client.fetch_course(100)
+                assert course is not None
+                with client.profile() as metrics:
+                    result = measure(
+                            name, lambda: course.get_members(force=True),
+                            runs=1 if quick else 3, items=members,
+                            members=members, latency_ms=LATENCY * 1e3)
+                roster = metrics.endpoints['COURSE_MEMBERSHIP']
+                result.extra['body_bytes'] = \
+                        int(roster.bytes.sum) // result.runs
+                result.extra['wire_bytes'] = roster.wire_bytes // result.runs
+                results.append(result)
+    return results
+
+BENCHMARKS = [
+    bench_hydrate_all,
+    bench_fetch_course,
+    bench_transfer,
+]
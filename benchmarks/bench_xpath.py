@@ -0,0 +1,57 @@
+"""Microbenchmark of per-row roster parsing with inline XPath strings versus
+the precompiled expressions in gradescope.xpaths.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_xpath [--rows N] [--repeat N]
+"""
+
+import argparse
+import json
+import timeit
+
+import lxml.html
+
+from gradescope import xpaths
+from gradescope.member import Member, _parse_roster_row
+
+from tests import fixtures
+
+def parse_row_inline(row: lxml.html.HtmlElement) -> tuple:
+    """Parses a roster row the way the parsers did before gradescope.xpaths,
+    compiling every expression on each call.
+    """
+    elems = row.xpath('.//td')
+    edit_elem = row.xpath('.//*[@data-id]')[0]
+    cm_data = json.loads(edit_elem.xpath('@data-cm')[0])
+    member_id = int(edit_elem.xpath('@data-id')[0])
+    email = edit_elem.xpath('@data-email')[0]
+    sid = int(cm_data['sid']) if cm_data['sid'] != '' else -1
+    role_str = elems[2].xpath('.//select//option[@selected="selected"]/text()')[0]
+    role = Member.Role[role_str.upper()]
+    canvas_connected = len(elems[4].xpath('.//*[@data-sort="1"]')) > 0
+    return (member_id, cm_data['full_name'], email, sid, role,
+            canvas_connected)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    site = fixtures.generate_site(courses=1, members=args.rows,
+                                  assignments=0, student_courses=0)
+    html = lxml.html.fromstring(fixtures.render_roster(site, site.courses[0]))
+    rows = xpaths.ROSTER_ROWS(html)
+    assert [parse_row_inline(row) for row in rows] \
+            == [tuple(_parse_roster_row(row)) for row in rows]
+
+    for label, parse in (('inline', parse_row_inline),
+                         ('precompiled', _parse_roster_row)):
+        best = min(timeit.repeat(lambda: [parse(row) for row in rows],
+                                 number=1, repeat=args.repeat))
+        print(f'{label:>12}: {best / len(rows) * 1e6:8.2f} us/row '
+              f'({len(rows)} rows, best of {args.repeat})')
+
+if __name__ == '__main__':
+    main()
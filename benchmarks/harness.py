@@ -0,0 +1,76 @@
+"""Timing and reporting helpers shared by the benchmark modules."""
+
+from dataclasses import asdict, dataclass, field
+import json
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import lxml.etree
+
+@dataclass
+class Result:
+    name: str
+    params: Dict[str, Any]
+    runs: int
+    best_s: float
+    mean_s: float
+    stdev_s: float
+    items: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def per_item_us(self) -> Optional[float]:
+        if not self.items:
+            return None
+        return self.best_s / self.items * 1e6
+
+    def to_json(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['per_item_us'] = self.per_item_us
+        return data
+
+    def __str__(self) -> str:
+        params = ','.join(f'{k}={v}' for k, v in self.params.items())
+        line = (f'{self.name}[{params}]: best {self.best_s * 1e3:.2f} ms, '
+                f'mean {self.mean_s * 1e3:.2f} ms over {self.runs} runs')
+        if self.per_item_us is not None:
+            line += f', {self.per_item_us:.2f} us/item'
+        for key, value in self.extra.items():
+            line += f', {key}={value}'
+        return line
+
+def measure(name: str, func: Callable[[], Any], *, runs: int,
+            items: Optional[int]=None, setup: Optional[Callable[[], Any]]=None,
+            **params: Any) -> Result:
+    """Times func over several runs. setup, if given, runs untimed before
+    each run.
+    """
+    times: List[float] = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return Result(name=name, params=params, runs=runs, best_s=min(times),
+                  mean_s=statistics.mean(times),
+                  stdev_s=statistics.stdev(times) if runs > 1 else 0.0,
+                  items=items)
+
+def environment() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'lxml': '.'.join(map(str, lxml.etree.LXML_VERSION)),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+def write_report(path: str, results: List[Result]) -> None:
+    with open(path, 'w') as f:
+        json.dump({ 'environment': environment(),
+                    'results': [result.to_json() for result in results] },
+                  f, indent=2)
+        f.write('\n')
@@ -1,6 +1,61 @@
-from .assignment import Assignment
-from .client import Client
-from .course import Course
+# Public names are imported lazily, on first access, so that importing the
+# package (e.g. for Term or the enums) does not import requests, lxml or
+# aiohttp. Those load when a Client is created or a page is parsed.
+
+import importlib
+from typing import Any, TYPE_CHECKING
+
 from .error import *
-from .member import Member
-from .term import Term
+
+# Public names to the submodules defining them.
+_EXPORTS = {
+    'Assignment': 'assignment',
+    'AsyncClient': 'async_client',
+    'ResponseCache': 'cache',
+    'Client': 'client',
+    'ConnectionStats': 'connection',
+    'Course': 'course',
+    'Member': 'member',
+    'MetricsAggregator': 'metrics',
+    'ParseEvent': 'metrics',
+    'RequestEvent': 'metrics',
+    'Roster': 'roster',
+    'RosterChange': 'roster',
+    'RosterChangeResult': 'roster',
+    'RequestScheduler': 'scheduler',
+    'FileSessionStore': 'session_store',
+    'SessionStore': 'session_store',
+    'MetadataStore': 'store',
+    'SyncResult': 'sync',
+    'Term': 'term',
+}
+
+__all__ = ['GSInternalException', 'GSInvalidRequestException',
+           'GSNotAuthorizedException', *_EXPORTS]
+
+if TYPE_CHECKING:
+    from .assignment import Assignment
+    from .async_client import AsyncClient
+    from .cache import ResponseCache
+    from .client import Client
+    from .connection import ConnectionStats
+    from .course import Course
+    from .member import Member
+    from .metrics import MetricsAggregator, ParseEvent, RequestEvent
+    from .roster import Roster, RosterChange, RosterChangeResult
+    from .scheduler import RequestScheduler
+    from .session_store import FileSessionStore, SessionStore
+    from .store import MetadataStore
+    from .sync import SyncResult
+    from .term import Term
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> Any:
+    return sorted(set(globals()) | set(_EXPORTS))
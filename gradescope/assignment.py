@@ -5,13 +5,14 @@ import enum
 import functools
 from typing import Optional, TYPE_CHECKING
 
-import lxml.html
-
-from . import endpoints
+from . import endpoints, xpaths
 from .error import GSInternalException, GSNotAuthorizedException
+from .protocol import ClientProtocol, page_loader
+from .slots import with_slots
 
 if TYPE_CHECKING:
-    from .client import Client
+    import lxml.html
+
     from .course import Course
 
 # TODO I have no idea how to statically type this.
@@ -24,6 +25,7 @@ def _require_instructor(func):
         return func(*args, **kwargs)
     return wrapper
 
+@with_slots
 @dataclass
 class Assignment:
     class Type(enum.Enum):
@@ -39,7 +41,7 @@ class Assignment:
         ONLINE = enum.auto()
 
     id: int
-    _client: Client = field(repr=False, hash=False, compare=False)
+    _client: ClientProtocol = field(repr=False, hash=False, compare=False)
     _course: Course = field(repr=False, hash=False, compare=False)
 
     _name: Optional[str] = field(default=None, repr=False, hash=False,
@@ -56,6 +58,8 @@ class Assignment:
         :returns: The assignment name.
         :rtype: str
         """
+        if self._name is None and not force:
+            self._load_stored_settings()
         if self._name is None or force:
             self._read_settings()
             assert self._name is not None, 'Error getting name from settings'
@@ -67,23 +71,41 @@ class Assignment:
         :returns: The assignment type.
         :rtype: Assignment.Type
         """
+        if self._type is None:
+            self._load_stored_settings()
         if self._type is None:
             self._read_settings()
             assert self._type is not None, 'Error getting type from settings'
         return self._type
 
+    def _load_stored_settings(self) -> None:
+        """Sets locally cached variables from the client's metadata store, if
+        it has fresh data.
+        """
+        store = self._client._store
+        if store is not None:
+            store.load_assignment(self)
+
     def _read_settings(self) -> None:
         """Sets locally cached variables based on information available in the
         settings page.
         """
         # Fetch settings.
-        res = self._client._get(endpoints.ASSIGNMENT_EDIT.substitute(
-                                course_id=self._course.id,
-                                assignment_id=self.id))
-        html = lxml.html.fromstring(res.text)
+        client = page_loader(self._client, 'Reading the assignment settings',
+                             'read_settings(assignment)')
+        res = client._get(endpoints.ASSIGNMENT_EDIT.substitute(
+                          course_id=self._course.id,
+                          assignment_id=self.id))
+        self._apply_settings(res.html)
+
+    def _apply_settings(self, html: lxml.html.HtmlElement) -> None:
+        """Sets locally cached variables from a parsed settings page.
 
+        :param html: The parsed settings page.
+        :type html: lxml.html.HtmlElement
+        """
         # Read assignment name.
-        self._name = html.xpath('//input[@id="assignment_title"]/@value')[0]
+        self._name = xpaths.ASSIGNMENT_TITLE(html)[0]
 
         # Get type. Programming and online assignments are distinguished by the
         # data-controller attribute on the body of the settings page. The
@@ -91,20 +113,25 @@ class Assignment:
         # distinguish by seeing what hrefs are in the sidebar. Bubble sheets
         # have an href /bubble_sheet_answer_key. If not, exams have an href
         # /submission_batches. If not, it is a homework.
-        controller = html.xpath('//body/@data-controller')[0]
+        controller = xpaths.BODY_CONTROLLER(html)[0]
         if controller == 'programming_assignments':
             self._type = Assignment.Type.PROGRAMMING
         elif controller == 'online_assignments':
             self._type = Assignment.Type.ONLINE
         elif controller == 'pdf_assignments':
-            bubble_sheet_elems = html.xpath(f'//a[contains(@href,"/assignments/{self.id}/bubble_sheet_answer_key")]')
+            bubble_sheet_elems = xpaths.ASSIGNMENT_SIDEBAR_LINKS(
+                    html, id=str(self.id), page='bubble_sheet_answer_key')
             if len(bubble_sheet_elems) > 0:
                 self._type = Assignment.Type.BUBBLE_SHEET
             else:
-                exam_elems = html.xpath(f'//a[contains(@href,"/assignments/{self.id}/submission_batches")]')
+                exam_elems = xpaths.ASSIGNMENT_SIDEBAR_LINKS(
+                        html, id=str(self.id), page='submission_batches')
                 if len(exam_elems) > 0:
                     self._type = Assignment.Type.EXAM
                 else:
                     self._type = Assignment.Type.HOMEWORK
         else:
             raise GSInternalException('Unknown assignment controller type')
+
+        if self._client._store is not None:
+            self._client._store.save_assignment(self)
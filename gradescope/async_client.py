@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import asyncio
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError: # pragma: no cover
+    aiohttp = None # type: ignore
+
+from . import endpoints
+from .assignment import Assignment
+from .client import (_CourseEntry, _CourseIndex, _course_from_entry,
+                     _parse_course_index)
+from .course import Course
+from .error import GSInvalidRequestException
+from .identity import IdentityMap
+from .member import Member
+from .response import Response, accept_encoding
+
+if TYPE_CHECKING:
+    from .store import MetadataStore
+
+class AsyncClient:
+    """An asyncio Gradescope client. Page loads are awaitable, so many of them
+    can be gathered concurrently over one pooled set of connections.
+
+    The client must be entered with ``async with`` before use, which logs in.
+    The Course, Assignment and Member objects it returns are the same classes
+    the synchronous Client uses, and the parsing is shared with it. Their
+    cached getters work once populated, but anything that needs a page load
+    must go through the awaitable methods on this client instead; called
+    directly, it raises GSInvalidRequestException.
+
+    Requires the aiohttp package.
+    """
+
+    def __init__(self, username: str, password: str, *,
+                 max_connections: int=100,
+                 course_index_max_age: float=300.0,
+                 base_url: str=endpoints.BASE) -> None:
+        """Constructs an asyncio Gradescope client with the given credentials.
+        Logging in happens when the client is entered.
+
+        :param username: The username.
+        :type username: str
+        :param password: The password.
+        :type password: str
+        :param max_connections: The maximum number of simultaneously open
+        connections.
+        :type max_connections: int
+        :param course_index_max_age: Seconds for which fetch_course keeps the
+        course list read from the home page, as on Client.
+        :type course_index_max_age: float
+        :param base_url: The site to send requests to instead of Gradescope,
+        e.g. a local stand-in for testing. Page URLs are rewritten to it.
+        :type base_url: str
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncClient requires the aiohttp package')
+        self._username = username
+        self._password = password
+        self._max_connections = max_connections
+        self._base_url = base_url.rstrip('/')
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._csrf_token: Optional[str] = None
+        self._identities = IdentityMap()
+        self._course_index = _CourseIndex(course_index_max_age)
+        # The shared parsing writes through to a metadata store, which this
+        # client does not support.
+        self._store: Optional[MetadataStore] = None
+        # GETs that were answered by an identical GET already in flight.
+        self.coalesced_requests = 0
+        # Counts successful writes, so that a GET sent after a write does not
+        # share the response of one sent before it.
+        self._writes = 0
+        self._in_flight: Dict[Tuple[str, bool, int],
+                              asyncio.Future[Response]] = {}
+
+    async def _log_in(self, username: str, password: str) -> bool:
+        """Logs into Gradescope with the given credentials.
+
+        :param username: The username.
+        :type username: str
+        :param password: The password.
+        :type password: str
+        :returns: Whether the login was successful.
+        :rtype: bool
+        """
+        assert self._session is not None, 'Client has not been entered'
+
+        # This is likely the first request, so use a _get call to store a CSRF
+        # token.
+        await self._get(endpoints.LOGIN)
+        await self._post(endpoints.LOGIN, data={
+            'session[email]': username,
+            'session[password]': password
+        })
+
+        # Return whether 'signed_token' is now a cookie we have.
+        cookies = self._session.cookie_jar.filter_cookies(
+                URL(self._site_url(endpoints.BASE)))
+        return 'signed_token' in cookies
+
+    async def log_out(self) -> None:
+        """Logs out of Gradescope. Must be logged in to call this function."""
+        await self._get(endpoints.LOGOUT)
+
+    async def fetch_course_list(self) -> List[Course]:
+        """Fetches the list of courses the client is enrolled in or teaches.
+
+        :returns: A list of courses the client is enrolled in or teaches.
+        :rtype: list[Course]
+        """
+        index = await self._read_course_index(force_update=True)
+        return [_course_from_entry(self, entry)
+                for entry in index.values()]
+
+    async def fetch_course(self, course_id: int, *,
+                           force_update: bool=False) -> Optional[Course]:
+        """Fetches the course with the given ID. Returns None if not
+        accessible. As on Client, the home page is only read again once it is
+        older than course_index_max_age.
+
+        :param course_id: The ID of the course.
+        :type course_id: int
+        :param force_update: If True, read the home page again even if the
+        course list read from it is recent.
+        :type force_update: bool
+        :returns: The course, if found.
+        :rtype: Optional[Course]
+        """
+        entry = (await self._read_course_index(force_update)).get(course_id)
+        if entry is None:
+            return None
+        return _course_from_entry(self, entry)
+
+    async def _read_course_index(self, force_update: bool) \
+            -> Dict[int, _CourseEntry]:
+        """Returns the courses on the home page by ID, reading the page again
+        if forced or if the last read is older than course_index_max_age.
+        """
+        index = self._course_index.get() if not force_update else None
+        if index is None:
+            # A write made while the page is in flight drops this read.
+            generation = self._course_index.generation
+            res = await self._get(endpoints.HOME)
+            index = _parse_course_index(res.html)
+            self._course_index.put(index, generation)
+        return index
+
+    async def get_assignments(self, course: Course, *,
+                              force_update: bool=False) -> List[Assignment]:
+        """Returns the list of assignments in the course, as
+        :meth:`Course.get_assignments` does. Raises an error if you are not an
+        instructor of the course.
+
+        :param course: The course.
+        :type course: Course
+        :param force_update: If True, force an update instead of using the
+        locally cached data.
+        :type force_update: bool
+        :returns: A list of assignments.
+        :rtype: list[Assignment]
+        """
+        if course._is_instructor is False:
+            raise NotImplementedError('Student views are not implemented')
+
+        if course._assignments is None or force_update:
+            # The assignment list doubles as the instructor check, so one
+            # request answers both.
+            res = await self._get(endpoints.COURSE_ASSIGNMENTS.substitute(
+                    course_id=course.id))
+            course._is_instructor = res.status_code == 200
+            if not course._is_instructor:
+                raise NotImplementedError('Student views are not implemented')
+            course._apply_assignments(res.html)
+            assert course._assignments is not None, \
+                    'Error getting assignments from assignment list'
+        return list(course._assignments.values())
+
+    async def get_members(self, course: Course, *,
+                          force: bool=False) -> List[Member]:
+        """Returns the list of members of the course, as
+        :meth:`Course.get_members` does.
+
+        :param course: The course.
+        :type course: Course
+        :param force: If True, force an update instead of using the locally
+        cached data.
+        :type force: bool
+        :returns: A list of members.
+        :rtype: list[Member]
+        """
+        if course._members is None or force:
+            res = await self._get(endpoints.COURSE_MEMBERSHIP.substitute(
+                    course_id=course.id))
+            course._apply_roster(res.html)
+            assert course._members is not None, \
+                    'Error getting members from roster'
+        return course._members
+
+    async def read_settings(self, assignment: Assignment) -> None:
+        """Sets the assignment's locally cached variables from its settings
+        page, as :meth:`Assignment._read_settings` does. Afterwards,
+        :meth:`Assignment.get_name` and :meth:`Assignment.get_type` answer
+        without a request.
+
+        :param assignment: The assignment.
+        :type assignment: Assignment
+        """
+        res = await self._get(endpoints.ASSIGNMENT_EDIT.substitute(
+                course_id=assignment._course.id, assignment_id=assignment.id))
+        assignment._apply_settings(res.html)
+
+    async def _get(self, url: str, **kwargs) -> Response:
+        """Makes a GET request with the session, saving any CSRF token that is
+        returned. Plain GETs of a URL that another task is already fetching
+        wait for that request and share its response.
+        """
+        assert self._session is not None, 'Client has not been entered'
+
+        # Default disallow redirects.
+        kwargs.setdefault('allow_redirects', False)
+
+        # Only share requests that are fully identified by their URL.
+        if set(kwargs) != { 'allow_redirects' }:
+            return await self._send_get(url, **kwargs)
+
+        key = (url, kwargs['allow_redirects'], self._writes)
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced_requests += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(self._send_get(url, **kwargs))
+        self._in_flight[key] = future
+        try:
+            # Shielded so that cancelling this task does not cancel the
+            # request for the tasks sharing it.
+            return await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    async def _send_get(self, url: str, **kwargs) -> Response:
+        assert self._session is not None, 'Client has not been entered'
+
+        async with self._session.get(self._site_url(url), **kwargs) as res:
+            response = await self._read_response(res)
+        self._save_csrf_token(response)
+        return response
+
+    async def _post(self, url: str, **kwargs) -> Response:
+        """Makes a POST request with the session, saving any CSRF token that is
+        returned. A successful POST invalidates the course index.
+        """
+        assert self._session is not None, 'Client has not been entered'
+
+        # Default disallow redirects.
+        kwargs.setdefault('allow_redirects', False)
+        # Inject the CSRF token by default if not manually set (or data is not
+        # present).
+        kwargs['data'] = dict({ 'authenticity_token': self._csrf_token },
+                              **kwargs.get('data', {}))
+
+        async with self._session.post(self._site_url(url), **kwargs) as res:
+            response = await self._read_response(res)
+        if response.status_code < 400:
+            self._writes += 1
+            # The write may have changed what the home page lists.
+            self._course_index.invalidate()
+        self._save_csrf_token(response)
+        return response
+
+    def _site_url(self, url: str) -> str:
+        """Returns the URL on the site this client sends requests to for a
+        Gradescope URL.
+        """
+        if url.startswith(endpoints.BASE):
+            return self._base_url + url[len(endpoints.BASE):]
+        return url
+
+    @staticmethod
+    async def _read_response(res: aiohttp.ClientResponse) -> Response:
+        """Reads the body of an aiohttp response into a Response."""
+        content = await res.read()
+        return Response(res.status, res.headers, str(res.url), content,
+                        res.charset)
+
+    def _save_csrf_token(self, res: Response) -> None:
+        """Saves the CSRF token from the response, if it has one."""
+        token = res.csrf_token
+        if token is not None:
+            self._csrf_token = token
+
+    async def __aenter__(self) -> AsyncClient:
+        connector = aiohttp.TCPConnector(limit=self._max_connections)
+        self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={ 'Accept-Encoding': accept_encoding() })
+        try:
+            if not await self._log_in(self._username, self._password):
+                raise GSInvalidRequestException('Invalid username or password')
+        except BaseException:
+            await self._session.close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type: Optional[Exception], exc_val: Any,
+                        exc_tb: Optional[TracebackType]) -> None:
+        assert self._session is not None, 'Client has not been entered'
+        await self._session.close()
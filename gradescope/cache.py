@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import re
+import threading
+import time
+from typing import Dict, Optional, TYPE_CHECKING
+
+from . import endpoints
+
+if TYPE_CHECKING:
+    from .response import Response
+
+# Matches the course prefix of a URL, e.g. https://.../courses/123.
+_COURSE_PREFIX_RE = re.compile(r'^(.*?/courses/\d+)(?:/|$)')
+
+class _CacheEntry:
+    def __init__(self, response: Response, stored_at: float) -> None:
+        self.response = response
+        self.stored_at = stored_at
+        self.size = len(response.content)
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers that revalidate this entry."""
+        headers = {}
+        etag = self.response.headers.get('ETag')
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        last_modified = self.response.headers.get('Last-Modified')
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+class ResponseCache:
+    """An in-memory cache of GET responses keyed by URL, shared by every object
+    created from the same client.
+
+    Entries younger than the TTL are served without a request. Older entries
+    are revalidated with If-None-Match/If-Modified-Since when the server gave
+    an ETag or Last-Modified header, and dropped otherwise. The cache holds at
+    most max_entries responses totalling at most max_bytes of body, evicting
+    the least recently used entries first. It is safe to share between
+    threads.
+    """
+
+    def __init__(self, ttl: float=60.0, max_entries: int=256,
+                 max_bytes: int=64 * 1024 * 1024) -> None:
+        """Constructs an empty cache.
+
+        :param ttl: Seconds for which an entry is served without revalidation.
+        :type ttl: float
+        :param max_entries: Maximum number of cached responses.
+        :type max_entries: int
+        :param max_bytes: Maximum total size of cached response bodies.
+        :type max_bytes: int
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, url: str) -> Optional[_CacheEntry]:
+        """Returns the entry for the URL, fresh or not, marking it as recently
+        used.
+
+        :param url: The request URL.
+        :type url: str
+        :returns: The entry, if one is cached.
+        :rtype: Optional[_CacheEntry]
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry: _CacheEntry) -> bool:
+        """Returns whether the entry may be served without revalidation.
+
+        :param entry: The entry.
+        :type entry: _CacheEntry
+        :rtype: bool
+        """
+        return time.monotonic() - entry.stored_at < self.ttl
+
+    def store(self, url: str, response: Response) -> None:
+        """Caches the response for the URL, evicting old entries as needed.
+        Responses larger than max_bytes are not cached.
+
+        :param url: The request URL.
+        :type url: str
+        :param response: The response.
+        :type response: Response
+        """
+        entry = _CacheEntry(response, time.monotonic())
+        with self._lock:
+            self._remove(url)
+            if entry.size > self.max_bytes:
+                return
+            self._entries[url] = entry
+            self._size += entry.size
+            while len(self._entries) > self.max_entries \
+                    or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def revalidated(self, entry: _CacheEntry) -> None:
+        """Marks the entry as fresh after the server confirmed it with a 304.
+
+        :param entry: The entry.
+        :type entry: _CacheEntry
+        """
+        entry.stored_at = time.monotonic()
+
+    def invalidate(self, url: str) -> None:
+        """Drops every entry that a successful write to the URL may have made
+        stale. A write under a course drops all of that course's pages and the
+        home page, which lists course names; any other write drops everything.
+
+        :param url: The URL that was written to.
+        :type url: str
+        """
+        match = _COURSE_PREFIX_RE.match(url)
+        with self._lock:
+            if match is None:
+                self._entries.clear()
+                self._size = 0
+                return
+            prefix = match.group(1)
+            stale = [cached_url for cached_url in self._entries
+                     if cached_url == endpoints.HOME
+                     or cached_url == prefix
+                     or cached_url.startswith(prefix + '/')]
+            for cached_url in stale:
+                self._remove(cached_url)
+
+    def clear(self) -> None:
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, url: str) -> None:
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self._size -= entry.size
@@ -1,34 +1,213 @@
 from __future__ import annotations
 
+import contextlib
+import functools
 import re
+import threading
+import time
 from types import TracebackType
-from typing import Any, List, Optional
+from typing import (Any, Dict, Iterable, Iterator, List, NamedTuple,
+                    Optional, Tuple, TYPE_CHECKING, Union)
 
-import lxml.html
 import requests
+import requests.adapters
 
-from . import endpoints
+from . import endpoints, xpaths
+from .cache import ResponseCache
+from .concurrency import DEFAULT_MAX_WORKERS, SingleFlight, run_concurrently
+from .connection import ConnectionStats, _CountingAdapter
 from .course import Course
 from .error import GSInvalidRequestException
+from .identity import IdentityMap
+from .metrics import Hook, MetricsAggregator, ParseEvent, RequestEvent
+from .protocol import ClientProtocol
+from .response import Response, StreamedResponse, accept_encoding
+from .scheduler import RequestScheduler
+from .session_store import SavedSession, SessionStore
+from .store import MetadataStore
 from .term import Term
 
+if TYPE_CHECKING:
+    import lxml.html
+
 DOMAIN = 'www.gradescope.com'
 
+_IDEMPOTENT_METHODS = frozenset({ 'patch', 'put', 'delete' })
+# Pages that start or end a session. They are never cached or shared, since
+# each must reach the site to take effect and to carry the current session's
+# CSRF token.
+_SESSION_URLS = frozenset({ endpoints.LOGIN, endpoints.LOGOUT })
+
+class _CourseEntry(NamedTuple):
+    """A course as its box on the home page shows it."""
+    id: int
+    short_name: str
+    name: str
+    term: Term
+    # None if the heading above the box does not say.
+    is_instructor: Optional[bool]
+
+class _CourseIndex:
+    """The courses on the home page by ID, kept for max_age seconds. Every
+    write invalidates it, including writes made while the page was being
+    read, whose result is then not kept.
+    """
+
+    def __init__(self, max_age: float) -> None:
+        self.max_age = max_age
+        # Counts invalidations. A read that began under an older generation
+        # may predate a write.
+        self.generation = 0
+        self._index: Optional[Dict[int, _CourseEntry]] = None
+        self._time = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Dict[int, _CourseEntry]]:
+        """Returns the index, unless there is none or it is too old."""
+        with self._lock:
+            if self._index is None \
+                    or time.monotonic() - self._time > self.max_age:
+                return None
+            return self._index
+
+    def put(self, index: Dict[int, _CourseEntry], generation: int) -> None:
+        """Keeps an index read from a home page requested at the given
+        generation, unless it has been invalidated since.
+        """
+        with self._lock:
+            if generation == self.generation:
+                self._index = index
+                self._time = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._index = None
+
 class Client:
-    def __init__(self, username: str, password: str) -> None:
+    def __init__(self, username: str, password: str, *,
+                 cache: Optional[ResponseCache]=None,
+                 scheduler: Optional[RequestScheduler]=None,
+                 pool_connections: int=10, pool_maxsize: int=10,
+                 timeout: Union[None, float, Tuple[float, float]]=None,
+                 keep_alive: bool=True, compress: bool=True,
+                 adapter: Optional[requests.adapters.BaseAdapter]=None,
+                 session_store: Optional[SessionStore]=None,
+                 store: Optional[MetadataStore]=None,
+                 course_index_max_age: float=300.0) -> None:
         """Constructs a Gradescope client with the given credentials.
 
         :param username: The username.
         :type username: str
         :param password: The password.
         :type password: str
+        :param cache: If given, GET responses are cached here and shared by
+        every course, assignment and member created from this client.
+        :type cache: Optional[ResponseCache]
+        :param scheduler: Rate limits, caps and retries every request. If not
+        given, requests are retried with backoff but not rate limited.
+        :type scheduler: Optional[RequestScheduler]
+        :param pool_connections: The number of per-host connection pools to
+        keep.
+        :type pool_connections: int
+        :param pool_maxsize: The maximum number of connections kept open to
+        any one host. Should be at least the number of threads making
+        requests at once.
+        :type pool_maxsize: int
+        :param timeout: The request timeout in seconds, either one value or a
+        (connect, read) pair. None waits forever.
+        :type timeout: Union[None, float, tuple[float, float]]
+        :param keep_alive: If False, ask the server to close each connection
+        after its response instead of keeping it open for reuse.
+        :type keep_alive: bool
+        :param compress: If False, ask the server not to compress responses.
+        Otherwise every compression the client can undo is offered; see
+        response.accept_encoding.
+        :type compress: bool
+        :param adapter: A transport adapter to send requests through instead
+        of the default pooled one, e.g. a replay.ReplayAdapter. The pool
+        options and connection statistics do not apply to it.
+        :type adapter: Optional[requests.adapters.BaseAdapter]
+        :param session_store: If given, a session saved here for the username
+        is reused instead of logging in, and new logins are saved here. See
+        from_session_store.
+        :type session_store: Optional[SessionStore]
+        :param store: If given, course, assignment and member metadata read
+        from the site is saved here, and getters answer from it while it is
+        fresh, even in later processes.
+        :type store: Optional[MetadataStore]
+        :param course_index_max_age: Seconds for which fetch_course and
+        fetch_courses look courses up in the last home page read instead of
+        reading it again.
+        :type course_index_max_age: float
         """
         self._session = requests.Session()
+        self._connection_stats = ConnectionStats()
+        if adapter is None:
+            adapter = _CountingAdapter(self._connection_stats,
+                                       pool_connections=pool_connections,
+                                       pool_maxsize=pool_maxsize)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        if not keep_alive:
+            self._session.headers['Connection'] = 'close'
+        self._session.headers['Accept-Encoding'] = \
+                accept_encoding() if compress else 'identity'
+        self._timeout = timeout
         self._csrf_token: Optional[str] = None
+        self._cache = cache
+        self._store = store
+        self._scheduler = scheduler if scheduler is not None \
+                else RequestScheduler()
+        self._hooks: List[Hook] = []
+        self._identities = IdentityMap()
+        self._course_index = _CourseIndex(course_index_max_age)
+        self._in_flight: SingleFlight[Tuple[str, bool, int], Response] = \
+                SingleFlight()
+        # Counts successful writes, so that a GET sent after a write does not
+        # share the response of one sent before it.
+        self._writes = 0
+        self._username = username
+        self._password = password
+        self._session_store = session_store
+        # Guards logging in again, and counts logins so that threads which
+        # waited on another thread's login do not log in once more.
+        self._login_lock = threading.Lock()
+        self._login_count = 0
 
-        if not self._log_in(username, password):
+        saved = session_store.load(username) \
+                if session_store is not None else None
+        if saved is not None:
+            # Assume the saved session is still good; _send logs in again if
+            # the site turns it away.
+            self._session.cookies.set('signed_token', saved.signed_token,
+                                      domain=DOMAIN, path='/')
+            self._csrf_token = saved.csrf_token
+        elif not self._log_in(username, password):
             raise GSInvalidRequestException('Invalid username or password')
 
+    @classmethod
+    def from_session_store(cls, store: SessionStore, username: str,
+                           password: str, **kwargs: Any) -> Client:
+        """Constructs a client that reuses a session saved by an earlier
+        client, even one in another process, skipping the login requests.
+        The saved session is not checked up front: if the site rejects it,
+        the client logs in again with the credentials, saves the new session
+        and retries the request once. If nothing is saved yet, the client
+        logs in now and saves the session.
+
+        :param store: Where sessions are kept, e.g. a FileSessionStore.
+        :type store: SessionStore
+        :param username: The username.
+        :type username: str
+        :param password: The password, used if a new login is needed.
+        :type password: str
+        :param kwargs: Other arguments for the Client constructor.
+        :returns: The client.
+        :rtype: Client
+        """
+        return cls(username, password, session_store=store, **kwargs)
+
     def _log_in(self, username: str, password: str) -> bool:
         """Logs into Gradescope with the given credentials.
 
@@ -39,100 +218,260 @@ class Client:
         :returns: Whether the login was successful.
         :rtype: bool
         """
-        # This is likely the first request, so use a _get call to store a CSRF
+        # This is likely the first request, so send a GET to store a CSRF
         # token.
-        res = self._get(endpoints.LOGIN)
+        res = self._send('GET', endpoints.LOGIN, allow_redirects=False)
+        self._emit_request('GET', endpoints.LOGIN, res, None)
         res = self._post(endpoints.LOGIN, data={
             'session[email]': username,
             'session[password]': password
         }, allow_redirects=False)
 
         # Return whether 'signed_token' is now a cookie we have.
-        success = self._session.cookies.get('signed_token', domain=DOMAIN) \
-                is not None
-        return success
+        signed_token = self._session.cookies.get('signed_token',
+                                                 domain=DOMAIN)
+        self._login_count += 1
+        if signed_token is not None and self._session_store is not None:
+            self._session_store.save(self._username, SavedSession(
+                    signed_token=signed_token, csrf_token=self._csrf_token,
+                    saved_at=time.time()))
+        return signed_token is not None
+
+    def _log_in_again(self, login_count: int) -> None:
+        """Logs in again after the site rejected the session, unless another
+        thread already has since login_count was read.
+        """
+        with self._login_lock:
+            if self._login_count != login_count:
+                return
+            try:
+                self._session.cookies.clear(domain=DOMAIN)
+            except KeyError:
+                pass
+            if not self._log_in(self._username, self._password):
+                if self._session_store is not None:
+                    self._session_store.delete(self._username)
+                raise GSInvalidRequestException(
+                        'Invalid username or password')
+            # Cached pages carry the old session's CSRF token.
+            if self._cache is not None:
+                self._cache.clear()
+
+    @property
+    def connection_stats(self) -> ConnectionStats:
+        """Counts of requests sent and connections opened by this client, for
+        sizing the connection pool.
+
+        :returns: The connection statistics.
+        :rtype: ConnectionStats
+        """
+        return self._connection_stats
+
+    def add_hook(self, hook: Hook) -> None:
+        """Registers a function to be called with a metrics.RequestEvent after
+        every request and a metrics.ParseEvent after every page parse. Hooks
+        are called on the thread that made the request, so they must be
+        thread-safe if the client is used from several threads.
+
+        :param hook: The function to call.
+        :type hook: Callable[[Union[RequestEvent, ParseEvent]], None]
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        """Unregisters a function registered with add_hook.
+
+        :param hook: The function to stop calling.
+        :type hook: Callable[[Union[RequestEvent, ParseEvent]], None]
+        """
+        self._hooks.remove(hook)
+
+    @contextlib.contextmanager
+    def profile(self) -> Iterator[MetricsAggregator]:
+        """Collects per-endpoint request and parse metrics for the duration
+        of a with block, e.g.
+
+            with client.profile() as metrics:
+                course.get_members()
+            print(metrics.report())
+
+        :returns: A context manager yielding the metrics being collected.
+        :rtype: ContextManager[MetricsAggregator]
+        """
+        aggregator = MetricsAggregator()
+        self.add_hook(aggregator)
+        try:
+            yield aggregator
+        finally:
+            self.remove_hook(aggregator)
 
     def log_out(self) -> None:
         """Logs out of Gradescope. Must be logged in to call this function."""
         self._get(endpoints.LOGOUT, allow_redirects=False)
+        if self._cache is not None:
+            self._cache.clear()
+        self._course_index.invalidate()
+        if self._session_store is not None:
+            self._session_store.delete(self._username)
 
     def fetch_course_list(self) -> List[Course]:
         """Fetches the list of courses the client is enrolled in or teaches.
+        The home page is always read again.
 
         :returns: A list of courses the client is enrolled in or teaches.
         :rtype: list[Course]
         """
-        res = self._get(endpoints.HOME)
-        html = lxml.html.fromstring(res.text)
-
-        courses: List[Course] = []
-
-        # Get courses.
-        # TODO We can check if we are instructor for a course here.
-        term_elems = html.xpath('//*[contains(@class,"courseList--term")]')
-        for term_elem in term_elems:
-            term = Term.parse(term_elem.xpath('text()')[0])
-            course_box_elems = term_elem.xpath('following-sibling::*[contains(@class,"courseList--coursesForTerm")]'
-                                               '//a[contains(@class,"courseBox")]')
-            for course_box_elem in course_box_elems:
-                href = course_box_elem.xpath('@href')[0]
-                short_name = course_box_elem.xpath('*[contains(@class,"courseBox--shortname")]/text()')[0]
-                name = course_box_elem.xpath('*[contains(@class,"courseBox--name")]/text()')[0]
-                match = re.search('/courses/(\d+)', href)
-                assert match is not None, "Can't extract course ID from href"
-                course_id = int(match.groups(1)[0])
-                courses.append(Course(id=course_id, _client=self,
-                                      _short_name=short_name, _name=name,
-                                      _term=term))
-
-        return courses
-
-    def fetch_course(self, course_id: int) -> Optional[Course]:
+        return [_course_from_entry(self, entry) for entry
+                in self._read_course_index(force_update=True).values()]
+
+    def fetch_course(self, course_id: int, *,
+                     force_update: bool=False) -> Optional[Course]:
         """Fetches the course with the given ID. Returns None if not
-        accessible.
+        accessible. The course is looked up in the last home page read, which
+        is only read again once it is older than course_index_max_age, so a
+        course joined since then is not found without force_update.
 
         :param course_id: The ID of the course.
         :type course_id: int
+        :param force_update: If True, read the home page again.
+        :type force_update: bool
         :returns: The course, if found.
         :rtype: Optional[Course]
         """
-        res = self._get(endpoints.HOME)
-        html = lxml.html.fromstring(res.text)
+        entry = self._read_course_index(force_update).get(course_id)
+        return _course_from_entry(self, entry) if entry is not None else None
+
+    def fetch_courses(self, course_ids: Iterable[int], *,
+                      force_update: bool=False) -> List[Course]:
+        """Fetches the courses with the given IDs, as fetch_course does, from
+        at most one read of the home page. Courses that are not accessible are
+        skipped.
+
+        :param course_ids: The IDs of the courses.
+        :type course_ids: Iterable[int]
+        :param force_update: If True, read the home page again.
+        :type force_update: bool
+        :returns: The accessible courses, in the order given.
+        :rtype: list[Course]
+        """
+        index = self._read_course_index(force_update)
+        return [_course_from_entry(self, index[course_id])
+                for course_id in course_ids if course_id in index]
+
+    def fetch_courses_bulk(self, course_ids: Iterable[int], *,
+                           roster: bool=False,
+                           max_workers: int=DEFAULT_MAX_WORKERS) \
+            -> Iterator[Course]:
+        """Fetches many courses at once through a bounded thread pool, reading
+        each course's dashboard (and optionally its roster). Courses are
+        yielded as their pages finish loading, not in the order given;
+        courses that are not accessible are skipped.
+
+        :param course_ids: The IDs of the courses.
+        :type course_ids: Iterable[int]
+        :param roster: If True, also read each course's roster. The roster is
+        only read for courses the client is allowed to see it for.
+        :type roster: bool
+        :param max_workers: The maximum number of courses to load at once.
+        :type max_workers: int
+        :returns: An iterator over the fetched courses.
+        :rtype: Iterator[Course]
+        """
+        def fetch(course_id: int) -> Optional[Course]:
+            res = self._get(endpoints.COURSE.substitute(course_id=course_id))
+            if res.status_code != 200:
+                return None
+            course = _live_course(self, course_id)
+            course._apply_dashboard(res.html)
+            if roster:
+                res = self._get(endpoints.COURSE_MEMBERSHIP.substitute(
+                        course_id=course_id))
+                if res.status_code == 200:
+                    course._apply_roster(res.html)
+            return course
 
-        # Get course.
-        # TODO We can check if we are instructor for a course here.
-        course_box_elems = html.xpath(f'//a[contains(@href,"/courses/{course_id}")]')
-        if len(course_box_elems) == 0:
-            # Course was not found.
-            return None
-        course_box_elem = course_box_elems[0]
-        short_name = course_box_elem.xpath('*[contains(@class,"courseBox--shortname")]/text()')[0]
-        name = course_box_elem.xpath('*[contains(@class,"courseBox--name")]/text()')[0]
-        term = Term.parse(course_box_elem.xpath('preceding::*[contains(@class,"courseList--term")][1]/text()')[0])
+        tasks = (functools.partial(fetch, course_id)
+                 for course_id in course_ids)
+        for course in run_concurrently(tasks, max_workers):
+            if course is not None:
+                yield course
 
-        return Course(id=course_id, _client=self, _short_name=short_name,
-                      _name=name, _term=term)
+    def _read_course_index(self,
+                           force_update: bool) -> Dict[int, _CourseEntry]:
+        """Returns the courses on the home page by ID, reading the page again
+        if forced or if the last read is older than course_index_max_age.
+        """
+        index = self._course_index.get() if not force_update else None
+        if index is None:
+            # Concurrent reads share one request through _get.
+            generation = self._course_index.generation
+            res = self._get(endpoints.HOME)
+            index = _parse_course_index(res.html)
+            self._course_index.put(index, generation)
+        return index
 
-    def _get(self, *args, **kwargs) -> requests.Response:
+    def _get(self, url: str, *, revalidate: bool=False, **kwargs) -> Response:
         """Makes a GET request with the session, saving any CSRF token that is
-        returned.
+        returned. Plain GETs of a URL that another thread is already fetching
+        wait for that request and share its response, and so its parsed tree.
+        If the client has a response cache, plain GETs are answered from it
+        while fresh and revalidated once stale. With revalidate, the request
+        always reaches the site, revalidating any cached copy, and is not
+        shared.
         """
         # Default disallow redirects.
         kwargs.setdefault('allow_redirects', False)
 
-        res = self._session.get(*args, **kwargs)
-        # TODO Extract CSRF token if redirected.
-        if res.headers['Content-Type'].startswith('text/html'):
-            # Extract CSRF token from HTML.
-            html = lxml.html.fromstring(res.text)
-            tokens = html.xpath('//meta[@name="csrf-token"]/@content')
-            if len(tokens) > 0:
-                self._csrf_token = tokens[0]
+        if revalidate:
+            cache = self._cache if set(kwargs) == { 'allow_redirects' } \
+                    and url not in _SESSION_URLS else None
+            return self._get_through_cache(url, cache, revalidate=True,
+                                           **kwargs)
+
+        # Only share and cache requests that are fully identified by their
+        # URL.
+        if set(kwargs) != { 'allow_redirects' } or url in _SESSION_URLS:
+            return self._get_through_cache(url, None, **kwargs)
+
+        res, coalesced = self._in_flight.do(
+                (url, kwargs['allow_redirects'], self._writes),
+                lambda: self._get_through_cache(url, self._cache, **kwargs))
+        if coalesced:
+            self._connection_stats._count_coalesced_request()
+            self._emit_request('GET', url, res, None, network=False,
+                               coalesced=True)
+        return res
+
+    def _get_through_cache(self, url: str, cache: Optional[ResponseCache], *,
+                           revalidate: bool=False, **kwargs) -> Response:
+        entry = None
+        if cache is not None:
+            entry = cache.lookup(url)
+            if entry is not None:
+                if cache.is_fresh(entry) and not revalidate:
+                    self._save_csrf_token(entry.response)
+                    self._emit_request('GET', url, entry.response, 'hit',
+                                       network=False)
+                    return entry.response
+                kwargs['headers'] = entry.validators
+
+        res = self._send('GET', url, **kwargs)
+        if cache is not None:
+            if res.status_code == 304 and entry is not None:
+                cache.revalidated(entry)
+                self._save_csrf_token(entry.response)
+                self._emit_request('GET', url, res, 'revalidated')
+                return entry.response
+            if res.status_code == 200:
+                cache.store(url, res)
+        self._emit_request('GET', url, res,
+                           'miss' if cache is not None else None)
         return res
 
-    def _post(self, *args, **kwargs) -> requests.Response:
+    def _post(self, url: str, **kwargs) -> Response:
         """Makes a POST request with the session, saving any CSRF token that is
-        returned.
+        returned. A successful POST invalidates cached pages it may have
+        changed, and the course index.
         """
         # Default disallow redirects.
         kwargs.setdefault('allow_redirects', False)
@@ -141,19 +480,204 @@ class Client:
         kwargs['data'] = dict({ 'authenticity_token': self._csrf_token },
                               **kwargs.get('data', {}))
 
-        res = self._session.post(*args, **kwargs)
-        # TODO Extract CSRF token if redirected.
-        if res.headers['Content-Type'].startswith('text/html'):
-            # Extract CSRF token from HTML.
-            html = lxml.html.fromstring(res.text)
-            tokens = html.xpath('//meta[@name="csrf-token"]/@content')
-            if len(tokens) > 0:
-                self._csrf_token = tokens[0]
+        res = self._send('POST', url, **kwargs)
+        if res.status_code < 400:
+            self._writes += 1
+            # The write may have changed what the home page lists.
+            self._course_index.invalidate()
+            if self._cache is not None:
+                self._cache.invalidate(url)
+        self._emit_request('POST', url, res, None)
+        return res
+
+    def _get_stream(self, url: str, **kwargs) -> StreamedResponse:
+        """Makes a GET request with the session without reading the body, for
+        pages too large to hold in memory at once. The response cache is
+        bypassed. Like any other request, it logs in again if the session has
+        expired. Raises an error unless the page is answered with a 200. The
+        caller must close the returned response.
+        """
+        # Default disallow redirects.
+        kwargs.setdefault('allow_redirects', False)
+        kwargs['stream'] = True
+
+        start = time.perf_counter()
+        res, attempts = self._execute('GET', url, **kwargs)
+        if self._hooks:
+            # Only the headers have arrived; the body size is as declared.
+            size = int(res.headers.get('Content-Length') or 0)
+            self._emit(RequestEvent(
+                    method='GET', url=url, endpoint=endpoints.name_of(url),
+                    status=res.status_code, bytes=size,
+                    network_time=time.perf_counter() - start, cache=None,
+                    retries=attempts - 1, wire_bytes=size))
+        if res.status_code != 200:
+            res.close()
+            raise GSInvalidRequestException(
+                    f'Request for {url} failed with status {res.status_code}')
+        return StreamedResponse(res, self._set_csrf_token)
+
+    def _send(self, method: str, url: str, **kwargs) -> Response:
+        """Sends a request through the scheduler and saves any CSRF token that
+        is returned.
+        """
+        start = time.perf_counter()
+        raw, attempts = self._execute(method, url, **kwargs)
+        res = Response.from_requests(raw)
+        res.network_time = time.perf_counter() - start
+        res.retries = attempts - 1
+        res._on_parse = functools.partial(self._on_parse, url)
+        self._save_csrf_token(res)
         return res
 
+    def _execute(self, method: str, url: str,
+                 **kwargs) -> Tuple[requests.Response, int]:
+        """Sends a request through the scheduler. If the site turns the session
+        away, logs in again and retries once. Returns the response, unread if
+        streamed, and the number of attempts made.
+        """
+        # Rails routes a POST with a _method of patch, put or delete as that
+        # method, all of which are safe to repeat.
+        data = kwargs.get('data') or {}
+        idempotent = method == 'GET' \
+                or str(data.get('_method', '')).lower() in _IDEMPOTENT_METHODS
+
+        kwargs.setdefault('timeout', self._timeout)
+        attempts = 0
+        def send() -> requests.Response:
+            nonlocal attempts
+            attempts += 1
+            return self._session.request(method, url, **kwargs)
+
+        login_count = self._login_count
+        res = self._scheduler.execute(url, send, idempotent=idempotent)
+        if _is_login_redirect(res) and url not in _SESSION_URLS:
+            # The session expired or was revoked. Log in again and retry once
+            # with the new session's CSRF token.
+            res.close()
+            self._log_in_again(login_count)
+            if 'authenticity_token' in data:
+                kwargs['data'] = dict(data,
+                                      authenticity_token=self._csrf_token)
+            res = self._scheduler.execute(url, send, idempotent=idempotent)
+        return res, attempts
+
+    def _emit(self, event: Union[RequestEvent, ParseEvent]) -> None:
+        for hook in list(self._hooks):
+            hook(event)
+
+    def _emit_request(self, method: str, url: str, res: Response,
+                      cache: Optional[str], *, network: bool=True,
+                      coalesced: bool=False) -> None:
+        if self._hooks:
+            self._emit(RequestEvent(
+                    method=method, url=url, endpoint=endpoints.name_of(url),
+                    status=res.status_code, bytes=len(res.content),
+                    network_time=res.network_time if network else 0.0,
+                    cache=cache, retries=res.retries if network else 0,
+                    coalesced=coalesced,
+                    wire_bytes=res.wire_bytes if network else 0))
+
+    def _on_parse(self, url: str, res: Response, parse_time: float) -> None:
+        if self._hooks:
+            self._emit(ParseEvent(url=url, endpoint=endpoints.name_of(url),
+                                  bytes=len(res.content),
+                                  parse_time=parse_time))
+
+    def _save_csrf_token(self, res: Response) -> None:
+        """Saves the CSRF token from the response, if it has one. The token is
+        found by scanning the page's <head>, so no DOM is built here; callers
+        parse the page once through :attr:`Response.html`.
+        """
+        # TODO Extract CSRF token if redirected.
+        token = res.csrf_token
+        if token is not None:
+            self._set_csrf_token(token)
+
+    def _set_csrf_token(self, token: str) -> None:
+        self._csrf_token = token
+
     def __enter__(self) -> Client:
         return self
 
     def __exit__(self, exc_type: Optional[Exception], exc_val: Any,
                  exc_tb: Optional[TracebackType]) -> None:
         self._session.__exit__()
+
+def _is_login_redirect(res: requests.Response) -> bool:
+    """Returns whether the response sends the client to the login page, which
+    is how the site answers requests without a valid session.
+    """
+    if res.status_code in (301, 302, 303):
+        return res.headers.get('Location', '').split('?', 1)[0] \
+                == endpoints.LOGIN
+    return res.url.split('?', 1)[0] == endpoints.LOGIN
+
+def _parse_course_list(client: ClientProtocol,
+                       html: lxml.html.HtmlElement) -> List[Course]:
+    """Reads the list of courses from the parsed home page.
+
+    :param client: The client the courses belong to.
+    :type client: ClientProtocol
+    :param html: The parsed home page.
+    :type html: lxml.html.HtmlElement
+    :returns: A list of courses the client is enrolled in or teaches.
+    :rtype: list[Course]
+    """
+    return [_course_from_entry(client, entry)
+            for entry in _parse_course_index(html).values()]
+
+def _parse_course_index(html: lxml.html.HtmlElement) -> Dict[int, _CourseEntry]:
+    """Reads every course box on the parsed home page in one pass, keyed by
+    course ID, in page order.
+    """
+    index: Dict[int, _CourseEntry] = {}
+    term_elems = xpaths.HOME_TERMS(html)
+    for term_elem in term_elems:
+        term = Term.parse(xpaths.TEXT(term_elem)[0])
+        is_instructor = _parse_role_heading(term_elem)
+        course_box_elems = xpaths.TERM_COURSE_BOXES(term_elem)
+        for course_box_elem in course_box_elems:
+            href = course_box_elem.get('href')
+            short_name = xpaths.COURSE_BOX_SHORT_NAME(course_box_elem)[0]
+            name = xpaths.COURSE_BOX_NAME(course_box_elem)[0]
+            match = re.search(r'/courses/(\d+)', href)
+            assert match is not None, "Can't extract course ID from href"
+            course_id = int(match.group(1))
+            index[course_id] = _CourseEntry(course_id, short_name, name, term,
+                                            is_instructor)
+    return index
+
+def _course_from_entry(client: ClientProtocol, entry: _CourseEntry) -> Course:
+    """Returns the client's live course for the home page entry, updated with
+    what the entry shows and keeping the fields it does not have.
+    """
+    course = _live_course(client, entry.id)
+    course._short_name = entry.short_name
+    course._name = entry.name
+    course._term = entry.term
+    if entry.is_instructor is not None:
+        course._is_instructor = entry.is_instructor
+    return course
+
+def _live_course(client: ClientProtocol, course_id: int) -> Course:
+    """Returns the client's live Course object with the ID, making one if
+    there is none. Every course the client hands out comes from here, so that
+    two lookups of a course share one object and its cached fields.
+    """
+    return client._identities.get_or_create(
+            Course, course_id,
+            factory=lambda: Course(id=course_id, _client=client))
+
+def _parse_role_heading(elem: lxml.html.HtmlElement) -> Optional[bool]:
+    """Reads whether the client teaches the courses listed under the heading
+    above the element on the home page, which separates 'Instructor Courses'
+    from 'Student Courses'. Returns None for any other heading, leaving the
+    role to be probed.
+    """
+    heading = ''.join(xpaths.COURSE_LIST_HEADING(elem)).lower()
+    if 'instructor' in heading:
+        return True
+    if 'student' in heading:
+        return False
+    return None
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import threading
+from typing import (Callable, Dict, Generic, Hashable, Iterable, Iterator,
+                    Optional, Set, Tuple, TypeVar)
+
+K = TypeVar('K', bound=Hashable)
+T = TypeVar('T')
+
+DEFAULT_MAX_WORKERS = 8
+
+def run_concurrently(tasks: Iterable[Callable[[], T]],
+                     max_workers: int=DEFAULT_MAX_WORKERS) -> Iterator[T]:
+    """Runs the tasks on a bounded thread pool, yielding each result as soon as
+    its task completes. At most max_workers tasks are in flight at once, and
+    tasks are only pulled from the iterable as workers free up. An exception
+    raised by a task is re-raised from the iterator; closing the iterator
+    early cancels the tasks that have not started yet.
+
+    :param tasks: The tasks to run.
+    :type tasks: Iterable[Callable[[], T]]
+    :param max_workers: The maximum number of tasks to run at once.
+    :type max_workers: int
+    :returns: An iterator over the task results, in completion order.
+    :rtype: Iterator[T]
+    """
+    task_iter = iter(tasks)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: Set[Future[T]] = set()
+        try:
+            while True:
+                # Keep the pool full without queueing every task up front.
+                while len(pending) < max_workers:
+                    task = next(task_iter, None)
+                    if task is None:
+                        break
+                    pending.add(pool.submit(task))
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+class SingleFlight(Generic[K, T]):
+    """Collapses concurrent calls for the same key into one. While a call for
+    a key is running, other threads calling with that key wait for it and
+    share its result (or its exception) instead of running their own. Calls
+    made after it finishes run again.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[K, _Call[T]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: K, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Runs fn, unless a call for the key is already running, in which
+        case its result is waited for and returned instead.
+
+        :param key: Identifies calls that may share a result.
+        :type key: Hashable
+        :param fn: Computes the result.
+        :type fn: Callable[[], T]
+        :returns: The result, and whether it came from another thread's call.
+        :rtype: tuple[T, bool]
+        """
+        with self._lock:
+            running = self._calls.get(key)
+            if running is None:
+                call: _Call[T] = _Call()
+                self._calls[key] = call
+        if running is not None:
+            running.done.wait()
+            if running.error is not None:
+                raise running.error
+            return running.result, True # type: ignore
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False # type: ignore
+
+class _Call(Generic[T]):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
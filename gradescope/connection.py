@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Type
+
+import requests.adapters
+from urllib3.connectionpool import HTTPConnectionPool
+
+class ConnectionStats:
+    """Counts the requests a client sends and the connections it opens to send
+    them. Every request that did not open a connection reused a pooled one, so
+    a low reuse count under load suggests the pool is too small. GETs that
+    were answered by an identical GET already in flight are counted as
+    coalesced instead of being sent.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.new_connections = 0
+        self.coalesced_requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def reused_connections(self) -> int:
+        """The number of requests sent over an already open connection."""
+        return max(0, self.requests - self.new_connections)
+
+    def __repr__(self) -> str:
+        return (f'ConnectionStats(requests={self.requests}, '
+                f'new_connections={self.new_connections}, '
+                f'reused_connections={self.reused_connections}, '
+                f'coalesced_requests={self.coalesced_requests})')
+
+    def _count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def _count_new_connection(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def _count_coalesced_request(self) -> None:
+        with self._lock:
+            self.coalesced_requests += 1
+
+class _CountingAdapter(requests.adapters.HTTPAdapter):
+    """An HTTP adapter that records requests and new connections in a
+    ConnectionStats.
+    """
+
+    def __init__(self, stats: ConnectionStats, **kwargs: Any) -> None:
+        # HTTPAdapter.__init__ builds the pool manager, which needs the stats.
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: _counting_pool_class(pool_class, self._stats)
+            for scheme, pool_class
+            in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def send(self, *args: Any, **kwargs: Any) -> requests.Response:
+        self._stats._count_request()
+        return super().send(*args, **kwargs)
+
+def _counting_pool_class(pool_class: Type[HTTPConnectionPool],
+                         stats: ConnectionStats) -> Type[HTTPConnectionPool]:
+    """Returns a subclass of the connection pool class whose connections count
+    every time they connect. Pooled connections that were dropped by the
+    server reconnect in place, so counting connects rather than connection
+    objects catches those too.
+    """
+    class CountingConnection(pool_class.ConnectionCls): # type: ignore
+        def connect(self) -> None:
+            stats._count_new_connection()
+            super().connect()
+
+    class CountingConnectionPool(pool_class): # type: ignore
+        ConnectionCls = CountingConnection
+
+    return CountingConnectionPool
@@ -1,21 +1,31 @@
 from __future__ import annotations
 
+import contextlib
 from dataclasses import dataclass, field
 import functools
+import itertools
 import json
 import re
-from typing import List, Optional, TYPE_CHECKING
+import threading
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple, TYPE_CHECKING)
 
-import lxml.html
-
-from . import endpoints
+from . import endpoints, xpaths
 from .assignment import Assignment
+from .concurrency import DEFAULT_MAX_WORKERS, run_concurrently
 from .error import GSNotAuthorizedException
-from .member import Member
+from .member import Member, _RosterRow, _parse_roster_row
+from .protocol import ClientProtocol, page_loader
+from .roster import ROLE_CODES, Roster, RosterChange, RosterChangeResult
+from .slots import with_slots
+from .sync import SyncResult, _SyncState, page_digest
 from .term import Term
 
 if TYPE_CHECKING:
-    from .client import Client
+    from lxml import etree
+    import lxml.html
+
+    from .response import Response
 
 # TODO I have no idea how to statically type this.
 def _require_instructor(func):
@@ -27,10 +37,11 @@ def _require_instructor(func):
         return func(self, *args, **kwargs)
     return wrapper
 
+@with_slots
 @dataclass
 class Course:
     id: int
-    _client: Client = field(repr=False, hash=False, compare=False)
+    _client: ClientProtocol = field(repr=False, hash=False, compare=False)
 
     _is_instructor: Optional[bool] = field(default=None, repr=False,
                                            hash=False, compare=False)
@@ -42,8 +53,22 @@ class Course:
                                   compare=False)
     _description: Optional[str] = field(default=None, repr=False, hash=False,
                                         compare=False)
+    _assignments: Optional[Dict[int, Assignment]] = field(default=None,
+                                                          repr=False,
+                                                          hash=False,
+                                                          compare=False)
     _members: Optional[List[Member]] = field(default=None, repr=False,
                                              hash=False, compare=False)
+    _member_sync: Optional[_SyncState] = field(default=None, repr=False,
+                                               hash=False, compare=False)
+    _assignment_sync: Optional[_SyncState] = field(default=None, repr=False,
+                                                   hash=False, compare=False)
+    # Settings changed inside batch_edit and not yet sent, by field name, as
+    # the edits attribute. Kept per thread, since every thread using the
+    # client shares this object.
+    _pending_edits: threading.local = field(default_factory=threading.local,
+                                            repr=False, hash=False,
+                                            compare=False)
 
     @property
     def is_instructor(self) -> bool:
@@ -54,13 +79,25 @@ class Course:
         :rtype: bool
         """
         if self._is_instructor is None:
-            # Try fetching the course editing endpoint to see if we can
-            # successfully access it.
-            res = self._client._get(endpoints.COURSE_ASSIGNMENTS.substitute(
-                course_id=self.id))
-            self._is_instructor = res.status_code == 200
+            # Not known from the home page.
+            self._probe_role()
+            assert self._is_instructor is not None
         return self._is_instructor
 
+    def _probe_role(self) -> Response:
+        """Reads whether the client is an instructor from the assignment list,
+        which only instructors can see, and keeps the list so that
+        get_assignments does not fetch it again. Returns the list's response.
+        """
+        client = page_loader(self._client, 'Course.is_instructor',
+                             'get_assignments(course)')
+        res = client._get(endpoints.COURSE_ASSIGNMENTS.substitute(
+            course_id=self.id))
+        self._is_instructor = res.status_code == 200
+        if self._is_instructor:
+            self._apply_assignments(res.html)
+        return res
+
     def get_short_name(self, *, force_update: bool=False) -> str:
         """Returns the course's short name, typically in the form of 'DEPT
         XXX'.
@@ -71,6 +108,8 @@ class Course:
         :returns: The course short name.
         :rtype: str
         """
+        if self._short_name is None and not force_update:
+            self._load_stored_dashboard()
         if self._short_name is None or force_update:
             self._read_dashboard()
             assert self._short_name is not None, \
@@ -84,13 +123,7 @@ class Course:
         :param new_short_name: The new short name.
         :type new_short_name: str
         """
-        res = self._client._post(
-                endpoints.COURSE.substitute(course_id=self.id),
-                data={
-                    '_method': 'patch',
-                    'course[shortname]': new_short_name,
-                })
-        self._short_name = None
+        self.update(short_name=new_short_name)
 
     def get_name(self, *, force_update: bool=False) -> str:
         """Returns the course's full name.
@@ -101,6 +134,8 @@ class Course:
         :returns: The course full name.
         :rtype: str
         """
+        if self._name is None and not force_update:
+            self._load_stored_dashboard()
         if self._name is None or force_update:
             self._read_dashboard()
             assert self._name is not None, \
@@ -114,13 +149,7 @@ class Course:
         :param new_name: The new short name.
         :type new_name: str
         """
-        res = self._client._post(
-                endpoints.COURSE.substitute(course_id=self.id),
-                data={
-                    '_method': 'patch',
-                    'course[name]': new_name,
-                })
-        self._name = None
+        self.update(name=new_name)
 
     def get_term(self, *, force_update: bool=False) -> Term:
         """Returns the course's term.
@@ -131,6 +160,8 @@ class Course:
         :returns: The course term.
         :rtype: Term
         """
+        if self._term is None and not force_update:
+            self._load_stored_dashboard()
         if self._term is None or force_update:
             self._read_dashboard()
             assert self._term is not None, \
@@ -144,14 +175,7 @@ class Course:
         :param new_term: The new term.
         :type new_term: Term
         """
-        res = self._client._post(
-                endpoints.COURSE.substitute(course_id=self.id),
-                data={
-                    '_method': 'patch',
-                    'course[term]': new_term.season.name.capitalize(),
-                    'course[year]': str(new_term.year)
-                })
-        self._term = None
+        self.update(term=new_term)
 
     def get_description(self, *, force_update: bool=False) -> str:
         """Returns the description for the course.
@@ -162,6 +186,8 @@ class Course:
         :returns: The course description.
         :rtype: str
         """
+        if self._description is None and not force_update:
+            self._load_stored_dashboard()
         if self._description is None or force_update:
             self._read_dashboard()
             assert self._description is not None, \
@@ -175,62 +201,175 @@ class Course:
         :param new_description: The new description.
         :type new_description: str
         """
-        res = self._client._post(
-                endpoints.COURSE.substitute(course_id=self.id),
-                data={
-                    '_method': 'patch',
-                    'course[description]': new_description,
-                })
-        self._description = None
+        self.update(description=new_description)
 
-    def get_assignments(self) -> List[Assignment]:
+    @_require_instructor
+    def update(self, *, short_name: Optional[str]=None,
+               name: Optional[str]=None, term: Optional[Term]=None,
+               description: Optional[str]=None) -> None:
+        """Updates any of the course's settings with a single request, e.g.
+        course.update(name='...', description='...'). Settings left as None
+        are not changed. The locally cached values are updated to match, so
+        reading them back does not reload the dashboard.
+
+        Inside batch_edit on the same thread, the changes are held back and
+        sent together when the block ends.
+
+        :param short_name: The new short name.
+        :type short_name: Optional[str]
+        :param name: The new full name.
+        :type name: Optional[str]
+        :param term: The new term.
+        :type term: Optional[Term]
+        :param description: The new description.
+        :type description: Optional[str]
+        """
+        edits = { key: value for key, value in (
+                      ('short_name', short_name), ('name', name),
+                      ('term', term), ('description', description))
+                  if value is not None }
+        pending = getattr(self._pending_edits, 'edits', None)
+        if pending is not None:
+            pending.update(edits)
+        elif edits:
+            self._send_edits(edits)
+
+    @contextlib.contextmanager
+    def batch_edit(self) -> Iterator[Course]:
+        """Collects the settings changed by update and the set_* methods
+        inside a with block and sends them as one request when the block
+        ends, e.g.
+
+            with course.batch_edit():
+                course.set_name('...')
+                course.set_term(Term(Term.Season.FALL, 2021))
+
+        Nothing is sent if the block raises. Nested blocks join the outermost
+        one. The batch belongs to the thread running the block: changes made
+        on other threads meanwhile are sent straight away as usual, even
+        though every thread shares this Course object. Tasks on one asyncio
+        event loop share a thread, and so share its batch.
+
+        :returns: A context manager yielding this course.
+        :rtype: ContextManager[Course]
+        """
+        pending = self._pending_edits
+        if getattr(pending, 'edits', None) is not None:
+            yield self
+            return
+        pending.edits = {}
+        try:
+            yield self
+            edits = pending.edits
+        finally:
+            pending.edits = None
+        if edits:
+            self._send_edits(edits)
+
+    def get_assignments(self, *,
+                        force_update: bool=False) -> List[Assignment]:
         """Returns the list of assignments in the course. Raises an error if you
         are not an instructor of the course.
 
+        :param force_update: If True, force an update instead of using the
+        locally cached data.
+        :type force_update: bool
         :returns: A list of assignments.
         :rtype: list[Assignment]
         """
-        if self.is_instructor:
-            # We are an instructor.
-            res = self._client._get(endpoints.COURSE_ASSIGNMENTS.substitute(
-                course_id=self.id))
-            html = lxml.html.fromstring(res.text)
-
-            # Read courses from the HTML.
-            assignments: List[Assignment] = []
-            anchor_elems = html.xpath('//*[@id="assignments-instructor-table"]'
-                                      '//tr'
-                                      '//td[1]'
-                                      '//a')
-            for anchor_elem in anchor_elems:
-                href = anchor_elem.xpath('@href')[0]
-                name = anchor_elem.xpath('text()')[0]
-                match = re.search('/assignments/(\d+)', href)
-                assert match is not None, \
-                        "Can't extract assignment ID from href"
-                assignment_id = int(match.groups(1)[0])
-                assignments.append(Assignment(id=assignment_id,
-                                              _client=self._client,
-                                              _course=self, _name=name))
-        elif not self._is_instructor:
+        # Probing the role reads the assignment list as well.
+        probed = self._is_instructor is None
+        if not self.is_instructor:
             # We are a student. This is not supported yet.
             raise NotImplementedError('Student views are not implemented')
 
-        return assignments
+        if self._assignments is None and not force_update:
+            self._load_stored_assignments()
+        if self._assignments is None or (force_update and not probed):
+            self._read_assignments()
+            assert self._assignments is not None, \
+                    'Error getting assignments from assignment list'
+        return list(self._assignments.values())
+
+    def sync_assignments(self) -> SyncResult[Assignment]:
+        """Re-reads the assignment list and returns the assignments added,
+        removed or renamed since the last call. The first call reports every
+        assignment as added. If the list page is byte-for-byte the same as
+        last time (ignoring its CSRF token), it is not parsed at all. The page
+        is always requested from the site, revalidating any cached copy.
+        Raises an error if you are not an instructor of the course.
+
+        :returns: The differences since the last sync.
+        :rtype: SyncResult[Assignment]
+        """
+        # Probing the role reads the assignment list, so reuse it.
+        res = self._probe_role() if self._is_instructor is None else None
+        if not self.is_instructor:
+            # We are a student. This is not supported yet.
+            raise NotImplementedError('Student views are not implemented')
 
-    def get_assignment(self, assignment_id: int) -> Optional[Assignment]:
-        """Returns the assignment with the given ID, if it exists.
+        if res is None:
+            client = page_loader(self._client, 'Course.sync_assignments')
+            res = client._get(endpoints.COURSE_ASSIGNMENTS.substitute(
+                    course_id=self.id), revalidate=True)
+        if self._assignment_sync is None:
+            self._assignment_sync = _SyncState()
+        digest = page_digest(res.content)
+        if digest == self._assignment_sync.digest:
+            return SyncResult()
+
+        self._apply_assignments(res.html)
+        assert self._assignments is not None, \
+                'Error getting assignments from assignment list'
+        result = self._assignment_sync.diff(
+                list(self._assignments.values()),
+                lambda assignment: hash(assignment._name))
+        self._assignment_sync.digest = digest
+        return result
+
+    def get_assignment(self, assignment_id: int, *,
+                       force_update: bool=False) -> Optional[Assignment]:
+        """Returns the assignment with the given ID, if it exists. The
+        assignment list is fetched once and cached; IDs missing from the cached
+        list are looked up directly through their settings page rather than by
+        reloading the whole list.
 
         :param assignment_id: The ID of the assignment.
         :type assignment_id: int
+        :param force_update: If True, force an update instead of using the
+        locally cached data.
+        :type force_update: bool
         :returns: The assignment if it exists or None otherwise.
         :rtype: Optional[Assignment]
         """
-        assignments = self.get_assignments()
-        for assignment in assignments:
-            if assignment.id == assignment_id:
-                return assignment
-        return None
+        if not self.is_instructor:
+            # We are a student. This is not supported yet.
+            raise NotImplementedError('Student views are not implemented')
+
+        if self._assignments is None:
+            self._load_stored_assignments()
+        if self._assignments is None:
+            self._read_assignments()
+        assert self._assignments is not None, \
+                'Error getting assignments from assignment list'
+        if not force_update and assignment_id in self._assignments:
+            return self._assignments[assignment_id]
+
+        # Either an update was forced or the assignment was created after the
+        # list was cached. Probe the assignment's settings page directly, which
+        # also fills in its name and type.
+        client = page_loader(self._client, 'Course.get_assignment',
+                             'get_assignments(course, force_update=True)')
+        res = client._get(endpoints.ASSIGNMENT_EDIT.substitute(
+                course_id=self.id, assignment_id=assignment_id))
+        if res.status_code != 200:
+            self._assignments.pop(assignment_id, None)
+            return None
+
+        assignment = self._live_assignment(assignment_id)
+        self._assignments[assignment_id] = assignment
+        assignment._apply_settings(res.html)
+        return assignment
 
     def get_members(self, force: bool=False) -> List[Member]:
         """Returns the list of members (e.g. students, instrcutors. etc.) of the
@@ -239,61 +378,529 @@ class Course:
         :returns: A list of members.
         :rtype: list[Member]
         """
+        if self._members is None and not force:
+            self._load_stored_roster()
         if self._members is None or force:
             self._read_roster()
             assert self._members is not None, \
                     'Error getting members from roster'
         return self._members
 
+    def sync_members(self) -> SyncResult[Member]:
+        """Re-reads the roster and returns the members added, removed or
+        changed since the last call. The first call reports every member as
+        added. If the roster page is byte-for-byte the same as last time
+        (ignoring its CSRF token), it is not parsed at all. The page is always
+        requested from the site, revalidating any cached copy. Like
+        refresh_members, existing Member objects are updated in place.
+
+        :returns: The differences since the last sync.
+        :rtype: SyncResult[Member]
+        """
+        client = page_loader(self._client, 'Course.sync_members')
+        res = client._get(endpoints.COURSE_MEMBERSHIP.substitute(
+                course_id=self.id), revalidate=True)
+        if self._member_sync is None:
+            self._member_sync = _SyncState()
+        digest = page_digest(res.content)
+        if digest == self._member_sync.digest:
+            return SyncResult()
+
+        self._apply_roster(res.html)
+        assert self._members is not None, 'Error getting members from roster'
+        result = self._member_sync.diff(self._members, _member_hash)
+        self._member_sync.digest = digest
+        return result
+
+    def iter_members(self, *,
+                     chunk_size: int=64 * 1024) -> Iterator[Member]:
+        """Yields the members of the course one roster row at a time, parsing
+        the roster page incrementally as it downloads. Each row is discarded
+        once parsed, so memory use stays flat however large the course is.
+
+        Members are not collected into the course's cached member list. If
+        that list is already loaded, its Member objects are updated in place
+        and yielded instead of new ones.
+
+        :param chunk_size: The number of bytes to read from the network at a
+        time.
+        :type chunk_size: int
+        :returns: An iterator over the members of the course.
+        :rtype: Iterator[Member]
+        """
+        for roster_row in self._iter_roster_rows(chunk_size):
+            member = self._live_member(roster_row.id)
+            member._apply_roster_row(roster_row)
+            yield member
+
+    def fetch_roster(self, *, chunk_size: int=64 * 1024) -> Roster:
+        """Reads the roster into a compact, column-oriented Roster, streaming
+        the page like iter_members. No Member objects are kept; the course's
+        live ones are looked up on demand when the Roster is indexed or
+        iterated, and updated in place from it. Prefer this to get_members
+        when holding the rosters of many large courses at once.
+
+        The result is not cached, and the course's cached member list is not
+        collected.
+
+        :param chunk_size: The number of bytes to read from the network at a
+        time.
+        :type chunk_size: int
+        :returns: The roster.
+        :rtype: Roster
+        """
+        roster = Roster(self)
+        for roster_row in self._iter_roster_rows(chunk_size):
+            roster.append(roster_row)
+        return roster
+
+    def refresh_members(self) -> List[Member]:
+        """Re-reads the course roster with a single request. Member objects
+        already handed out by this course are updated in place (matched by
+        ID), so existing references observe the new data.
+
+        :returns: The refreshed list of members.
+        :rtype: list[Member]
+        """
+        return self.get_members(force=True)
+
+    @_require_instructor
+    def apply_roster_changes(self, changes: Iterable[RosterChange], *,
+                             notify: bool=False,
+                             max_workers: int=DEFAULT_MAX_WORKERS) \
+            -> List[RosterChangeResult]:
+        """Applies many enrollment changes at once. The changes are checked
+        against the cached roster (which is read first if needed), and only
+        the ones that would change something are sent. New members are
+        enrolled through the bulk roster upload, one request per role,
+        falling back to one request per member if the bulk upload is
+        rejected. If a bulk upload gets no answer, its members are reported
+        as failed without falling back, since it may have been applied.
+        Removals and role changes are sent one per member,
+        concurrently, paced by the client's scheduler. The cached roster is
+        updated to match.
+
+        :param changes: The changes to make.
+        :type changes: Iterable[RosterChange]
+        :param notify: Whether the site should email new members.
+        :type notify: bool
+        :param max_workers: The maximum number of requests to send at once.
+        :type max_workers: int
+        :returns: The result of each change, in the order given.
+        :rtype: list[RosterChangeResult]
+        """
+        Action = RosterChange.Action
+        Status = RosterChangeResult.Status
+
+        changes = list(changes)
+        by_email = { member.get_email().lower(): member
+                     for member in self.get_members() }
+        results: List[Optional[RosterChangeResult]] = [None] * len(changes)
+        adds: Dict[Member.Role, List[int]] = {}
+        tasks: List[Callable[[], Tuple[int, RosterChangeResult]]] = []
+        for index, change in enumerate(changes):
+            member = by_email.get(change.email.lower())
+            if member is None:
+                if change.action == Action.ADD:
+                    assert change.role is not None
+                    adds.setdefault(change.role, []).append(index)
+                else:
+                    results[index] = RosterChangeResult(
+                            change, Status.FAILED,
+                            error='No member with this email is enrolled')
+            elif change.action == Action.REMOVE:
+                tasks.append(functools.partial(
+                        self._send_roster_change, index, change, member,
+                        { '_method': 'delete' }))
+            elif member.get_role() == change.role:
+                results[index] = RosterChangeResult(change, Status.UNCHANGED,
+                                                    member=member)
+            else:
+                assert change.role is not None
+                tasks.append(functools.partial(
+                        self._send_roster_change, index, change, member,
+                        { '_method': 'patch',
+                          'course_membership[role]':
+                                  str(ROLE_CODES[change.role]) }))
+
+        requests_failed = False
+        for role, indices in adds.items():
+            role_changes = [changes[index] for index in indices]
+            accepted, error = self._add_members_bulk(role, role_changes,
+                                                     notify)
+            if accepted or error is not None:
+                status = Status.APPLIED if accepted else Status.FAILED
+                for index in indices:
+                    results[index] = RosterChangeResult(changes[index],
+                                                        status, error=error)
+                requests_failed |= not accepted
+                continue
+            for index in indices:
+                tasks.append(functools.partial(
+                        self._send_roster_change, index, changes[index],
+                        None, _add_member_form(changes[index], notify)))
+
+        for index, result in run_concurrently(tasks, max_workers):
+            results[index] = result
+            requests_failed |= result.status == Status.FAILED
+
+        applied = [result for result in results
+                   if result is not None and result.status == Status.APPLIED]
+        if any(result.change.action == Action.ADD for result in applied):
+            # New members' IDs are only known from the roster.
+            self._read_roster()
+            assert self._members is not None
+            by_email = { member.get_email().lower(): member
+                         for member in self._members }
+            for result in applied:
+                result.member = by_email.get(result.change.email.lower())
+        else:
+            removed = { id(result.member) for result in applied
+                        if result.change.action == Action.REMOVE }
+            self._members = [member for member in self._members or []
+                             if id(member) not in removed]
+            for result in applied:
+                if result.change.action == Action.REMOVE:
+                    result.member = None
+            if applied and self._client._store is not None:
+                self._client._store.save_roster(self.id, self._members)
+        if requests_failed and self._client._store is not None:
+            # A failed request may still have changed the roster, so the
+            # stored copy can no longer be trusted.
+            self._client._store.forget_roster(self.id)
+        return [result for result in results if result is not None]
+
+    def hydrate_all(self, *, max_workers: int=DEFAULT_MAX_WORKERS) \
+            -> Iterator[Assignment]:
+        """Loads every page of the course at once through a bounded thread
+        pool: the dashboard, the roster and the settings page of each
+        assignment. Afterwards, the course's getters and each assignment's
+        :meth:`Assignment.get_name` and :meth:`Assignment.get_type` answer
+        without a request. Assignments are yielded as their settings finish
+        loading. Raises an error if you are not an instructor of the course.
+
+        :param max_workers: The maximum number of pages to load at once.
+        :type max_workers: int
+        :returns: An iterator over the course's assignments.
+        :rtype: Iterator[Assignment]
+        """
+        def read_settings(assignment: Assignment) -> Optional[Assignment]:
+            assignment._read_settings()
+            return assignment
+
+        def read_course(read: Callable[[], None]) -> Optional[Assignment]:
+            read()
+            return None
+
+        assignments = self.get_assignments()
+        tasks = itertools.chain(
+                (functools.partial(read_course, self._read_dashboard),
+                 functools.partial(read_course, self._read_roster)),
+                (functools.partial(read_settings, assignment)
+                 for assignment in assignments))
+        for assignment in run_concurrently(tasks, max_workers):
+            if assignment is not None:
+                yield assignment
+
+    def _send_edits(self, edits: Dict[str, Any]) -> None:
+        """PATCHes the course with the edited settings, keyed by field name,
+        and updates the cached fields to match if the request succeeds.
+        """
+        data = { '_method': 'patch' }
+        if 'short_name' in edits:
+            data['course[shortname]'] = edits['short_name']
+        if 'name' in edits:
+            data['course[name]'] = edits['name']
+        if 'term' in edits:
+            data['course[term]'] = edits['term'].season.name.capitalize()
+            data['course[year]'] = str(edits['term'].year)
+        if 'description' in edits:
+            data['course[description]'] = edits['description']
+        client = page_loader(self._client, 'Editing the course')
+        res = client._post(endpoints.COURSE.substitute(course_id=self.id),
+                           data=data)
+
+        # On failure, forget the fields so the next read shows what the site
+        # actually has.
+        succeeded = res.status_code < 400
+        for key, value in edits.items():
+            setattr(self, f'_{key}', value if succeeded else None)
+        store = self._client._store
+        if store is not None:
+            if None in (self._short_name, self._name, self._term,
+                        self._description):
+                store.forget_course(self.id)
+            else:
+                store.save_course(self)
+
+    def _add_members_bulk(self, role: Member.Role,
+                          changes: List[RosterChange], notify: bool) \
+            -> Tuple[bool, Optional[str]]:
+        """Enrolls new members with the given role through the bulk roster
+        upload. Returns whether the upload was accepted, and the error if the
+        request failed without an answer from the site, in which case the
+        upload may still have been applied.
+        """
+        import requests
+
+        users = [{ 'name': change.name, 'email': change.email,
+                   'sid': change.sid or '' } for change in changes]
+        client = page_loader(self._client, 'Course.apply_roster_changes')
+        try:
+            res = client._post(
+                    endpoints.COURSE_MEMBERSHIP_MANY.substitute(
+                            course_id=self.id),
+                    data={
+                        'role': str(ROLE_CODES[role]),
+                        'users': json.dumps(users),
+                        'notify_by_email': '1' if notify else '0',
+                    })
+        except requests.RequestException as e:
+            return False, str(e)
+        return res.status_code < 400, None
+
+    def _send_roster_change(self, index: int, change: RosterChange,
+                            member: Optional[Member],
+                            data: Dict[str, str]) \
+            -> Tuple[int, RosterChangeResult]:
+        """Sends a single roster change: to the roster for a new member, or
+        to the existing member otherwise. Returns the index of the change
+        with its result, and updates the member's cached role on success.
+        """
+        import requests
+
+        Status = RosterChangeResult.Status
+        if member is None:
+            url = endpoints.COURSE_MEMBERSHIP.substitute(course_id=self.id)
+        else:
+            url = endpoints.COURSE_MEMBER.substitute(course_id=self.id,
+                                                     member_id=member.id)
+        client = page_loader(self._client, 'Course.apply_roster_changes')
+        try:
+            res = client._post(url, data=data)
+        except requests.RequestException as e:
+            return index, RosterChangeResult(change, Status.FAILED,
+                                             member=member, error=str(e))
+        if res.status_code >= 400:
+            return index, RosterChangeResult(
+                    change, Status.FAILED, member=member,
+                    error=f'Request failed with status {res.status_code}')
+        if member is not None and change.action != RosterChange.Action.REMOVE:
+            member._role = change.role
+        return index, RosterChangeResult(change, Status.APPLIED,
+                                         member=member)
+
+    def _load_stored_dashboard(self) -> None:
+        """Sets locally cached dashboard variables from the client's metadata
+        store, if it has fresh data.
+        """
+        store = self._client._store
+        if store is not None:
+            store.load_course(self)
+
+    def _load_stored_assignments(self) -> None:
+        """Sets the locally cached assignment list from the client's metadata
+        store, if it has a fresh one.
+        """
+        store = self._client._store
+        rows = store.load_assignment_list(self.id) \
+                if store is not None else None
+        if rows is None:
+            return
+        assignments: Dict[int, Assignment] = {}
+        for assignment_id, name, type_name in rows:
+            assignment = self._live_assignment(assignment_id)
+            assignment._name = name
+            if type_name is not None:
+                assignment._type = Assignment.Type[type_name]
+            assignments[assignment_id] = assignment
+        self._assignments = assignments
+
+    def _load_stored_roster(self) -> None:
+        """Sets the locally cached roster from the client's metadata store,
+        if it has a fresh one.
+        """
+        store = self._client._store
+        rows = store.load_roster(self.id) if store is not None else None
+        if rows is None:
+            return
+        members: List[Member] = []
+        for row in rows:
+            member = self._live_member(row[0])
+            member._apply_roster_row(_RosterRow(
+                    row[0], row[1], row[2], row[3], Member.Role[row[4]],
+                    row[5]))
+            members.append(member)
+        self._members = members
+
+    def _live_assignment(self, assignment_id: int) -> Assignment:
+        """Returns the client's live Assignment object with the ID in this
+        course, making one if there is none.
+        """
+        return self._client._identities.get_or_create(
+                Assignment, self.id, assignment_id,
+                factory=lambda: Assignment(id=assignment_id,
+                                           _client=self._client, _course=self))
+
+    def _live_member(self, member_id: int) -> Member:
+        """Returns the client's live Member object with the ID in this
+        course, making one if there is none.
+        """
+        return self._client._identities.get_or_create(
+                Member, self.id, member_id,
+                factory=lambda: Member(id=member_id, _client=self._client,
+                                       _course=self))
+
+    def _iter_roster_rows(self, chunk_size: int) -> Iterator[_RosterRow]:
+        """Streams the roster page, parsing it incrementally, and yields each
+        row as it completes. Parsed rows are freed straight away.
+        """
+        from lxml import etree
+
+        client = page_loader(self._client, 'Course.iter_members')
+        with client._get_stream(endpoints.COURSE_MEMBERSHIP.substitute(
+                course_id=self.id)) as res:
+            parser = etree.HTMLPullParser(events=('end',), tag='tr',
+                                          encoding=res.encoding)
+            for chunk in res.iter_content(chunk_size):
+                parser.feed(chunk)
+                for row in _completed_roster_rows(parser):
+                    yield _parse_roster_row(row)
+                    _discard_row(row)
+            parser.close()
+            for row in _completed_roster_rows(parser):
+                yield _parse_roster_row(row)
+                _discard_row(row)
+
+    def _read_assignments(self) -> None:
+        """Sets locally cached variables based on information available in the
+        course's assignment list. Existing Assignment objects are updated in
+        place and reused.
+        """
+        client = page_loader(self._client, 'Course.get_assignments',
+                             'get_assignments(course)')
+        res = client._get(endpoints.COURSE_ASSIGNMENTS.substitute(
+            course_id=self.id))
+        self._apply_assignments(res.html)
+
+    def _apply_assignments(self, html: lxml.html.HtmlElement) -> None:
+        """Sets locally cached variables from a parsed assignment list.
+
+        :param html: The parsed assignment list.
+        :type html: lxml.html.HtmlElement
+        """
+        # Read assignments from the HTML.
+        assignments: Dict[int, Assignment] = {}
+        anchor_elems = xpaths.ASSIGNMENT_LINKS(html)
+        for anchor_elem in anchor_elems:
+            href = anchor_elem.get('href')
+            name = xpaths.TEXT(anchor_elem)[0]
+            match = re.search('/assignments/(\d+)', href)
+            assert match is not None, \
+                    "Can't extract assignment ID from href"
+            assignment_id = int(match.groups(1)[0])
+            assignment = self._live_assignment(assignment_id)
+            assignment._name = name
+            assignments[assignment_id] = assignment
+        self._assignments = assignments
+
+        if self._client._store is not None:
+            self._client._store.save_assignment_list(self.id,
+                                                     assignments.values())
+
     def _read_dashboard(self) -> None:
         """Sets locally cached variables based on information available in the
         dashboard.
         """
         # Fetch dashboard.
-        res = self._client._get(endpoints.COURSE.substitute(course_id=self.id))
-        html = lxml.html.fromstring(res.text)
+        client = page_loader(self._client, 'Reading the course dashboard')
+        res = client._get(endpoints.COURSE.substitute(course_id=self.id))
+        self._apply_dashboard(res.html)
+
+    def _apply_dashboard(self, html: lxml.html.HtmlElement) -> None:
+        """Sets locally cached variables from a parsed dashboard.
 
+        :param html: The parsed dashboard.
+        :type html: lxml.html.HtmlElement
+        """
         # Read short name.
-        self._short_name = html.xpath('//*[contains(@class,"sidebar--title")]//text()')[0]
+        self._short_name = xpaths.DASHBOARD_SHORT_NAME(html)[0]
 
         # Read name.
-        self._name = html.xpath('//*[contains(@class,"sidebar--subtitle")]//text()')[0]
+        self._name = xpaths.DASHBOARD_NAME(html)[0]
 
         # Read term.
-        self._term = Term.parse(html.xpath('//*[contains(@class,"courseHeader--term")]//text()')[0])
+        self._term = Term.parse(xpaths.DASHBOARD_TERM(html)[0])
 
         # Read description.
-        descriptions = html.xpath('//*[contains(@class,"courseDashboard--panel-description")]'
-                                  '//p[not(contains(@class,"u-placeholderText"))]'
-                                  '/text()')
+        descriptions = xpaths.DASHBOARD_DESCRIPTIONS(html)
         self._description = '\n\n'.join(descriptions)
 
+        if self._client._store is not None:
+            self._client._store.save_course(self)
+
     def _read_roster(self) -> None:
         """Sets locally cached variables based on information available in the
-        course's roster page.
+        course's roster page. Existing Member objects are updated in place and
+        reused; members no longer on the roster are dropped.
         """
-        # Read roster table. All data can be found in the Edit button for each
-        # member in the roster, so we will use this.
-        res = self._client._get(endpoints.COURSE_MEMBERSHIP.substitute(
+        client = page_loader(self._client, 'Course.get_members',
+                             'get_members(course)')
+        res = client._get(endpoints.COURSE_MEMBERSHIP.substitute(
                 course_id=self.id))
-        html = lxml.html.fromstring(res.text)
-        rows = html.xpath(f'//tr[contains(@class,"rosterRow")]')
-        self._members = []
+        self._apply_roster(res.html)
+
+    def _apply_roster(self, html: lxml.html.HtmlElement) -> None:
+        """Sets locally cached variables from a parsed roster page.
+
+        :param html: The parsed roster page.
+        :type html: lxml.html.HtmlElement
+        """
+        rows = xpaths.ROSTER_ROWS(html)
+
+        members: List[Member] = []
         for row in rows:
-            elems = row.xpath(f'.//td')
-            edit_elem = row.xpath(f'.//*[@data-id]')[0]
-            cm_data = json.loads(edit_elem.xpath('@data-cm')[0])
-
-            member_id = int(edit_elem.xpath('@data-id')[0])
-            name = cm_data['full_name']
-            email = edit_elem.xpath('@data-email')[0]
-            sid = int(cm_data['sid']) if cm_data['sid'] != '' else -1
-            role_str = elems[2].xpath('//select//option[@selected="selected"]/text()')[0]
-            role = Member.Role[role_str.upper()]
-            active_canvas_elems = elems[4].xpath('//*[@data-sort="1"]')
-            _canvas_connected = len(active_canvas_elems) > 0
-
-            self._members.append(Member(id=member_id, _client=self._client,
-                                        _course=self, _name=name, _email=email,
-                                        _sid=sid, _role=role,
-                                        _canvas_connected=_canvas_connected))
+            roster_row = _parse_roster_row(row)
+            member = self._live_member(roster_row.id)
+            member._apply_roster_row(roster_row)
+            members.append(member)
+        self._members = members
+
+        if self._client._store is not None:
+            self._client._store.save_roster(self.id, members)
+
+def _member_hash(member: Member) -> int:
+    return hash((member._name, member._email, member._sid, member._role,
+                 member._canvas_connected))
+
+def _add_member_form(change: RosterChange, notify: bool) -> Dict[str, str]:
+    """Returns the roster form data that enrolls the new member."""
+    assert change.role is not None
+    return {
+        'user[name]': change.name or '',
+        'user[email]': change.email,
+        'user[sid]': change.sid or '',
+        'course_membership[role]': str(ROLE_CODES[change.role]),
+        'notify_by_email': '1' if notify else '0',
+    }
+
+def _completed_roster_rows(parser: etree.HTMLPullParser) \
+        -> Iterator[lxml.html.HtmlElement]:
+    """Yields the roster rows the pull parser has finished since it was last
+    read. Other table rows are discarded.
+    """
+    for _, row in parser.read_events():
+        if 'rosterRow' in (row.get('class') or ''):
+            yield row
+        else:
+            _discard_row(row)
+
+def _discard_row(row: lxml.html.HtmlElement) -> None:
+    """Frees a parsed row along with any siblings before it, so the partially
+    built tree does not grow with the page.
+    """
+    row.clear()
+    parent = row.getparent()
+    if parent is not None:
+        while row.getprevious() is not None:
+            del parent[0]
@@ -1,3 +1,4 @@
+import re
 import string
 
 BASE = 'https://www.gradescope.com'
@@ -9,7 +10,41 @@ LOGOUT = f'{BASE}/logout'
 COURSE = string.Template(f'{BASE}/courses/${{course_id}}')
 COURSE_ASSIGNMENTS = string.Template(f'{COURSE.template}/assignments')
 COURSE_MEMBERSHIP = string.Template(f'{COURSE.template}/memberships')
+COURSE_MEMBERSHIP_MANY = string.Template(f'{COURSE_MEMBERSHIP.template}/many')
+COURSE_MEMBER = string.Template(f'{COURSE_MEMBERSHIP.template}/${{member_id}}')
 COURSE_EDIT = string.Template(f'{COURSE.template}/edit')
 
 ASSIGNMENT = string.Template(f'{COURSE_ASSIGNMENTS.template}/${{assignment_id}}')
 ASSIGNMENT_EDIT = string.Template(f'{ASSIGNMENT.template}/edit')
+
+# Endpoint names to URL patterns, most specific first.
+_PATTERNS = [
+    (name, re.compile(re.escape(template.template)
+                      .replace(re.escape('${course_id}'), r'\d+')
+                      .replace(re.escape('${assignment_id}'), r'\d+')
+                      .replace(re.escape('${member_id}'), r'\d+')
+                      + r'/?'))
+    for name, template in (
+        ('ASSIGNMENT_EDIT', ASSIGNMENT_EDIT),
+        ('ASSIGNMENT', ASSIGNMENT),
+        ('COURSE_EDIT', COURSE_EDIT),
+        ('COURSE_MEMBERSHIP_MANY', COURSE_MEMBERSHIP_MANY),
+        ('COURSE_MEMBER', COURSE_MEMBER),
+        ('COURSE_MEMBERSHIP', COURSE_MEMBERSHIP),
+        ('COURSE_ASSIGNMENTS', COURSE_ASSIGNMENTS),
+        ('COURSE', COURSE),
+        ('LOGIN', string.Template(LOGIN)),
+        ('LOGOUT', string.Template(LOGOUT)),
+        ('HOME', string.Template(HOME)),
+    )
+]
+
+def name_of(url: str) -> str:
+    """Returns the name of the endpoint in this module that the URL belongs to
+    (e.g. 'COURSE_MEMBERSHIP'), or 'OTHER' if none matches.
+    """
+    url = url.split('?', 1)[0]
+    for name, pattern in _PATTERNS:
+        if pattern.fullmatch(url):
+            return name
+    return 'OTHER'
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Hashable, Tuple, TypeVar
+import weakref
+
+T = TypeVar('T')
+
+class IdentityMap:
+    """Keeps at most one live object per identity, so that every lookup of a
+    course, assignment or member through a client returns the same object,
+    and its cached fields are shared. Objects are held weakly; once nothing
+    else refers to one, it is dropped and the next lookup makes a new one.
+    Safe to share between threads.
+    """
+
+    def __init__(self) -> None:
+        self._objects: weakref.WeakValueDictionary[Tuple[Hashable, ...],
+                                                   Any] = \
+                weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, cls: Callable[..., T], *ids: Hashable,
+                      factory: Callable[[], T]) -> T:
+        """Returns the live object of the type with the IDs, calling factory
+        to make it if there is none.
+
+        :param cls: The type of the object.
+        :type cls: type
+        :param ids: The IDs identifying the object among those of its type.
+        :type ids: Hashable
+        :param factory: Makes the object.
+        :type factory: Callable[[], T]
+        :returns: The object.
+        :rtype: T
+        """
+        key = (cls, *ids)
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is None:
+                obj = factory()
+                self._objects[key] = obj
+            return obj
+
+    def __len__(self) -> int:
+        return len(self._objects)
@@ -3,16 +3,18 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 import enum
 import json
-from typing import Optional, TYPE_CHECKING
+from typing import NamedTuple, Optional, TYPE_CHECKING
 
-import lxml.html
-
-from . import endpoints
+from . import xpaths
+from .slots import with_slots
 
 if TYPE_CHECKING:
-    from .client import Client
+    import lxml.html
+
     from .course import Course
+    from .protocol import ClientProtocol
 
+@with_slots
 @dataclass
 class Member:
     class Role(enum.Enum):
@@ -22,7 +24,7 @@ class Member:
         STUDENT = enum.auto()
 
     id: int
-    _client: Client = field(repr=False, hash=False, compare=False)
+    _client: ClientProtocol = field(repr=False, hash=False, compare=False)
     _course: Course = field(repr=False, hash=False, compare=False)
 
     _name: Optional[str] = field(default=None, repr=False, hash=False,
@@ -95,30 +97,65 @@ class Member:
 
     def _read_roster(self) -> None:
         """Sets locally cached variables based on information available in the
-        course's roster page.
+        course's roster page. The whole roster is read at once, so every member
+        of the course is refreshed by the same request.
+        """
+        self._course._read_roster()
+
+        # If this object is not part of the course's roster snapshot, copy the
+        # freshly read data over from the member with the same ID.
+        assert self._course._members is not None, \
+                'Error getting members from roster'
+        for member in self._course._members:
+            if member.id == self.id and member is not self:
+                self._name = member._name
+                self._email = member._email
+                self._sid = member._sid
+                self._role = member._role
+                self._canvas_connected = member._canvas_connected
+                break
+
+    def _apply_roster_row(self, row: _RosterRow) -> None:
+        """Sets locally cached variables from a parsed roster row.
+
+        :param row: The parsed roster row for this member.
+        :type row: _RosterRow
         """
-        # Read roster table. All data can be found in the Edit button for each
-        # member in the roster, so we will use this.
-        res = self._client._get(endpoints.COURSE_MEMBERSHIP.substitute(
-                course_id=self._course.id))
-        html = lxml.html.fromstring(res.text)
-        elems = html.xpath(f'//tr[contains(@class,"rosterRow") and .//@data-id="{self.id}"]//td')
-        edit_elem = html.xpath(f'//tr[contains(@class,"rosterRow")]//*[@data-id="{self.id}"]')[0]
-        cm_data = json.loads(edit_elem.xpath('@data-cm')[0])
-
-        # Get name.
-        self._name = cm_data['full_name']
-
-        # Get email.
-        self._email = edit_elem.xpath('@data-email')[0]
-
-        # Get SID.
-        self._sid = int(cm_data['sid']) if cm_data['sid'] != '' else -1
-
-        # Get role.
-        role_str = elems[2].xpath('//select//option[@selected="selected"]/text()')
-        self._role = Member.Role[role_str.upper()]
-
-        # Get Canvas link.
-        active_canvas_elems = elems[4].xpath('//*[@data-sort="1"]')
-        self._canvas_connected = len(active_canvas_elems) > 0
+        self._name = row.name
+        self._email = row.email
+        self._sid = row.sid
+        self._role = row.role
+        self._canvas_connected = row.canvas_connected
+
+class _RosterRow(NamedTuple):
+    id: int
+    name: str
+    email: str
+    sid: int
+    role: Member.Role
+    canvas_connected: bool
+
+def _parse_roster_row(row: lxml.html.HtmlElement) -> _RosterRow:
+    """Parses a row of the course roster table. All data can be found in the
+    Edit button for each member in the roster, apart from the role and Canvas
+    link columns.
+
+    :param row: The <tr> element of the roster row.
+    :type row: lxml.html.HtmlElement
+    :returns: The parsed row.
+    :rtype: _RosterRow
+    """
+    elems = xpaths.ROSTER_ROW_CELLS(row)
+    edit_elem = xpaths.ROSTER_ROW_EDIT_BUTTON(row)[0]
+    cm_data = json.loads(edit_elem.get('data-cm'))
+
+    member_id = int(edit_elem.get('data-id'))
+    name = cm_data['full_name']
+    email = edit_elem.get('data-email')
+    sid = int(cm_data['sid']) if cm_data['sid'] != '' else -1
+    role_str = xpaths.ROSTER_CELL_ROLE(elems[2])[0]
+    role = Member.Role[role_str.upper()]
+    active_canvas_elems = xpaths.ROSTER_CELL_CANVAS_ACTIVE(elems[4])
+    canvas_connected = len(active_canvas_elems) > 0
+
+    return _RosterRow(member_id, name, email, sid, role, canvas_connected)
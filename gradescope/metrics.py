@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass, field
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# Histogram bucket upper bounds.
+TIME_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                                   1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS: Tuple[float, ...] = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+@dataclass
+class RequestEvent:
+    """Fired after every request the client makes, including ones answered
+    from the response cache.
+    """
+    method: str
+    url: str
+    # The name of the matching URL template in endpoints, e.g. 'COURSE'.
+    endpoint: str
+    status: int
+    # The size of the response body in bytes.
+    bytes: int
+    # Seconds spent waiting on the network, including retries and backoff.
+    # Zero for cache hits.
+    network_time: float
+    # 'hit', 'revalidated' or 'miss' if the response cache was consulted, None
+    # otherwise.
+    cache: Optional[str]
+    # The number of times the request was retried.
+    retries: int
+    # Whether the request was not sent, but shared the response of an
+    # identical request already in flight.
+    coalesced: bool = False
+    # The size of the response body as transferred, which is smaller than
+    # bytes if it was compressed. Zero if nothing was transferred.
+    wire_bytes: int = 0
+
+@dataclass
+class ParseEvent:
+    """Fired when a response body is parsed into an HTML tree. Parsing is
+    lazy, so this fires after the RequestEvent for the same response, and not
+    at all for responses nobody parses.
+    """
+    url: str
+    endpoint: str
+    bytes: int
+    # Seconds spent parsing.
+    parse_time: float
+
+Event = Union[RequestEvent, ParseEvent]
+Hook = Callable[[Event], None]
+
+@dataclass
+class Histogram:
+    buckets: Tuple[float, ...]
+    counts: List[int] = field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Returns (upper bound, count) pairs in OpenMetrics form, where each
+        count includes every smaller bucket.
+        """
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append(('+Inf' if bound == float('inf') else repr(bound),
+                          total))
+        return pairs
+
+@dataclass
+class EndpointMetrics:
+    requests: int = 0
+    retries: int = 0
+    coalesced: int = 0
+    # Total bytes transferred, before decompression.
+    wire_bytes: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+    cache: Dict[str, int] = field(default_factory=dict)
+    network_time: Histogram = field(
+            default_factory=lambda: Histogram(TIME_BUCKETS))
+    parse_time: Histogram = field(
+            default_factory=lambda: Histogram(TIME_BUCKETS))
+    bytes: Histogram = field(default_factory=lambda: Histogram(SIZE_BUCKETS))
+
+class MetricsAggregator:
+    """A hook that aggregates events into per-endpoint counters and histograms
+    of network time, parse time and response size. Register it with
+    Client.add_hook, or use Client.profile for a scoped one. Safe to share
+    between threads.
+    """
+
+    def __init__(self) -> None:
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            metrics = self.endpoints.get(event.endpoint)
+            if metrics is None:
+                metrics = EndpointMetrics()
+                self.endpoints[event.endpoint] = metrics
+            if isinstance(event, RequestEvent):
+                metrics.requests += 1
+                metrics.retries += event.retries
+                metrics.statuses[event.status] = \
+                        metrics.statuses.get(event.status, 0) + 1
+                if event.cache is not None:
+                    metrics.cache[event.cache] = \
+                            metrics.cache.get(event.cache, 0) + 1
+                if event.coalesced:
+                    metrics.coalesced += 1
+                elif event.cache != 'hit':
+                    metrics.network_time.observe(event.network_time)
+                    metrics.bytes.observe(event.bytes)
+                    metrics.wire_bytes += event.wire_bytes
+            else:
+                metrics.parse_time.observe(event.parse_time)
+
+    def report(self) -> str:
+        """Returns a human-readable summary, one line per endpoint."""
+        lines = []
+        with self._lock:
+            for endpoint, metrics in sorted(self.endpoints.items()):
+                network = metrics.network_time
+                parse = metrics.parse_time
+                line = (f'{endpoint}: {metrics.requests} requests, '
+                        f'{metrics.retries} retries, '
+                        f'network {network.sum:.3f}s, '
+                        f'parse {parse.sum:.3f}s over {parse.count} parses, '
+                        f'{int(metrics.bytes.sum)} bytes '
+                        f'({metrics.wire_bytes} on the wire)')
+                if metrics.coalesced:
+                    line += f', {metrics.coalesced} coalesced'
+                if metrics.cache:
+                    line += ', cache ' + ', '.join(
+                            f'{state}={count}'
+                            for state, count in sorted(metrics.cache.items()))
+                lines.append(line)
+        return '\n'.join(lines)
+
+    def to_openmetrics(self, prefix: str='gradescope') -> str:
+        """Returns the metrics in the Prometheus/OpenMetrics text exposition
+        format.
+
+        :param prefix: Prepended to every metric name.
+        :type prefix: str
+        :returns: The exposition text, ending in '# EOF'.
+        :rtype: str
+        """
+        lines: List[str] = []
+        with self._lock:
+            items = sorted(self.endpoints.items())
+
+            lines.append(f'# TYPE {prefix}_requests counter')
+            for endpoint, metrics in items:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",'
+                                 f'status="{status}"}} {count}')
+            lines.append(f'# TYPE {prefix}_retries counter')
+            for endpoint, metrics in items:
+                lines.append(f'{prefix}_retries_total{{endpoint="{endpoint}"}} '
+                             f'{metrics.retries}')
+            lines.append(f'# TYPE {prefix}_coalesced counter')
+            for endpoint, metrics in items:
+                lines.append(f'{prefix}_coalesced_total{{endpoint="{endpoint}"}} '
+                             f'{metrics.coalesced}')
+            lines.append(f'# TYPE {prefix}_wire_bytes counter')
+            for endpoint, metrics in items:
+                lines.append(f'{prefix}_wire_bytes_total{{endpoint="{endpoint}"}} '
+                             f'{metrics.wire_bytes}')
+            lines.append(f'# TYPE {prefix}_cache_lookups counter')
+            for endpoint, metrics in items:
+                for state, count in sorted(metrics.cache.items()):
+                    lines.append(f'{prefix}_cache_lookups_total{{endpoint="{endpoint}",'
+                                 f'result="{state}"}} {count}')
+            for name, unit, attr in (('network', 'seconds', 'network_time'),
+                                     ('parse', 'seconds', 'parse_time'),
+                                     ('response', 'bytes', 'bytes')):
+                metric = f'{prefix}_{name}_{unit}'
+                lines.append(f'# TYPE {metric} histogram')
+                lines.append(f'# UNIT {metric} {unit}')
+                for endpoint, metrics in items:
+                    histogram: Histogram = getattr(metrics, attr)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{endpoint="{endpoint}",'
+                                     f'le="{bound}"}} {count}')
+                    lines.append(f'{metric}_count{{endpoint="{endpoint}"}} '
+                                 f'{histogram.count}')
+                    lines.append(f'{metric}_sum{{endpoint="{endpoint}"}} '
+                                 f'{histogram.sum}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
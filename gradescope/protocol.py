@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Optional, Protocol, TYPE_CHECKING
+
+from .error import GSInvalidRequestException
+
+if TYPE_CHECKING:
+    from .client import Client
+    from .identity import IdentityMap
+    from .store import MetadataStore
+
+class ClientProtocol(Protocol):
+    """What the Course, Assignment and Member objects need from the client
+    that made them in order to parse pages: its identity map and metadata
+    store. Both Client and AsyncClient provide these.
+
+    Loading a page is not part of it, since only Client can do that
+    synchronously. Code that loads a page gets the client through
+    page_loader.
+    """
+    _identities: IdentityMap
+    _store: Optional[MetadataStore]
+
+def page_loader(client: ClientProtocol, what: str,
+                instead: Optional[str]=None) -> Client:
+    """Returns the client for a synchronous page load, or raises an error if
+    it is an AsyncClient, whose page loads must be awaited through its own
+    methods.
+
+    :param client: The client the object belongs to.
+    :type client: ClientProtocol
+    :param what: The method or property loading the page, for the error.
+    :type what: str
+    :param instead: The AsyncClient method that loads the same page, if any.
+    :type instead: Optional[str]
+    :returns: The client.
+    :rtype: Client
+    """
+    from .client import Client
+
+    if not isinstance(client, Client):
+        message = f'{what} needs a page load, which AsyncClient cannot make ' \
+                  'synchronously'
+        if instead is not None:
+            message += f'; await AsyncClient.{instead} first'
+        raise GSInvalidRequestException(message)
+    return client
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from collections import defaultdict, deque
+import http.client
+import io
+import json
+import os
+import threading
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Tuple
+
+import requests
+import requests.adapters
+from requests.structures import CaseInsensitiveDict
+import urllib3
+
+# Headers whose values are secrets and are replaced when recording.
+_REDACTED_HEADERS = frozenset({ 'set-cookie' })
+_REDACTED = 'REDACTED'
+# Headers describing the encoding on the wire, which no longer apply to the
+# decoded body that is recorded.
+_DROPPED_HEADERS = frozenset({ 'content-encoding', 'content-length',
+                               'transfer-encoding' })
+_INDEX_FILE = 'index.json'
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    """A transport adapter that sends requests as usual and records every
+    response into a cassette directory, for later use with ReplayAdapter.
+    Cookie values in Set-Cookie headers are redacted; request bodies (which
+    include the login password) are never recorded.
+
+    Pass it to Client as the adapter argument.
+    """
+
+    def __init__(self, directory: str, **kwargs: Any) -> None:
+        """Constructs a recording adapter.
+
+        :param directory: The cassette directory. Created if missing; an
+        existing recording in it is replaced.
+        :type directory: str
+        """
+        super().__init__(**kwargs)
+        self.directory = directory
+        self._entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, request: requests.PreparedRequest,
+             **kwargs: Any) -> requests.Response:
+        res = super().send(request, **kwargs)
+        content = res.content
+        headers = {}
+        for name, value in res.headers.items():
+            if name.lower() in _DROPPED_HEADERS:
+                continue
+            if name.lower() in _REDACTED_HEADERS:
+                cookie_name = value.split('=', 1)[0]
+                value = f'{cookie_name}={_REDACTED}; path=/'
+            headers[name] = value
+
+        with self._lock:
+            body_file = f'{len(self._entries):05}.body'
+            with open(os.path.join(self.directory, body_file), 'wb') as f:
+                f.write(content)
+            self._entries.append({
+                'method': request.method,
+                'url': request.url,
+                'status': res.status_code,
+                'headers': headers,
+                'body_file': body_file,
+            })
+            with open(os.path.join(self.directory, _INDEX_FILE), 'w') as f:
+                json.dump(self._entries, f, indent=1)
+        return res
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """A transport adapter that answers requests from a cassette recorded by
+    RecordingAdapter, without touching the network. Responses to the same
+    method and URL are replayed in recorded order, and the last one is
+    repeated once they run out. A request that was never recorded raises
+    requests.RequestException.
+
+    Pass it to Client as the adapter argument.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Loads a cassette.
+
+        :param directory: The cassette directory.
+        :type directory: str
+        """
+        super().__init__()
+        self.directory = directory
+        self._responses: Dict[Tuple[str, str],
+                              Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._lock = threading.Lock()
+        with open(os.path.join(directory, _INDEX_FILE)) as f:
+            for entry in json.load(f):
+                self._responses[entry['method'], entry['url']].append(entry)
+
+    def send(self, request: requests.PreparedRequest,
+             **kwargs: Any) -> requests.Response:
+        key = (str(request.method), str(request.url))
+        with self._lock:
+            queue = self._responses.get(key)
+            if not queue:
+                raise requests.RequestException(
+                        f'No recorded response for {key[0]} {key[1]}',
+                        request=request)
+            entry = queue[0] if len(queue) == 1 else queue.popleft()
+        with open(os.path.join(self.directory, entry['body_file']), 'rb') as f:
+            content = f.read()
+        return build_response(request, entry['status'], entry['headers'],
+                              content)
+
+    def close(self) -> None:
+        pass
+
+def build_response(request: requests.PreparedRequest, status: int,
+                   headers: Dict[str, str],
+                   content: bytes) -> requests.Response:
+    """Builds a requests.Response as if it came off the network, including the
+    raw response requests reads Set-Cookie headers from.
+
+    :param request: The request being answered.
+    :type request: requests.PreparedRequest
+    :param status: The status code.
+    :type status: int
+    :param headers: The response headers.
+    :type headers: dict[str, str]
+    :param content: The response body.
+    :type content: bytes
+    :returns: The response.
+    :rtype: requests.Response
+    """
+    message = http.client.HTTPMessage()
+    for name, value in headers.items():
+        message[name] = value
+    raw = urllib3.HTTPResponse(body=io.BytesIO(content), headers=headers,
+                               status=status, preload_content=False,
+                               decode_content=False)
+    raw._original_response = SimpleNamespace( # type: ignore
+            msg=message, isclosed=lambda: False)
+
+    res = requests.Response()
+    res.status_code = status
+    res.headers = CaseInsensitiveDict(headers)
+    res.raw = raw
+    res.url = str(request.url)
+    res.request = request
+    res.encoding = requests.utils.get_encoding_from_headers(res.headers)
+    res.reason = http.client.responses.get(status, '')
+    return res
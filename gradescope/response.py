@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import html as htmllib
+import importlib.util
+import re
+import threading
+import time
+from types import TracebackType
+from typing import Any, Callable, Iterator, Mapping, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import lxml.html
+    import requests
+
+# Matches a single <meta> tag. Attribute values may not contain '>', which
+# holds for the CSRF meta tag Rails emits.
+_META_RE = re.compile(rb'<meta\s[^>]*>', re.IGNORECASE)
+_ATTR_RE = re.compile(rb'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+_HEAD_END = b'</head>'
+_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+# Each thread's HTML parsers, by encoding. lxml parsers must not be used by
+# two threads at once.
+_parsers = threading.local()
+
+def accept_encoding() -> str:
+    """Returns an Accept-Encoding header value naming every content coding
+    the HTTP stack can undo: gzip and deflate always, and Brotli when the
+    brotli or brotlicffi package is installed.
+
+    :returns: The header value.
+    :rtype: str
+    """
+    codings = ['gzip', 'deflate']
+    if any(importlib.util.find_spec(name) is not None
+           for name in ('brotli', 'brotlicffi')):
+        codings.append('br')
+    return ', '.join(codings)
+
+def declared_encoding(headers: Mapping[str, str]) -> Optional[str]:
+    """Returns the charset the Content-Type header declares, if any. Unlike
+    requests, this does not assume ISO-8859-1 for text without one, so that
+    the parser can read the encoding from the page's <meta> tag instead.
+
+    :param headers: The response headers.
+    :type headers: Mapping[str, str]
+    :returns: The declared encoding, if any.
+    :rtype: Optional[str]
+    """
+    match = _CHARSET_RE.search(headers.get('Content-Type', ''))
+    return match.group(1) if match is not None else None
+
+def _html_parser(encoding: Optional[str]) -> Any:
+    """Returns the calling thread's HTML parser for bytes in the encoding,
+    or None to let lxml detect the encoding.
+    """
+    if encoding is None:
+        return None
+    parsers = getattr(_parsers, 'by_encoding', None)
+    if parsers is None:
+        parsers = _parsers.by_encoding = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        import lxml.html
+
+        try:
+            parser = lxml.html.HTMLParser(encoding=encoding)
+        except LookupError:
+            # An encoding lxml does not know; fall back to detecting it.
+            return None
+        parsers[encoding] = parser
+    return parser
+
+def scan_csrf_token(content: bytes) -> Optional[str]:
+    """Scans the <head> of an HTML document for the CSRF token without building
+    a DOM. Only the bytes before the closing </head> tag are examined.
+
+    :param content: The raw HTML document (or a prefix of it).
+    :type content: bytes
+    :returns: The CSRF token, if one is present.
+    :rtype: Optional[str]
+    """
+    head_end = content.find(_HEAD_END)
+    if head_end == -1:
+        # Malformed or truncated document; fall back to scanning it all.
+        head_end = len(content)
+    for meta_match in _META_RE.finditer(content, 0, head_end):
+        attrs = {}
+        for attr_match in _ATTR_RE.finditer(meta_match.group(0)):
+            value = next(v for v in attr_match.groups()[1:] if v is not None)
+            attrs[attr_match.group(1).lower()] = value
+        if attrs.get(b'name') == b'csrf-token' and b'content' in attrs:
+            return htmllib.unescape(attrs[b'content'].decode('utf-8',
+                                                             'replace'))
+    return None
+
+class Response:
+    """An HTTP response whose body is decoded and parsed at most once. The
+    parsed HTML tree is built lazily on first access to :attr:`html` and
+    cached, so every caller reading the same response shares one tree. The
+    raw bytes are handed to lxml directly, without decoding them to a str
+    first.
+    """
+
+    def __init__(self, status_code: int, headers: Mapping[str, str], url: str,
+                 content: bytes, encoding: Optional[str]=None) -> None:
+        """Constructs a response.
+
+        :param status_code: The HTTP status code.
+        :type status_code: int
+        :param headers: The response headers.
+        :type headers: Mapping[str, str]
+        :param url: The final URL of the response.
+        :type url: str
+        :param content: The raw response body.
+        :type content: bytes
+        :param encoding: The declared character encoding of the body, if any.
+        :type encoding: Optional[str]
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        # Seconds spent waiting on the network, and the number of retries it
+        # took, as measured by the client that made the request.
+        self.network_time = 0.0
+        self.retries = 0
+        # The size of the body as transferred, before any Content-Encoding
+        # was undone.
+        self.wire_bytes = len(content)
+
+        self._text: Optional[str] = None
+        self._html: Optional[lxml.html.HtmlElement] = None
+        # Responses may be shared between threads, which must not parse the
+        # body more than once.
+        self._parse_lock = threading.Lock()
+        self._on_parse: Optional[Callable[[Response, float], None]] = None
+
+    @staticmethod
+    def from_requests(res: requests.Response) -> Response:
+        """Wraps a response returned by requests.
+
+        :param res: The response.
+        :type res: requests.Response
+        :returns: The wrapped response.
+        :rtype: Response
+        """
+        response = Response(res.status_code, res.headers, res.url,
+                            res.content, declared_encoding(res.headers))
+        try:
+            response.wire_bytes = res.raw.tell()
+        except (AttributeError, OSError):
+            pass
+        return response
+
+    @property
+    def is_html(self) -> bool:
+        """Whether the response declares an HTML body."""
+        return self.headers.get('Content-Type', '').startswith('text/html')
+
+    @property
+    def text(self) -> str:
+        """The body decoded as text."""
+        if self._text is None:
+            self._text = self.content.decode(self.encoding or 'utf-8',
+                                             'replace')
+        return self._text
+
+    @property
+    def html(self) -> lxml.html.HtmlElement:
+        """The body parsed as an HTML tree. Parsed on first access only."""
+        if self._html is None:
+            with self._parse_lock:
+                if self._html is None:
+                    self._parse()
+        return self._html # type: ignore
+
+    def _parse(self) -> None:
+        import lxml.html
+
+        parser = _html_parser(self.encoding)
+        if self._on_parse is None:
+            self._html = lxml.html.fromstring(self.content, parser=parser)
+        else:
+            start = time.perf_counter()
+            self._html = lxml.html.fromstring(self.content, parser=parser)
+            self._on_parse(self, time.perf_counter() - start)
+
+    @property
+    def csrf_token(self) -> Optional[str]:
+        """The CSRF token in the page's <head>, if the response is HTML and
+        has one.
+        """
+        if not self.is_html:
+            return None
+        return scan_csrf_token(self.content)
+
+class StreamedResponse:
+    """An HTTP response whose body has not been read yet. The body is consumed
+    chunk by chunk through :meth:`iter_content`, so it is never held in memory
+    as a whole. The CSRF token is scanned out of the <head> as the first
+    chunks go by.
+    """
+
+    # Stop looking for the CSRF token if the <head> is longer than this.
+    _MAX_HEAD_SIZE = 256 * 1024
+
+    def __init__(self, res: requests.Response,
+                 on_csrf_token: Callable[[str], None]) -> None:
+        """Wraps a response requested with stream=True.
+
+        :param res: The unread response.
+        :type res: requests.Response
+        :param on_csrf_token: Called with the CSRF token once it is found.
+        :type on_csrf_token: Callable[[str], None]
+        """
+        self._res = res
+        self._on_csrf_token = on_csrf_token
+
+        self.status_code = res.status_code
+        self.headers = res.headers
+        self.url = res.url
+        self.encoding = declared_encoding(res.headers)
+
+    @property
+    def is_html(self) -> bool:
+        """Whether the response declares an HTML body."""
+        return self.headers.get('Content-Type', '').startswith('text/html')
+
+    def iter_content(self, chunk_size: int=64 * 1024) -> Iterator[bytes]:
+        """Yields the body in chunks of raw bytes.
+
+        :param chunk_size: The maximum size of each chunk.
+        :type chunk_size: int
+        :returns: An iterator over the body.
+        :rtype: Iterator[bytes]
+        """
+        head: Optional[bytearray] = bytearray() if self.is_html else None
+        for chunk in self._res.iter_content(chunk_size):
+            if head is not None:
+                head += chunk
+                if _HEAD_END in head or len(head) > self._MAX_HEAD_SIZE:
+                    token = scan_csrf_token(bytes(head))
+                    if token is not None:
+                        self._on_csrf_token(token)
+                    head = None
+            yield chunk
+
+    def close(self) -> None:
+        """Releases the connection, discarding any unread body."""
+        self._res.close()
+
+    def __enter__(self) -> StreamedResponse:
+        return self
+
+    def __exit__(self, exc_type: Optional[Exception], exc_val: Any,
+                 exc_tb: Optional[TracebackType]) -> None:
+        self.close()
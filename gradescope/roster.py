@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+import enum
+from typing import Dict, Iterator, List, Optional, TYPE_CHECKING
+
+from .member import Member, _RosterRow
+
+if TYPE_CHECKING:
+    from .course import Course
+
+# The role codes the roster forms submit.
+ROLE_CODES: Dict[Member.Role, int] = {
+    Member.Role.STUDENT: 0,
+    Member.Role.INSTRUCTOR: 1,
+    Member.Role.TA: 2,
+    Member.Role.READER: 3,
+}
+
+_ROLES_BY_CODE: Dict[int, Member.Role] = {
+    code: role for role, code in ROLE_CODES.items()
+}
+
+class Roster:
+    """A course roster stored column by column: IDs and SIDs in integer
+    arrays, roles and Canvas links one byte each, and names and emails in
+    lists. This takes a fraction of the memory of a list of Member objects.
+    Indexing or iterating looks up the course's live Member objects on demand
+    and updates them from the roster, as Course.iter_members does; the roster
+    does not keep them. Get one from Course.fetch_roster.
+    """
+
+    def __init__(self, course: Course) -> None:
+        self._course = course
+        self.ids = array('q')
+        # -1 where the member has no SID.
+        self.sids = array('q')
+        self.names: List[str] = []
+        self.emails: List[str] = []
+        # ROLE_CODES of each member's role.
+        self.role_codes = bytearray()
+        self.canvas_connected = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> Member:
+        member = self._course._live_member(self.ids[index])
+        member._apply_roster_row(_RosterRow(
+                self.ids[index], self.names[index], self.emails[index],
+                self.sids[index], _ROLES_BY_CODE[self.role_codes[index]],
+                bool(self.canvas_connected[index])))
+        return member
+
+    def __iter__(self) -> Iterator[Member]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def find(self, member_id: int) -> Optional[Member]:
+        """Returns the member with the ID, if they are on the roster.
+
+        :param member_id: The ID of the member.
+        :type member_id: int
+        :rtype: Optional[Member]
+        """
+        try:
+            return self[self.ids.index(member_id)]
+        except ValueError:
+            return None
+
+    def count(self, role: Member.Role) -> int:
+        """Returns the number of members with the role.
+
+        :param role: The role.
+        :type role: Member.Role
+        :rtype: int
+        """
+        return self.role_codes.count(ROLE_CODES[role])
+
+    def append(self, row: _RosterRow) -> None:
+        self.ids.append(row.id)
+        self.sids.append(row.sid)
+        self.names.append(row.name)
+        self.emails.append(row.email)
+        self.role_codes.append(ROLE_CODES[row.role])
+        self.canvas_connected.append(row.canvas_connected)
+
+@dataclass(frozen=True)
+class RosterChange:
+    """A change to a course's enrollment, for Course.apply_roster_changes.
+    Members are identified by email, which is unique within a course. Build
+    changes with add, remove and set_role.
+    """
+    class Action(enum.Enum):
+        ADD = enum.auto()
+        REMOVE = enum.auto()
+        SET_ROLE = enum.auto()
+
+    action: RosterChange.Action
+    email: str
+    name: Optional[str] = None
+    sid: Optional[str] = None
+    role: Optional[Member.Role] = None
+
+    @staticmethod
+    def add(email: str, name: str, role: Member.Role=Member.Role.STUDENT,
+            sid: Optional[str]=None) -> RosterChange:
+        """Enrolls a new member. If someone with the email is already
+        enrolled, only their role is changed to match.
+
+        :param email: The member's email.
+        :type email: str
+        :param name: The member's full name.
+        :type name: str
+        :param role: The member's role.
+        :type role: Member.Role
+        :param sid: The member's student ID, if any.
+        :type sid: Optional[str]
+        :rtype: RosterChange
+        """
+        return RosterChange(RosterChange.Action.ADD, email, name=name,
+                            sid=sid, role=role)
+
+    @staticmethod
+    def remove(email: str) -> RosterChange:
+        """Unenrolls the member with the email.
+
+        :param email: The member's email.
+        :type email: str
+        :rtype: RosterChange
+        """
+        return RosterChange(RosterChange.Action.REMOVE, email)
+
+    @staticmethod
+    def set_role(email: str, role: Member.Role) -> RosterChange:
+        """Changes the role of the member with the email.
+
+        :param email: The member's email.
+        :type email: str
+        :param role: The new role.
+        :type role: Member.Role
+        :rtype: RosterChange
+        """
+        return RosterChange(RosterChange.Action.SET_ROLE, email, role=role)
+
+@dataclass
+class RosterChangeResult:
+    """What happened to one RosterChange."""
+    class Status(enum.Enum):
+        """The change was made."""
+        APPLIED = enum.auto()
+        """The roster already matched, so nothing was sent."""
+        UNCHANGED = enum.auto()
+        """The site rejected the change, or it named a member who is not
+        enrolled."""
+        FAILED = enum.auto()
+
+    change: RosterChange
+    status: RosterChangeResult.Status
+    # The affected member, if they are on the roster after the change.
+    member: Optional[Member] = None
+    # Why the change failed.
+    error: Optional[str] = None
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import datetime
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Optional
+import urllib.parse
+
+import requests
+import urllib3.exceptions
+
+# Statuses worth retrying. 429 and 503 mean the server turned the request
+# away without acting on it; the 5xx gateway errors may or may not have
+# reached the application.
+RETRY_STATUSES: FrozenSet[int] = frozenset({ 429, 500, 502, 503, 504 })
+_NOT_PROCESSED_STATUSES: FrozenSet[int] = frozenset({ 429, 503 })
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Blocks until a token is available and takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens
+                                   + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class RequestScheduler:
+    """Paces the requests a client sends. Every request takes a token from a
+    token bucket (if a rate is set) and a slot from a per-host concurrency
+    cap, and failed requests are retried with jittered exponential backoff.
+
+    Retries depend on whether repeating the request is safe. Idempotent
+    requests (GETs, and POSTs that Rails treats as PATCH, PUT or DELETE) are
+    retried on any status in RETRY_STATUSES and on connection errors. Other
+    POSTs are only retried when the server certainly did not receive or act
+    on them: on a 429 or 503 response, or when no connection was made
+    because connecting timed out, was refused or the host name did not
+    resolve. Errors after the connection was made, such as a reset
+    connection or a read timeout, are not retried for them. A Retry-After
+    header on the response overrides the backoff delay.
+    """
+
+    def __init__(self, rate: Optional[float]=None, burst: int=1,
+                 max_per_host: int=10, max_retries: int=3,
+                 backoff_base: float=0.5, backoff_max: float=30.0) -> None:
+        """Constructs a scheduler.
+
+        :param rate: The sustained number of requests per second allowed, or
+        None for no limit.
+        :type rate: Optional[float]
+        :param burst: The number of requests that may be sent back to back
+        before the rate applies.
+        :type burst: int
+        :param max_per_host: The maximum number of requests in flight to any
+        one host.
+        :type max_per_host: int
+        :param max_retries: The maximum number of times a request is retried.
+        :type max_retries: int
+        :param backoff_base: The backoff delay before the first retry, in
+        seconds. Each further retry doubles it.
+        :type backoff_base: float
+        :param backoff_max: The maximum backoff delay, in seconds.
+        :type backoff_max: float
+        """
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._bucket = _TokenBucket(rate, burst) if rate is not None else None
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def execute(self, url: str, send: Callable[[], requests.Response], *,
+                idempotent: bool) -> requests.Response:
+        """Sends a request through the scheduler, retrying as allowed. If
+        every attempt fails, the last response is returned or the last
+        exception is raised.
+
+        :param url: The request URL, used for the per-host cap.
+        :type url: str
+        :param send: Sends the request once.
+        :type send: Callable[[], requests.Response]
+        :param idempotent: Whether the request may be repeated safely.
+        :type idempotent: bool
+        :returns: The response.
+        :rtype: requests.Response
+        """
+        slots = self._slots(urllib.parse.urlsplit(url).netloc)
+        attempt = 0
+        while True:
+            if self._bucket is not None:
+                self._bucket.acquire()
+            try:
+                with slots:
+                    res = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A request that never got a connection never reached the
+                # server. Anything else may have been processed.
+                if attempt >= self.max_retries \
+                        or not (idempotent or _never_connected(e)):
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if res.status_code not in RETRY_STATUSES \
+                        or attempt >= self.max_retries \
+                        or not (idempotent
+                                or res.status_code in _NOT_PROCESSED_STATUSES):
+                    return res
+                delay = _retry_after(res)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                res.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slots
+            return slots
+
+    def _backoff(self, attempt: int) -> float:
+        """Returns a full-jitter exponential backoff delay for the attempt."""
+        return random.uniform(0, min(self.backoff_max,
+                                     self.backoff_base * 2 ** attempt))
+
+def _never_connected(e: requests.RequestException) -> bool:
+    """Returns whether the request failed before a connection was made, so
+    that none of it was sent.
+    """
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    # requests wraps urllib3's error, whose reason says why it gave up.
+    reason = getattr(e.args[0], 'reason', None) if e.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+def _retry_after(res: requests.Response) -> Optional[float]:
+    """Returns the delay requested by the response's Retry-After header, in
+    seconds, if it has a valid one.
+    """
+    value = res.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (when - now).total_seconds())
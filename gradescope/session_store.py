@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import abc
+import contextlib
+from dataclasses import dataclass
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError: # Not available on Windows.
+    fcntl = None # type: ignore
+
+@dataclass
+class SavedSession:
+    signed_token: str
+    csrf_token: Optional[str]
+    saved_at: float
+
+class SessionStore(abc.ABC):
+    """Somewhere to keep logged-in sessions between processes, so that a new
+    Client can reuse one instead of logging in again. Subclasses must
+    implement load, save and delete.
+    """
+
+    @abc.abstractmethod
+    def load(self, username: str) -> Optional[SavedSession]:
+        """Returns the saved session for the user, if there is one.
+
+        :param username: The username the session was logged in with.
+        :type username: str
+        :rtype: Optional[SavedSession]
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save(self, username: str, session: SavedSession) -> None:
+        """Saves the session for the user, replacing any previous one.
+
+        :param username: The username the session was logged in with.
+        :type username: str
+        :param session: The session.
+        :type session: SavedSession
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, username: str) -> None:
+        """Forgets the saved session for the user, if there is one.
+
+        :param username: The username the session was logged in with.
+        :type username: str
+        """
+        raise NotImplementedError
+
+class FileSessionStore(SessionStore):
+    """A session store in a JSON file, shared safely by concurrent processes.
+    Each access takes an advisory lock on a sibling '.lock' file, and the
+    file is replaced atomically, so readers never see a partial write. The
+    file holds login cookies, so it is created readable by its owner only.
+
+    Locking uses fcntl and is skipped where that is unavailable.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Constructs a store backed by the file at the path. The file is
+        created on the first save.
+
+        :param path: The path of the JSON file.
+        :type path: str
+        """
+        self.path = path
+
+    def load(self, username: str) -> Optional[SavedSession]:
+        with self._locked():
+            data = self._read().get(username)
+        if data is None:
+            return None
+        return SavedSession(**data)
+
+    def save(self, username: str, session: SavedSession) -> None:
+        with self._locked():
+            sessions = self._read()
+            sessions[username] = {
+                'signed_token': session.signed_token,
+                'csrf_token': session.csrf_token,
+                'saved_at': session.saved_at,
+            }
+            self._write(sessions)
+
+    def delete(self, username: str) -> None:
+        with self._locked():
+            sessions = self._read()
+            if sessions.pop(username, None) is not None:
+                self._write(sessions)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # A corrupt store only costs a login.
+            return {}
+
+    def _write(self, sessions: Dict[str, Dict]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(sessions, f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
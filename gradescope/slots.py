@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Type, TypeVar
+
+T = TypeVar('T')
+
+def with_slots(cls: Type[T]) -> Type[T]:
+    """Rebuilds a dataclass with __slots__ for its fields, so instances carry
+    no per-instance __dict__. Apply it above @dataclass. Unlike
+    dataclass(slots=True), it works on every supported Python version and
+    always keeps a __weakref__ slot, so instances can still be weakly
+    referenced.
+
+    Slotted instances cannot take attributes other than their fields, and
+    methods may not use zero-argument super().
+
+    :param cls: The dataclass.
+    :type cls: type
+    :returns: The slotted class.
+    :rtype: type
+    """
+    names = tuple(field.name for field in dataclasses.fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names:
+        # Field defaults live on the class; they would clash with the slots.
+        # The generated __init__ already holds its own copy of them.
+        namespace.pop(name, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = names + ('__weakref__',)
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from .assignment import Assignment
+from .term import Term
+
+if TYPE_CHECKING:
+    from .course import Course
+    from .member import Member
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    short_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    term TEXT NOT NULL,
+    description TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    position INTEGER,
+    name TEXT,
+    type TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assignments_by_course
+    ON assignments (course_id, position);
+CREATE TABLE IF NOT EXISTS members (
+    course_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    sid INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    canvas_connected INTEGER NOT NULL,
+    PRIMARY KEY (course_id, id)
+);
+CREATE TABLE IF NOT EXISTS lists (
+    course_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (course_id, kind)
+);
+'''
+
+# Kinds of per-course lists whose fetch time is kept in the lists table.
+_ROSTER = 'roster'
+_ASSIGNMENTS = 'assignments'
+
+class MetadataStore:
+    """A SQLite database of course, assignment and member metadata, so that
+    getters can be answered from disk instead of the site, across process
+    restarts. Data read from the site is written through to the store, and
+    getters use stored data no older than max_age seconds; forced updates
+    always go to the site.
+
+    Any number of threads and processes may share one database file. Each
+    thread gets its own connection, the database runs in WAL mode so readers
+    never block the writer, and writers wait up to timeout seconds for each
+    other.
+    """
+
+    def __init__(self, path: str, *, max_age: float=3600.0,
+                 timeout: float=30.0) -> None:
+        """Opens (and creates, if needed) the store at the path.
+
+        :param path: The path of the SQLite database file.
+        :type path: str
+        :param max_age: Seconds for which stored data is used in place of the
+        site.
+        :type max_age: float
+        :param timeout: Seconds to wait for another writer before failing.
+        :type timeout: float
+        """
+        self.path = path
+        self.max_age = max_age
+        self.timeout = timeout
+        self._local = threading.local()
+
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Closes the calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def load_course(self, course: Course) -> bool:
+        """Fills in the course's dashboard fields if fresh data is stored.
+
+        :param course: The course.
+        :type course: Course
+        :returns: Whether fresh data was found.
+        :rtype: bool
+        """
+        row = self._query_one(
+                'SELECT short_name, name, term, description FROM courses '
+                'WHERE id = ? AND fetched_at >= ?',
+                (course.id, self._oldest()))
+        if row is None:
+            return False
+        course._short_name, course._name, term, course._description = row
+        course._term = Term.parse(term)
+        return True
+
+    def save_course(self, course: Course) -> None:
+        """Stores the course's dashboard fields, which must all be set.
+
+        :param course: The course.
+        :type course: Course
+        """
+        assert course._term is not None
+        term = f'{course._term.season.name} {course._term.year}'
+        with self._connection() as conn:
+            conn.execute(
+                    'INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?, ?, ?)',
+                    (course.id, course._short_name, course._name, term,
+                     course._description, time.time()))
+
+    def forget_course(self, course_id: int) -> None:
+        """Drops the stored dashboard fields of the course, e.g. after they
+        were changed.
+
+        :param course_id: The ID of the course.
+        :type course_id: int
+        """
+        with self._connection() as conn:
+            conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+
+    def load_assignment(self, assignment: Assignment) -> bool:
+        """Fills in the assignment's name and type if fresh data is stored.
+
+        :param assignment: The assignment.
+        :type assignment: Assignment
+        :returns: Whether a fresh name and type were found.
+        :rtype: bool
+        """
+        row = self._query_one(
+                'SELECT name, type FROM assignments '
+                'WHERE id = ? AND fetched_at >= ? '
+                'AND name IS NOT NULL AND type IS NOT NULL',
+                (assignment.id, self._oldest()))
+        if row is None:
+            return False
+        assignment._name = row[0]
+        assignment._type = Assignment.Type[row[1]]
+        return True
+
+    def save_assignment(self, assignment: Assignment) -> None:
+        """Stores the assignment's name and type, which must both be set.
+
+        :param assignment: The assignment.
+        :type assignment: Assignment
+        """
+        assert assignment._type is not None
+        with self._connection() as conn:
+            conn.execute(
+                    'INSERT INTO assignments '
+                    '(id, course_id, name, type, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET name = excluded.name, '
+                    'type = excluded.type, fetched_at = excluded.fetched_at',
+                    (assignment.id, assignment._course.id, assignment._name,
+                     assignment._type.name, time.time()))
+
+    def load_assignment_list(self, course_id: int) \
+            -> Optional[List[Tuple[int, str, Optional[str]]]]:
+        """Returns the course's stored assignment list as (ID, name, type
+        name) tuples in list order, if it is fresh. Types are None where only
+        the list has been read.
+
+        :param course_id: The ID of the course.
+        :type course_id: int
+        :rtype: Optional[list[tuple[int, str, Optional[str]]]]
+        """
+        if not self._is_list_fresh(course_id, _ASSIGNMENTS):
+            return None
+        return self._query_all(
+                'SELECT id, name, type FROM assignments '
+                'WHERE course_id = ? AND position IS NOT NULL '
+                'ORDER BY position', (course_id,))
+
+    def save_assignment_list(self, course_id: int,
+                             assignments: Iterable[Assignment]) -> None:
+        """Stores the course's assignment list, keeping the stored types of
+        assignments that were already known.
+
+        :param course_id: The ID of the course.
+        :type course_id: int
+        :param assignments: The assignments, in list order.
+        :type assignments: Iterable[Assignment]
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('UPDATE assignments SET position = NULL '
+                         'WHERE course_id = ?', (course_id,))
+            conn.executemany(
+                    'INSERT INTO assignments '
+                    '(id, course_id, position, name, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET '
+                    'course_id = excluded.course_id, '
+                    'position = excluded.position, name = excluded.name',
+                    [(assignment.id, course_id, position, assignment._name,
+                      now) for position, assignment in enumerate(assignments)])
+            self._touch_list(conn, course_id, _ASSIGNMENTS, now)
+
+    def load_roster(self, course_id: int) \
+            -> Optional[List[Tuple[int, str, str, int, str, bool]]]:
+        """Returns the course's stored roster as (ID, name, email, SID, role
+        name, Canvas connected) tuples in roster order, if it is fresh.
+
+        :param course_id: The ID of the course.
+        :type course_id: int
+        :rtype: Optional[list[tuple[int, str, str, int, str, bool]]]
+        """
+        if not self._is_list_fresh(course_id, _ROSTER):
+            return None
+        rows = self._query_all(
+                'SELECT id, name, email, sid, role, canvas_connected '
+                'FROM members WHERE course_id = ? ORDER BY position',
+                (course_id,))
+        return [(*row[:5], bool(row[5])) for row in rows]
+
+    def save_roster(self, course_id: int, members: Iterable[Member]) -> None:
+        """Replaces the course's stored roster.
+
+        :param course_id: The ID of the course.
+        :type course_id: int
+        :param members: The members, in roster order, with every field set.
+        :type members: Iterable[Member]
+        """
+        rows = []
+        for position, member in enumerate(members):
+            assert member._role is not None
+            rows.append((course_id, member.id, position, member._name,
+                         member._email, member._sid, member._role.name,
+                         int(bool(member._canvas_connected))))
+        with self._connection() as conn:
+            conn.execute('DELETE FROM members WHERE course_id = ?',
+                         (course_id,))
+            conn.executemany('INSERT INTO members VALUES '
+                             '(?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._touch_list(conn, course_id, _ROSTER, time.time())
+
+    def forget_roster(self, course_id: int) -> None:
+        """Marks the course's stored roster as stale, e.g. after it was
+        changed.
+
+        :param course_id: The ID of the course.
+        :type course_id: int
+        """
+        with self._connection() as conn:
+            conn.execute('DELETE FROM lists WHERE course_id = ? AND kind = ?',
+                         (course_id, _ROSTER))
+
+    def _oldest(self) -> float:
+        return time.time() - self.max_age
+
+    def _is_list_fresh(self, course_id: int, kind: str) -> bool:
+        return self._query_one(
+                'SELECT 1 FROM lists WHERE course_id = ? AND kind = ? '
+                'AND fetched_at >= ?',
+                (course_id, kind, self._oldest())) is not None
+
+    def _touch_list(self, conn: sqlite3.Connection, course_id: int, kind: str,
+                    now: float) -> None:
+        conn.execute('INSERT OR REPLACE INTO lists VALUES (?, ?, ?)',
+                     (course_id, kind, now))
+
+    def _query_one(self, sql: str, params: Tuple[Any, ...]) -> Optional[Tuple]:
+        return self._connection().execute(sql, params).fetchone()
+
+    def _query_all(self, sql: str, params: Tuple[Any, ...]) -> List[Tuple]:
+        return self._connection().execute(sql, params).fetchall()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns the calling thread's connection, opening it if needed. A
+        connection inherited from a parent process is not reused.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import hashlib
+import re
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# The CSRF token differs on every render of the same page, so it is left out
+# of page digests.
+_CSRF_META_RE = re.compile(
+        rb'<meta\s[^>]*name\s*=\s*["\']csrf-token["\'][^>]*>', re.IGNORECASE)
+
+@dataclass
+class SyncResult(Generic[T]):
+    """The difference between a list as of the last sync and as it is now."""
+    added: List[T] = field(default_factory=list)
+    removed: List[T] = field(default_factory=list)
+    changed: List[T] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        """Whether anything was added, removed or changed."""
+        return bool(self.added or self.removed or self.changed)
+
+class _SyncState:
+    """What a list looked like at the last sync: a digest of the page it was
+    read from, and each entry with a hash of its contents, by ID.
+    """
+
+    def __init__(self) -> None:
+        self.digest: Optional[bytes] = None
+        self.entries: Dict[int, Tuple[Any, int]] = {}
+
+    def diff(self, items: List[T],
+             hash_of: Callable[[T], int]) -> SyncResult[T]:
+        """Compares the items, which must have an id attribute, with the last
+        sync and records them as the new state.
+
+        :param items: The entries of the list as it is now.
+        :type items: list[T]
+        :param hash_of: Hashes an entry's contents.
+        :type hash_of: Callable[[T], int]
+        :returns: The entries added, removed and changed since the last sync.
+        :rtype: SyncResult[T]
+        """
+        result: SyncResult[T] = SyncResult()
+        entries: Dict[int, Tuple[Any, int]] = {}
+        for item in items:
+            item_hash = hash_of(item)
+            entries[item.id] = (item, item_hash) # type: ignore
+            previous = self.entries.get(item.id) # type: ignore
+            if previous is None:
+                result.added.append(item)
+            elif previous[1] != item_hash:
+                result.changed.append(item)
+        result.removed = [item for item_id, (item, _) in self.entries.items()
+                          if item_id not in entries]
+        self.entries = entries
+        return result
+
+def page_digest(content: bytes) -> bytes:
+    """Returns a digest of a page body that only changes when the page's
+    content does.
+
+    :param content: The raw page body.
+    :type content: bytes
+    :rtype: bytes
+    """
+    return hashlib.blake2b(_CSRF_META_RE.sub(b'', content),
+                           digest_size=16).digest()
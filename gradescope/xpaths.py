@@ -0,0 +1,71 @@
+# Precompiled XPath expressions for every page the client parses. Compiling
+# once keeps lxml from recompiling an expression on every call, which matters
+# most for the per-row roster expressions. Values that vary between calls are
+# passed as XPath variables, e.g. ASSIGNMENT_SIDEBAR_LINKS(html, id='123',
+# page='review_grades'), instead of being interpolated.
+#
+# Expressions are compiled on first access, through the module __getattr__,
+# so that importing the package does not import lxml until a page is parsed.
+# Each compiled expression then replaces the lookup as a module global.
+#
+# Text results are plain strings. lxml's default "smart" strings keep a
+# reference to their parent element, and so keep the whole parsed page alive
+# for as long as the string they were stored in.
+
+from typing import Any
+
+_SOURCES = {
+    'TEXT': 'text()',
+
+    # Home page.
+    'HOME_TERMS': '//*[contains(@class,"courseList--term")]',
+    'TERM_COURSE_BOXES':
+        'following-sibling::*[contains(@class,"courseList--coursesForTerm")][1]'
+        '//a[contains(@class,"courseBox")]',
+    'COURSE_BOX_SHORT_NAME':
+        '*[contains(@class,"courseBox--shortname")]/text()',
+    'COURSE_BOX_NAME': '*[contains(@class,"courseBox--name")]/text()',
+    # The 'Instructor Courses' or 'Student Courses' heading above a term.
+    'COURSE_LIST_HEADING':
+        'preceding::*[contains(@class,"pageHeading")][1]//text()',
+
+    # Course dashboard.
+    'DASHBOARD_SHORT_NAME': '//*[contains(@class,"sidebar--title")]//text()',
+    'DASHBOARD_NAME': '//*[contains(@class,"sidebar--subtitle")]//text()',
+    'DASHBOARD_TERM': '//*[contains(@class,"courseHeader--term")]//text()',
+    'DASHBOARD_DESCRIPTIONS':
+        '//*[contains(@class,"courseDashboard--panel-description")]'
+        '//p[not(contains(@class,"u-placeholderText"))]'
+        '/text()',
+
+    # Course assignment list.
+    'ASSIGNMENT_LINKS': '//*[@id="assignments-instructor-table"]'
+                        '//tr'
+                        '//td[1]'
+                        '//a',
+
+    # Course roster. The row expressions are relative to a roster row.
+    'ROSTER_ROWS': '//tr[contains(@class,"rosterRow")]',
+    'ROSTER_ROW_CELLS': './/td',
+    'ROSTER_ROW_EDIT_BUTTON': '(.//*[@data-id])[1]',
+    'ROSTER_CELL_ROLE': './/select//option[@selected="selected"]/text()',
+    'ROSTER_CELL_CANVAS_ACTIVE': './/*[@data-sort="1"]',
+
+    # Assignment settings.
+    'ASSIGNMENT_TITLE': '//input[@id="assignment_title"]/@value',
+    'BODY_CONTROLLER': '//body/@data-controller',
+    'ASSIGNMENT_SIDEBAR_LINKS':
+        '//a[contains(@href,concat("/assignments/",$id,"/",$page))]',
+}
+
+def __getattr__(name: str) -> Any:
+    source = _SOURCES.get(name)
+    if source is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from lxml import etree
+    xpath = etree.XPath(source, smart_strings=False)
+    globals()[name] = xpath
+    return xpath
+
+def __dir__() -> Any:
+    return sorted(set(globals()) | set(_SOURCES))
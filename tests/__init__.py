@@ -1,3 +1,7 @@
 from .test_assignment import *
+from .test_async_client import *
 from .test_client import *
+from .test_connection import *
 from .test_course import *
+from .test_imports import *
+from .test_store import *
@@ -0,0 +1,234 @@
+"""Synthetic Gradescope data and the HTML pages the client parses, for running
+tests and benchmarks without the live site.
+"""
+
+from dataclasses import dataclass, field
+import html
+import json
+import random
+from typing import Dict, List, Optional
+
+from gradescope import Assignment, Member, Term
+
+CSRF_TOKEN = 'stand-in-csrf-token'
+USERNAME = 'tester@example.com'
+PASSWORD = 'correct horse battery staple'
+# The role codes the roster forms submit.
+ROLES_BY_CODE = { '0': Member.Role.STUDENT, '1': Member.Role.INSTRUCTOR,
+                  '2': Member.Role.TA, '3': Member.Role.READER }
+
+@dataclass
+class SyntheticMember:
+    id: int
+    name: str
+    email: str
+    sid: str
+    role: Member.Role
+    canvas_connected: bool
+
+@dataclass
+class SyntheticAssignment:
+    id: int
+    name: str
+    type: Assignment.Type
+
+@dataclass
+class SyntheticCourse:
+    id: int
+    short_name: str
+    name: str
+    term: Term
+    description: str
+    is_instructor: bool
+    members: List[SyntheticMember] = field(default_factory=list)
+    assignments: List[SyntheticAssignment] = field(default_factory=list)
+
+@dataclass
+class SyntheticSite:
+    courses: List[SyntheticCourse] = field(default_factory=list)
+    username: str = USERNAME
+    password: str = PASSWORD
+    csrf_token: str = CSRF_TOKEN
+
+    def find_course(self, course_id: int) -> Optional[SyntheticCourse]:
+        for course in self.courses:
+            if course.id == course_id:
+                return course
+        return None
+
+    def next_member_id(self) -> int:
+        return max((member.id for course in self.courses
+                    for member in course.members), default=999) + 1
+
+def generate_site(courses: int=3, members: int=10, assignments: int=5,
+                  terms: int=2, student_courses: int=1,
+                  seed: int=0) -> SyntheticSite:
+    """Builds a synthetic site. The client is an instructor of every course
+    except the last student_courses ones. Courses are spread evenly over the
+    given number of terms, and assignment types cycle through every
+    Assignment.Type.
+    """
+    rng = random.Random(seed)
+    seasons = list(Term.Season)
+    types = list(Assignment.Type)
+    roles = [Member.Role.STUDENT] * 6 + [Member.Role.TA, Member.Role.READER]
+
+    site = SyntheticSite()
+    next_member_id = 1000
+    next_assignment_id = 5000
+    for i in range(courses):
+        term_index = i % terms
+        term = Term(seasons[term_index % len(seasons)],
+                    2020 + term_index // len(seasons))
+        course = SyntheticCourse(
+                id=100 + i, short_name=f'SYN {100 + i}',
+                name=f'Synthetic Course {i}', term=term,
+                description=f'A description for SYN {100 + i}.',
+                is_instructor=i < courses - student_courses)
+        for j in range(members):
+            role = Member.Role.INSTRUCTOR if j == 0 else rng.choice(roles)
+            course.members.append(SyntheticMember(
+                    id=next_member_id, name=f'Member {next_member_id}',
+                    email=f'member{next_member_id}@example.com',
+                    sid=str(rng.randrange(10**7, 10**8)) if j % 4 else '',
+                    role=role, canvas_connected=rng.random() < 0.5))
+            next_member_id += 1
+        for j in range(assignments):
+            course.assignments.append(SyntheticAssignment(
+                    id=next_assignment_id, name=f'Assignment {j}',
+                    type=types[j % len(types)]))
+            next_assignment_id += 1
+        site.courses.append(course)
+    return site
+
+def generate_multi_term_site() -> SyntheticSite:
+    """Builds a site whose home page lists two terms under each heading, so
+    that every term's course list is followed by another term's.
+    """
+    return generate_site(courses=8, members=0, assignments=0, terms=2,
+                         student_courses=4)
+
+def _page(site: SyntheticSite, body: str,
+          controller: str='courses') -> str:
+    return ('<!DOCTYPE html><html><head>'
+            '<meta charset="utf-8">'
+            '<title>Gradescope</title>'
+            '<meta name="csrf-param" content="authenticity_token" />'
+            f'<meta name="csrf-token" content="{html.escape(site.csrf_token)}" />'
+            '</head>'
+            f'<body data-controller="{controller}">{body}</body></html>')
+
+def _term_str(term: Term) -> str:
+    return f'{term.season.name.capitalize()} {term.year}'
+
+def render_login(site: SyntheticSite) -> str:
+    return _page(site, '<form action="/login" method="post">'
+                       '<input name="session[email]" />'
+                       '<input name="session[password]" type="password" />'
+                       '</form>', controller='sessions')
+
+def render_home(site: SyntheticSite) -> str:
+    parts = []
+    for heading, is_instructor in (('Instructor Courses', True),
+                                   ('Student Courses', False)):
+        courses = [course for course in site.courses
+                   if course.is_instructor == is_instructor]
+        if not courses:
+            continue
+        parts.append(f'<h1 class="pageHeading">{heading}</h1>'
+                     '<div class="courseList">')
+        by_term: Dict[str, List[SyntheticCourse]] = {}
+        for course in courses:
+            by_term.setdefault(_term_str(course.term), []).append(course)
+        for term_str, term_courses in by_term.items():
+            parts.append('<div class="courseList--term pageSubheading">'
+                         f'{term_str}</div>'
+                         '<div class="courseList--coursesForTerm">')
+            for course in term_courses:
+                parts.append(
+                        f'<a class="courseBox" href="/courses/{course.id}">'
+                        '<h3 class="courseBox--shortname">'
+                        f'{html.escape(course.short_name)}</h3>'
+                        '<h4 class="courseBox--name">'
+                        f'{html.escape(course.name)}</h4>'
+                        '<div class="courseBox--assignments">'
+                        f'{len(course.assignments)} assignments</div></a>')
+            parts.append('</div>')
+        parts.append('</div>')
+    return _page(site, ''.join(parts), controller='courses')
+
+def render_dashboard(site: SyntheticSite, course: SyntheticCourse) -> str:
+    if course.description:
+        description = f'<p>{html.escape(course.description)}</p>'
+    else:
+        description = ('<p class="u-placeholderText">'
+                       'No description yet.</p>')
+    return _page(site,
+                 '<nav class="sidebar">'
+                 f'<div class="sidebar--title">'
+                 f'{html.escape(course.short_name)}</div>'
+                 f'<div class="sidebar--subtitle">'
+                 f'{html.escape(course.name)}</div></nav>'
+                 '<header class="courseHeader">'
+                 f'<div class="courseHeader--term">{_term_str(course.term)}'
+                 '</div></header>'
+                 '<div class="courseDashboard--panel-description">'
+                 f'{description}</div>')
+
+def render_assignments(site: SyntheticSite, course: SyntheticCourse) -> str:
+    rows = ''.join(
+            '<tr><td class="table--primaryLink">'
+            f'<a href="/courses/{course.id}/assignments/{assignment.id}">'
+            f'{html.escape(assignment.name)}</a></td>'
+            '<td>0</td><td>0%</td></tr>'
+            for assignment in course.assignments)
+    return _page(site,
+                 '<table id="assignments-instructor-table">'
+                 '<thead><tr><th>Name</th><th>Submissions</th>'
+                 '<th>Graded</th></tr></thead>'
+                 f'<tbody>{rows}</tbody></table>')
+
+def render_roster_row(course: SyntheticCourse,
+                      member: SyntheticMember) -> str:
+    roles = ('Student', 'Instructor', 'TA', 'Reader')
+    role_name = 'TA' if member.role == Member.Role.TA \
+            else member.role.name.capitalize()
+    options = ''.join(
+            f'<option selected="selected">{role}</option>'
+            if role == role_name else f'<option>{role}</option>'
+            for role in roles)
+    cm_data = html.escape(json.dumps({ 'full_name': member.name,
+                                       'sid': member.sid }))
+    return ('<tr class="rosterRow">'
+            f'<td class="rosterCell--primary">{html.escape(member.name)}</td>'
+            f'<td>{html.escape(member.email)}</td>'
+            f'<td><select>{options}</select></td>'
+            '<td>0</td>'
+            f'<td><span data-sort="{int(member.canvas_connected)}"></span></td>'
+            f'<td><button class="js-editRosterMember" data-id="{member.id}" '
+            f'data-email="{html.escape(member.email)}" data-cm="{cm_data}">'
+            'Edit</button></td></tr>')
+
+def render_roster(site: SyntheticSite, course: SyntheticCourse) -> str:
+    rows = ''.join(render_roster_row(course, member)
+                   for member in course.members)
+    return _page(site, '<table class="js-rosterTable">'
+                       f'<tbody>{rows}</tbody></table>')
+
+def render_assignment_edit(site: SyntheticSite, course: SyntheticCourse,
+                           assignment: SyntheticAssignment) -> str:
+    controller = {
+        Assignment.Type.PROGRAMMING: 'programming_assignments',
+        Assignment.Type.ONLINE: 'online_assignments',
+    }.get(assignment.type, 'pdf_assignments')
+    base = f'/courses/{course.id}/assignments/{assignment.id}'
+    links = [f'<a href="{base}/outline/edit">Edit Outline</a>']
+    if assignment.type == Assignment.Type.BUBBLE_SHEET:
+        links.append(f'<a href="{base}/bubble_sheet_answer_key">Answer Key</a>')
+    if assignment.type == Assignment.Type.EXAM:
+        links.append(f'<a href="{base}/submission_batches">Scans</a>')
+    return _page(site,
+                 f'<nav class="sidebar">{"".join(links)}</nav>'
+                 '<input id="assignment_title" name="assignment[title]" '
+                 f'value="{html.escape(assignment.name)}" />',
+                 controller=controller)
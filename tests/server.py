@@ -0,0 +1,343 @@
+"""A local stand-in for the Gradescope website, serving synthetic or recorded
+pages for every path in gradescope.endpoints.
+"""
+
+from collections import Counter
+import gzip
+import hashlib
+import http.cookies
+import http.server
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import urllib.parse
+
+import requests
+import requests.adapters
+
+from gradescope import Term, endpoints
+from gradescope.connection import ConnectionStats, _CountingAdapter
+
+from . import fixtures
+
+Reply = Tuple[int, Dict[str, str], bytes]
+
+class StandInServer:
+    """A threaded HTTP server on localhost that behaves like Gradescope for the
+    pages this package uses. It serves either a synthetic site, which also
+    accepts course edits, or a cassette directory written by
+    gradescope.replay.RecordingAdapter.
+
+    Use it as a context manager, and point a Client at it with adapter().
+    """
+
+    def __init__(self, site: Optional[fixtures.SyntheticSite]=None, *,
+                 cassette: Optional[str]=None) -> None:
+        self.site = site if site is not None or cassette is not None \
+                else fixtures.generate_site()
+        self.cassette = cassette
+        self.delay = 0.0
+        # Whether the bulk roster upload is offered.
+        self.bulk_roster = True
+        # Whether responses are gzipped for clients that accept it.
+        self.compress = False
+        self.signed_token = 'stand-in-signed-token-0'
+        self.requests: List[Tuple[str, str]] = []
+        # The headers of each request, in the same order.
+        self.request_headers: List[Dict[str, str]] = []
+        self._faults: Dict[Tuple[str, str], List[Tuple[int, Dict[str, str]]]] = {}
+        self._recorded: Dict[Tuple[str, str], Reply] = {}
+        self._lock = threading.Lock()
+        # Serialises access to the site, which POSTs modify.
+        self._site_lock = threading.Lock()
+        if cassette is not None:
+            self._load_cassette(cassette)
+
+        handler = type('Handler', (_Handler,), { 'stand_in': self })
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                      handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def adapter(self, **kwargs: Any) -> requests.adapters.HTTPAdapter:
+        """Returns a transport adapter that sends requests for the live site to
+        this server instead.
+        """
+        return StandInAdapter(self.base_url, **kwargs)
+
+    def fail_next(self, method: str, path: str, status: int, count: int=1,
+                  headers: Optional[Dict[str, str]]=None) -> None:
+        """Makes the next count requests for the path fail with the status."""
+        with self._lock:
+            self._faults.setdefault((method, path), []).extend(
+                    [(status, headers or {})] * count)
+
+    def count(self, method: str, path: str) -> int:
+        """Returns the number of requests received for the path."""
+        with self._lock:
+            return Counter(self.requests)[method, path]
+
+    def expire_sessions(self) -> None:
+        """Invalidates every logged-in session, as if they had timed out. The
+        next session gets a new CSRF token.
+        """
+        with self._lock:
+            number = int(self.signed_token.rsplit('-', 1)[1]) + 1
+            self.signed_token = f'stand-in-signed-token-{number}'
+            if self.site is not None:
+                self.site.csrf_token = f'{fixtures.CSRF_TOKEN}-{number}'
+
+    def reset_requests(self) -> None:
+        with self._lock:
+            self.requests.clear()
+
+    def __enter__(self) -> 'StandInServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def _load_cassette(self, directory: str) -> None:
+        with open(os.path.join(directory, 'index.json')) as f:
+            entries = json.load(f)
+        for entry in entries:
+            path = urllib.parse.urlsplit(entry['url']).path or '/'
+            with open(os.path.join(directory, entry['body_file']), 'rb') as f:
+                body = f.read()
+            self._recorded.setdefault((entry['method'], path),
+                                      (entry['status'], entry['headers'], body))
+
+    def _handle(self, method: str, path: str, headers: Any,
+                form: Dict[str, str]) -> Reply:
+        with self._lock:
+            self.requests.append((method, path))
+            self.request_headers.append(dict(headers.items()))
+            faults = self._faults.get((method, path))
+            fault = faults.pop(0) if faults else None
+        if self.delay:
+            time.sleep(self.delay)
+        if fault is not None:
+            status, fault_headers = fault
+            return status, dict(fault_headers), b''
+
+        if self.cassette is not None:
+            recorded = self._recorded.get((method, path))
+            if recorded is None:
+                return 404, {}, b''
+            return recorded
+
+        with self._site_lock:
+            reply = self._route(method, path, headers, form)
+        status, reply_headers, body = reply
+        if status == 200 and method == 'GET':
+            etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+            reply_headers['ETag'] = etag
+            if headers.get('If-None-Match') == etag:
+                return 304, { 'ETag': etag }, b''
+        return reply
+
+    def _route(self, method: str, path: str, headers: Any,
+               form: Dict[str, str]) -> Reply:
+        site = self.site
+        assert site is not None
+
+        if path == '/login':
+            if method == 'POST' \
+                    and form.get('authenticity_token') != site.csrf_token:
+                return 422, {}, b'Invalid authenticity token'
+            if method == 'GET':
+                return _html(fixtures.render_login(site))
+            if form.get('session[email]') == site.username \
+                    and form.get('session[password]') == site.password:
+                return 302, {
+                    'Location': f'{endpoints.BASE}/account',
+                    'Set-Cookie': f'signed_token={self.signed_token}; path=/',
+                }, b''
+            return _html(fixtures.render_login(site))
+
+        cookies = http.cookies.SimpleCookie(headers.get('Cookie', ''))
+        signed_token = cookies.get('signed_token')
+        if signed_token is None or signed_token.value != self.signed_token:
+            return 302, { 'Location': endpoints.LOGIN }, b''
+        if method == 'POST' \
+                and form.get('authenticity_token') != site.csrf_token:
+            return 422, {}, b'Invalid authenticity token'
+
+        if path == '/logout':
+            return 302, {
+                'Location': endpoints.HOME,
+                'Set-Cookie': 'signed_token=; path=/; max-age=0',
+            }, b''
+        if path == '/':
+            return _html(fixtures.render_home(site))
+
+        match = re.fullmatch(r'/courses/(\d+)(/.*)?', path)
+        if match is None:
+            return 404, {}, b''
+        course = site.find_course(int(match.group(1)))
+        rest = match.group(2) or ''
+        if course is None:
+            return 404, {}, b''
+
+        if rest == '':
+            if method == 'GET':
+                return _html(fixtures.render_dashboard(site, course))
+            if not course.is_instructor:
+                return 401, {}, b''
+            _patch_course(course, form)
+            return 302, { 'Location': f'{endpoints.BASE}/courses/{course.id}' }, b''
+
+        if not course.is_instructor:
+            return 401, {}, b''
+        if rest == '/assignments' and method == 'GET':
+            return _html(fixtures.render_assignments(site, course))
+        if rest == '/memberships':
+            if method == 'GET':
+                return _html(fixtures.render_roster(site, course))
+            return _add_members(site, course, [{
+                'name': form.get('user[name]', ''),
+                'email': form.get('user[email]', ''),
+                'sid': form.get('user[sid]', ''),
+            }], form.get('course_membership[role]', '0'))
+        if rest == '/memberships/many' and method == 'POST' \
+                and self.bulk_roster:
+            return _add_members(site, course, json.loads(form['users']),
+                                form.get('role', '0'))
+        match = re.fullmatch(r'/memberships/(\d+)', rest)
+        if match is not None and method == 'POST':
+            member_id = int(match.group(1))
+            for member in course.members:
+                if member.id == member_id:
+                    break
+            else:
+                return 404, {}, b''
+            if form.get('_method') == 'delete':
+                course.members.remove(member)
+            else:
+                member.role = fixtures.ROLES_BY_CODE[
+                        form['course_membership[role]']]
+            return 302, { 'Location': f'{endpoints.BASE}/courses/{course.id}/memberships' }, b''
+        match = re.fullmatch(r'/assignments/(\d+)/edit', rest)
+        if match is not None and method == 'GET':
+            for assignment in course.assignments:
+                if assignment.id == int(match.group(1)):
+                    return _html(fixtures.render_assignment_edit(
+                            site, course, assignment))
+        return 404, {}, b''
+
+def _html(page: str) -> Reply:
+    return 200, { 'Content-Type': 'text/html; charset=utf-8' }, \
+            page.encode('utf-8')
+
+def _add_members(site: fixtures.SyntheticSite, course: fixtures.SyntheticCourse,
+                 users: List[Dict[str, str]], role_code: str) -> Reply:
+    emails = { member.email.lower() for member in course.members }
+    if any(not user['email'] or user['email'].lower() in emails
+           for user in users):
+        return 422, {}, b'Invalid or duplicate email'
+    for user in users:
+        course.members.append(fixtures.SyntheticMember(
+                id=site.next_member_id(), name=user['name'],
+                email=user['email'], sid=user['sid'],
+                role=fixtures.ROLES_BY_CODE[role_code],
+                canvas_connected=False))
+    return 302, { 'Location': f'{endpoints.BASE}/courses/{course.id}/memberships' }, b''
+
+def _patch_course(course: fixtures.SyntheticCourse,
+                  form: Dict[str, str]) -> None:
+    if 'course[shortname]' in form:
+        course.short_name = form['course[shortname]']
+    if 'course[name]' in form:
+        course.name = form['course[name]']
+    if 'course[description]' in form:
+        course.description = form['course[description]']
+    if 'course[term]' in form:
+        course.term = Term.parse(f'{form["course[term]"]} {course.term.year}')
+    if 'course[year]' in form:
+        course.term = Term(course.term.season, int(form['course[year]']))
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, Nagle's
+    # algorithm delays every keep-alive response.
+    disable_nagle_algorithm = True
+    stand_in: StandInServer
+
+    def _reply(self) -> None:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        form = dict(urllib.parse.parse_qsl(body))
+        path = urllib.parse.urlsplit(self.path).path
+        status, headers, content = self.stand_in._handle(
+                self.command, path, self.headers, form)
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in ('content-length', 'transfer-encoding',
+                                    'content-encoding', 'connection'):
+                self.send_header(name, value)
+        if self.stand_in.compress and content \
+                and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            content = gzip.compress(content)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(content)))
+        try:
+            self.end_headers()
+            self.wfile.write(content)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out and hung up.
+            self.close_connection = True
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+class StandInAdapter(requests.adapters.HTTPAdapter):
+    """Sends requests for the live site to a stand-in server. Cookies are still
+    scoped to the live site's domain, since requests stores them against the
+    original request.
+    """
+
+    def __init__(self, base_url: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request: requests.PreparedRequest,
+             **kwargs: Any) -> requests.Response:
+        return super().send(_to_stand_in(request, self.base_url), **kwargs)
+
+class StandInCountingAdapter(_CountingAdapter):
+    """The client's own pooled, counting adapter, sending requests for the
+    live site to a stand-in server. Patch it in for
+    gradescope.client._CountingAdapter to test connection handling.
+    """
+
+    def __init__(self, stats: ConnectionStats, *, base_url: str,
+                 **kwargs: Any) -> None:
+        self.base_url = base_url
+        super().__init__(stats, **kwargs)
+
+    def send(self, request: requests.PreparedRequest, # type: ignore[override]
+             **kwargs: Any) -> requests.Response:
+        return super().send(_to_stand_in(request, self.base_url), **kwargs)
+
+def _to_stand_in(request: requests.PreparedRequest,
+                 base_url: str) -> requests.PreparedRequest:
+    url = str(request.url)
+    if url.startswith(endpoints.BASE):
+        request = request.copy()
+        request.url = base_url + url[len(endpoints.BASE):]
+    return request
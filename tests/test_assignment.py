@@ -3,6 +3,7 @@ import unittest
 from gradescope import Assignment, Client, Course
 
 from . import utils
+from .server import StandInServer
 
 class TestAssignment(unittest.TestCase):
     @utils.with_login_client
@@ -54,3 +55,21 @@ class TestAssignment(unittest.TestCase):
                          'Incorrect assignment name')
         self.assertEqual(assignment.get_type(), Assignment.Type.ONLINE,
                          'Incorrect assignment type')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_types(self, client: Client,
+                            server: StandInServer) -> None:
+        course = Course(100, client)
+        expected = {
+            5000: Assignment.Type.EXAM,
+            5001: Assignment.Type.HOMEWORK,
+            5002: Assignment.Type.BUBBLE_SHEET,
+            5003: Assignment.Type.PROGRAMMING,
+            5004: Assignment.Type.ONLINE,
+        }
+        for assignment_id, assignment_type in expected.items():
+            assignment = course.get_assignment(assignment_id)
+            assert assignment is not None
+            self.assertEqual(assignment.get_type(), assignment_type)
+            self.assertEqual(assignment.get_name(),
+                             f'Assignment {assignment_id - 5000}')
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import unittest
+
+from gradescope import AsyncClient, GSInvalidRequestException, Member
+from gradescope.client import _live_course
+
+from . import fixtures
+from .server import StandInServer
+from .utils import with_stand_in_async_client
+
+@unittest.skipIf('GSAPI_USERNAME' not in os.environ
+                        or 'GSAPI_PASSWORD' not in os.environ,
+                 'No test login provided')
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self) -> None:
+        self.username = os.environ['GSAPI_USERNAME']
+        self.password = os.environ['GSAPI_PASSWORD']
+
+    def test_fetch_course_list(self) -> None:
+        async def fetch():
+            async with AsyncClient(self.username, self.password) as client:
+                return await client.fetch_course_list()
+        course_ids = [course.id for course in asyncio.run(fetch())]
+        self.assertIn(217765, course_ids, 'Missing GSAPI 101')
+        self.assertIn(217813, course_ids, 'Missing GSAPI 103')
+
+    def test_gather_course_pages(self) -> None:
+        async def fetch():
+            async with AsyncClient(self.username, self.password) as client:
+                course = await client.fetch_course(217765) # GSAPI 101.
+                assert course is not None
+                assignments, members = await asyncio.gather(
+                        client.get_assignments(course),
+                        client.get_members(course))
+                await asyncio.gather(*(client.read_settings(assignment)
+                                       for assignment in assignments))
+                return assignments, members
+        assignments, members = asyncio.run(fetch())
+        types = {assignment.id: assignment.get_type()
+                 for assignment in assignments}
+        self.assertEqual(types[910133].name, 'EXAM', 'Incorrect exam type')
+        self.assertIn(9420657, [member.id for member in members],
+                      'Missing Test Instructor')
+
+class TestAsyncClientStandIn(unittest.TestCase):
+    def test_page_loads_need_awaiting(self) -> None:
+        client = AsyncClient(fixtures.USERNAME, fixtures.PASSWORD)
+        course = _live_course(client, 100)
+        with self.assertRaisesRegex(GSInvalidRequestException,
+                                    r'AsyncClient\.get_assignments'):
+            course.is_instructor
+        course._is_instructor = True
+        course._assignments = {}
+        with self.assertRaisesRegex(GSInvalidRequestException,
+                                    r'AsyncClient\.get_assignments'):
+            course.get_assignment(5000)
+        with self.assertRaisesRegex(GSInvalidRequestException,
+                                    r'AsyncClient\.get_members'):
+            course.get_members()
+        assignment = course._live_assignment(5000)
+        with self.assertRaisesRegex(GSInvalidRequestException,
+                                    r'AsyncClient\.read_settings'):
+            assignment.get_name()
+
+    @with_stand_in_async_client()
+    async def test_stand_in_coalesced_gets(self, client: AsyncClient,
+                                           server: StandInServer) -> None:
+        course = await client.fetch_course(100)
+        assert course is not None
+        server.delay = 0.2
+        rosters = await asyncio.gather(*(client.get_members(course)
+                                         for _ in range(3)))
+        self.assertEqual(server.count('GET', '/courses/100/memberships'), 1)
+        self.assertEqual(client.coalesced_requests, 2)
+        self.assertEqual([len(members) for members in rosters], [10] * 3)
+
+    @with_stand_in_async_client()
+    async def test_stand_in_fetch_course(self, client: AsyncClient,
+                                         server: StandInServer) -> None:
+        course = await client.fetch_course(100)
+        assert course is not None
+        self.assertEqual(course.get_short_name(), 'SYN 100')
+        self.assertTrue(course.is_instructor)
+        self.assertIs(await client.fetch_course(101), _live_course(client, 101))
+        self.assertIs(await client.fetch_course(100), course)
+        self.assertIsNone(await client.fetch_course(999))
+        # The home page index is kept between lookups.
+        self.assertEqual(server.requests, [('GET', '/')])
+
+        course_ids = [course.id for course in await client.fetch_course_list()]
+        self.assertEqual(course_ids, [100, 101, 102])
+        self.assertEqual(server.count('GET', '/'), 2)
+
+    @with_stand_in_async_client()
+    async def test_stand_in_get_members(self, client: AsyncClient,
+                                        server: StandInServer) -> None:
+        course = await client.fetch_course(100)
+        assert course is not None
+        members = await client.get_members(course)
+        expected = server.site.find_course(100).members
+        self.assertEqual([member.id for member in members],
+                         [member.id for member in expected])
+        self.assertEqual(members[0].get_role(), Member.Role.INSTRUCTOR)
+        self.assertEqual(members[1].get_email(), expected[1].email)
+        self.assertIs(await client.get_members(course), members)
+        self.assertEqual(server.count('GET', '/courses/100/memberships'), 1)
+
+    @with_stand_in_async_client()
+    async def test_stand_in_read_settings(self, client: AsyncClient,
+                                          server: StandInServer) -> None:
+        course = await client.fetch_course(100)
+        assert course is not None
+        assignments = await client.get_assignments(course)
+        await asyncio.gather(*(client.read_settings(assignment)
+                               for assignment in assignments))
+        expected = server.site.find_course(100).assignments
+        self.assertEqual([(assignment.get_name(), assignment.get_type())
+                          for assignment in assignments],
+                         [(assignment.name, assignment.type)
+                          for assignment in expected])
+        self.assertEqual(server.count('GET', '/courses/100/assignments'), 1)
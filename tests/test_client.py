@@ -1,9 +1,23 @@
+import gc
 import os
+import tempfile
+import threading
+from typing import Optional
 import unittest
 
-from gradescope import Client, GSInvalidRequestException
+import lxml.html
 
-from . import utils
+from gradescope import (Client, Course, GSInvalidRequestException,
+                        ParseEvent, RequestEvent, RequestScheduler,
+                        ResponseCache, Term, endpoints, xpaths)
+from gradescope.concurrency import run_concurrently
+from gradescope.response import Response, declared_encoding
+from gradescope.replay import RecordingAdapter, ReplayAdapter
+from gradescope.session_store import (FileSessionStore, SavedSession,
+                                      SessionStore)
+
+from . import fixtures, utils
+from .server import StandInAdapter, StandInServer
 
 class TestClient(unittest.TestCase):
     @utils.with_login_client
@@ -29,3 +43,301 @@ class TestClient(unittest.TestCase):
         self.assertIn(217765, course_ids, 'Missing GSAPI 101')
         self.assertIn(217765, course_ids, 'Missing GSAPI 102')
         self.assertIn(217813, course_ids, 'Missing GSAPI 103')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_fetch_course_list(self, client: Client,
+                                        server: StandInServer) -> None:
+        courses = client.fetch_course_list()
+        self.assertEqual([course.id for course in courses], [100, 101, 102])
+        self.assertEqual(courses[1].get_short_name(), 'SYN 101')
+        self.assertEqual(courses[1].get_term(),
+                         Term(Term.Season.SUMMER, 2020))
+        self.assertEqual([course.is_instructor for course in courses],
+                         [True, True, False])
+        self.assertEqual(server.requests, [('GET', '/')],
+                         'Course list and roles should come from the home '
+                         'page alone')
+
+    def test_term_course_boxes(self) -> None:
+        site = fixtures.generate_multi_term_site()
+        html = lxml.html.fromstring(fixtures.render_home(site))
+        terms = { course.id: course.term for course in site.courses }
+        listed = []
+        for term_elem in xpaths.HOME_TERMS(html):
+            term = Term.parse(xpaths.TEXT(term_elem)[0])
+            for box in xpaths.TERM_COURSE_BOXES(term_elem):
+                course_id = int(box.get('href').rsplit('/', 1)[1])
+                self.assertEqual(terms[course_id], term,
+                                 'Courses should only be listed under their '
+                                 'own term')
+                listed.append(course_id)
+        self.assertEqual(sorted(listed), sorted(terms))
+
+    @utils.with_stand_in_client()
+    def test_stand_in_course_index(self, client: Client,
+                                   server: StandInServer) -> None:
+        self.assertIsNone(client.fetch_course(10),
+                          'Course IDs should match exactly')
+        course = client.fetch_course(101)
+        assert course is not None
+        self.assertEqual(course.get_short_name(), 'SYN 101')
+        self.assertEqual([course.id for course
+                          in client.fetch_courses([102, 999, 100])],
+                         [102, 100])
+        self.assertEqual(server.requests, [('GET', '/')],
+                         'The home page should be read once')
+
+        client.fetch_course(100, force_update=True)
+        self.assertEqual(server.count('GET', '/'), 2)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_course_index_write_during_read(
+            self, client: Client, server: StandInServer) -> None:
+        generation = client._course_index.generation
+        index = client._read_course_index(force_update=True)
+        # A write that lands while the home page is being read.
+        client._course_index.invalidate()
+        client._course_index.put(index, generation)
+        self.assertIsNone(client._course_index.get(),
+                          'An index read before a write should not be kept')
+
+        client.fetch_course(100)
+        client.fetch_course(100)
+        self.assertEqual(server.count('GET', '/'), 2,
+                         'The next lookup should read the home page again')
+
+    @utils.with_stand_in_client(course_index_max_age=0)
+    def test_stand_in_course_index_expiry(self, client: Client,
+                                          server: StandInServer) -> None:
+        client.fetch_course(100)
+        client.fetch_course(100)
+        self.assertEqual(server.count('GET', '/'), 2)
+
+    def test_stand_in_login_invalid(self) -> None:
+        with StandInServer() as server:
+            with self.assertRaises(GSInvalidRequestException):
+                Client(fixtures.USERNAME, 'wrong password',
+                       adapter=server.adapter())
+
+    @utils.with_stand_in_client(cache=ResponseCache(ttl=60))
+    def test_stand_in_log_in_again_with_cache(self, client: Client,
+                                              server: StandInServer) -> None:
+        course = Course(100, client)
+        self.assertEqual(course.get_name(), 'Synthetic Course 0')
+
+        # The session expires while the login page and dashboard are fresh in
+        # the cache. Logging in again must fetch the new session's CSRF token.
+        server.expire_sessions()
+        course.set_name('Renamed')
+        self.assertEqual(server.count('GET', '/login'), 1)
+        self.assertEqual(server.count('POST', '/login'), 1)
+        self.assertEqual(server.site.find_course(100).name, 'Renamed')
+
+        # Pages cached under the old session do not bring its token back.
+        self.assertEqual(course.get_name(force_update=True), 'Renamed')
+        course.set_name('Renamed again')
+        self.assertEqual(server.site.find_course(100).name, 'Renamed again')
+        self.assertEqual(server.count('POST', '/login'), 1)
+
+        # The login page is never answered from the cache.
+        client._get(endpoints.LOGIN)
+        client._get(endpoints.LOGIN)
+        self.assertEqual(server.count('GET', '/login'), 3)
+
+    @utils.with_stand_in_client(
+            scheduler=RequestScheduler(backoff_base=0.01))
+    def test_stand_in_retry(self, client: Client,
+                            server: StandInServer) -> None:
+        server.fail_next('GET', '/courses/100', 503, count=2,
+                         headers={ 'Retry-After': '0' })
+        course = Course(100, client)
+        self.assertEqual(course.get_short_name(), 'SYN 100')
+        self.assertEqual(server.count('GET', '/courses/100'), 3)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_fetch_courses_bulk(self, client: Client,
+                                         server: StandInServer) -> None:
+        courses = list(client.fetch_courses_bulk([100, 101, 102, 999],
+                                                 roster=True))
+        self.assertEqual(sorted(course.id for course in courses),
+                         [100, 101, 102])
+        for course in courses:
+            self.assertEqual(course.get_short_name(), f'SYN {course.id}')
+            if course.id == 102:
+                # Student course; the roster is not visible.
+                self.assertIsNone(course._members)
+            else:
+                self.assertEqual(len(course.get_members()), 10)
+
+    @utils.with_stand_in_client(
+            cache=ResponseCache(),
+            scheduler=RequestScheduler(backoff_base=0.01))
+    def test_stand_in_profile(self, client: Client,
+                              server: StandInServer) -> None:
+        events = []
+        client.add_hook(events.append)
+        server.fail_next('GET', '/courses/100/memberships', 503,
+                         headers={ 'Retry-After': '0' })
+        course = Course(100, client)
+        with client.profile() as metrics:
+            course.get_members()
+            course.get_members(force=True)
+        client.remove_hook(events.append)
+
+        roster = metrics.endpoints['COURSE_MEMBERSHIP']
+        self.assertEqual(roster.requests, 2)
+        self.assertEqual(roster.retries, 1)
+        self.assertEqual(roster.statuses, { 200: 2 })
+        self.assertEqual(roster.cache, { 'miss': 1, 'hit': 1 })
+        self.assertEqual(roster.parse_time.count, 1,
+                         'A cache hit should not parse the page again')
+        self.assertEqual(roster.network_time.count, 1)
+        self.assertEqual([type(event) for event in events].count(RequestEvent),
+                         2)
+        self.assertIn('COURSE_MEMBERSHIP: 2 requests, 1 retries',
+                      metrics.report())
+        exposition = metrics.to_openmetrics()
+        self.assertIn('gradescope_requests_total{endpoint="COURSE_MEMBERSHIP",'
+                      'status="200"} 2', exposition)
+        self.assertTrue(exposition.endswith('# EOF\n'))
+
+    @utils.with_stand_in_client()
+    def test_stand_in_coalescing(self, client: Client,
+                                 server: StandInServer) -> None:
+        events = []
+        client.add_hook(events.append)
+        server.delay = 0.2
+        barrier = threading.Barrier(8)
+        def read_name() -> str:
+            barrier.wait()
+            return Course(100, client).get_name()
+        names = list(run_concurrently([read_name] * 8, max_workers=8))
+
+        self.assertEqual(names, ['Synthetic Course 0'] * 8)
+        self.assertEqual(server.count('GET', '/courses/100'), 1,
+                         'Concurrent GETs of one URL should share a request')
+        self.assertEqual(client.connection_stats.coalesced_requests, 7)
+        self.assertEqual(sum(1 for event in events
+                             if isinstance(event, ParseEvent)), 1,
+                         'The shared response should be parsed once')
+        self.assertEqual(sum(1 for event in events
+                             if isinstance(event, RequestEvent)
+                             and event.coalesced), 7)
+
+        # Later requests are sent again.
+        server.delay = 0.0
+        Course(100, client).get_name()
+        self.assertEqual(server.count('GET', '/courses/100'), 2)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_identity_map(self, client: Client,
+                                   server: StandInServer) -> None:
+        courses = client.fetch_course_list()
+        course = client.fetch_course(100)
+        self.assertIs(course, courses[0])
+        assert course is not None
+        self.assertEqual(len(course.get_members()), 10)
+        self.assertEqual(course.get_description(), 'A description for SYN 100.')
+
+        # Fresh listing data is merged into the live objects, which keep the
+        # fields the listing does not have.
+        assert server.site is not None
+        server.site.courses[0].name = 'Renamed Course'
+        server.reset_requests()
+        self.assertIs(client.fetch_course_list()[0], course)
+        self.assertEqual(course.get_name(), 'Renamed Course')
+        self.assertEqual(course.get_description(), 'A description for SYN 100.')
+        bulk = next(client.fetch_courses_bulk([100]))
+        self.assertIs(bulk, course)
+        self.assertEqual(server.requests, [('GET', '/'), ('GET', '/courses/100')])
+
+        assignment = course.get_assignment(5001)
+        self.assertIs(assignment, course.get_assignments(force_update=True)[1])
+        members = course.get_members(force=True)
+        self.assertIs(members[0], course.get_members()[0])
+
+        # Objects nobody refers to are let go.
+        del courses, course, bulk, assignment, members
+        gc.collect()
+        self.assertEqual(len(client._identities), 0)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_compression(self, client: Client,
+                                  server: StandInServer) -> None:
+        server.compress = True
+        with client.profile() as metrics:
+            members = Course(100, client).get_members()
+        self.assertEqual(len(members), 10)
+        roster = metrics.endpoints['COURSE_MEMBERSHIP']
+        self.assertLess(roster.wire_bytes, roster.bytes.sum / 2,
+                        'The roster should be sent gzipped')
+
+        # Bodies are parsed from bytes in the declared encoding.
+        page = '<html><body><p>Caf\u00e9</p></body></html>'
+        headers = { 'Content-Type': 'text/html; charset=latin-1' }
+        self.assertEqual(declared_encoding(headers), 'latin-1')
+        self.assertIsNone(declared_encoding({ 'Content-Type': 'text/html' }))
+        res = Response(200, headers, endpoints.HOME, page.encode('latin-1'),
+                       declared_encoding(headers))
+        self.assertEqual(res.html.findtext('.//p'), 'Caf\u00e9')
+
+    def test_incomplete_session_store(self) -> None:
+        class LoadOnlyStore(SessionStore):
+            def load(self, username: str) -> Optional[SavedSession]:
+                return None
+        with self.assertRaises(TypeError):
+            LoadOnlyStore() # type: ignore[abstract]
+
+    def test_stand_in_session_store(self) -> None:
+        with tempfile.TemporaryDirectory() as directory, \
+                StandInServer() as server:
+            store = FileSessionStore(os.path.join(directory, 'sessions.json'))
+            with Client.from_session_store(store, fixtures.USERNAME,
+                                           fixtures.PASSWORD,
+                                           adapter=server.adapter()):
+                pass
+            self.assertEqual(server.count('POST', '/login'), 1)
+            saved = store.load(fixtures.USERNAME)
+            assert saved is not None
+            self.assertEqual(saved.signed_token, server.signed_token)
+
+            # A second client reuses the session without logging in.
+            server.reset_requests()
+            with Client.from_session_store(store, fixtures.USERNAME,
+                                           fixtures.PASSWORD,
+                                           adapter=server.adapter()) \
+                    as client:
+                self.assertEqual(server.requests, [])
+                self.assertEqual(len(client.fetch_course_list()), 3)
+                course = Course(100, client)
+                course.set_name('Renamed')
+
+                # Once the session expires, the client logs in again and
+                # retries, with the new session's CSRF token for writes.
+                server.expire_sessions()
+                course.set_name('Renamed again')
+                self.assertEqual(course.get_name(), 'Renamed again')
+                self.assertEqual(server.count('POST', '/login'), 1)
+            saved = store.load(fixtures.USERNAME)
+            assert saved is not None
+            self.assertEqual(saved.signed_token, server.signed_token)
+
+    def test_record_and_replay(self) -> None:
+        class RecordingStandInAdapter(RecordingAdapter, StandInAdapter):
+            pass
+
+        with tempfile.TemporaryDirectory() as cassette:
+            with StandInServer() as server:
+                with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                            adapter=RecordingStandInAdapter(
+                                cassette, base_url=server.base_url)) \
+                        as client:
+                    recorded = [(course.id, course.get_name())
+                                for course in client.fetch_course_list()]
+
+            # The server is gone; only the cassette is left.
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=ReplayAdapter(cassette)) as client:
+                replayed = [(course.id, course.get_name())
+                            for course in client.fetch_course_list()]
+            self.assertEqual(replayed, recorded)
@@ -0,0 +1,94 @@
+import contextlib
+import functools
+import socket
+from typing import Any, Iterator, Tuple
+import unittest
+from unittest import mock
+
+import requests
+
+from gradescope import Client, RequestScheduler, endpoints
+from gradescope import client as client_module
+
+from . import fixtures
+from .server import StandInCountingAdapter, StandInServer
+
+@contextlib.contextmanager
+def _pooled_client(**client_kwargs: Any) \
+        -> Iterator[Tuple[Client, StandInServer]]:
+    """Yields a client that uses its own pooled, counting adapter, pointed at
+    a stand-in server, and the server.
+    """
+    with StandInServer() as server:
+        adapter_class = functools.partial(StandInCountingAdapter,
+                                          base_url=server.base_url)
+        with mock.patch.object(client_module, '_CountingAdapter',
+                               adapter_class):
+            client = Client(fixtures.USERNAME, fixtures.PASSWORD,
+                            **client_kwargs)
+        with client:
+            yield client, server
+
+class TestConnection(unittest.TestCase):
+    def test_stand_in_connection_reuse(self) -> None:
+        with _pooled_client() as (client, server):
+            client.fetch_course_list()
+            stats = client.connection_stats
+            self.assertEqual(stats.requests, len(server.requests))
+            self.assertEqual(stats.new_connections, 1,
+                             'Requests should share one pooled connection')
+            self.assertEqual(stats.reused_connections, stats.requests - 1)
+
+    def test_stand_in_no_keep_alive(self) -> None:
+        with _pooled_client(keep_alive=False) as (client, server):
+            client.fetch_course_list()
+            self.assertTrue(all(headers.get('Connection') == 'close'
+                                for headers in server.request_headers))
+            stats = client.connection_stats
+            self.assertEqual(stats.new_connections, stats.requests,
+                             'Every request should open a new connection')
+            self.assertEqual(stats.reused_connections, 0)
+
+    def test_stand_in_pool_size(self) -> None:
+        with _pooled_client(pool_connections=2, pool_maxsize=3) \
+                as (client, server):
+            adapter = client._session.get_adapter(endpoints.BASE)
+            self.assertIsInstance(adapter, StandInCountingAdapter)
+            self.assertEqual(adapter.poolmanager.connection_pool_kw['maxsize'],
+                             3)
+            self.assertEqual(len(adapter.poolmanager.pools), 1)
+            self.assertEqual(adapter.poolmanager.pools._maxsize, 2)
+
+    def test_stand_in_timeout(self) -> None:
+        with _pooled_client(timeout=0.1,
+                            scheduler=RequestScheduler(max_retries=0)) \
+                as (client, server):
+            server.delay = 0.5
+            with self.assertRaises(requests.Timeout):
+                client.fetch_course_list()
+
+    def test_refused_connection_retry(self) -> None:
+        # Find a local port with nothing listening on it.
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            url = f'http://127.0.0.1:{sock.getsockname()[1]}/'
+        scheduler = RequestScheduler(max_retries=2, backoff_base=0.001)
+        attempts = 0
+        def refused() -> requests.Response:
+            nonlocal attempts
+            attempts += 1
+            return requests.post(url, timeout=1)
+        with self.assertRaises(requests.ConnectionError):
+            scheduler.execute(url, refused, idempotent=False)
+        self.assertEqual(attempts, 3,
+                         'A refused POST was never sent, so may be retried')
+
+        attempts = 0
+        def reset() -> requests.Response:
+            nonlocal attempts
+            attempts += 1
+            raise requests.ConnectionError('Connection reset by peer')
+        with self.assertRaises(requests.ConnectionError):
+            scheduler.execute(url, reset, idempotent=False)
+        self.assertEqual(attempts, 1,
+                         'A POST may have been sent before a reset')
@@ -1,8 +1,14 @@
+import threading
+from typing import List
 import unittest
+import weakref
 
-from gradescope import Client, Course, GSNotAuthorizedException, Term
+from gradescope import (Assignment, Client, Course, GSInvalidRequestException,
+                        GSNotAuthorizedException, Member, RequestEvent,
+                        ResponseCache, RosterChange, RosterChangeResult, Term)
 
-from . import utils
+from . import fixtures, utils
+from .server import StandInServer
 
 class TestCourse(unittest.TestCase):
     @utils.with_login_client
@@ -117,3 +123,347 @@ class TestCourse(unittest.TestCase):
                       'Missing Gradescope API Test Account')
         self.assertIn(9420657, member_ids, 'Missing Test Instructor')
         self.assertIn(12197620, member_ids, 'Missing Test Student')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_dashboard(self, client: Client,
+                                server: StandInServer) -> None:
+        course = Course(100, client)
+        self.assertEqual(course.get_short_name(), 'SYN 100')
+        self.assertEqual(course.get_name(), 'Synthetic Course 0')
+        self.assertEqual(course.get_term(), Term(Term.Season.SPRING, 2020))
+        self.assertEqual(course.get_description(),
+                         'A description for SYN 100.')
+        self.assertEqual(server.count('GET', '/courses/100'), 1,
+                         'Dashboard should be read once')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_set_name(self, client: Client,
+                               server: StandInServer) -> None:
+        course = client.fetch_course(100)
+        assert course is not None
+        course.set_name('Renamed Course')
+        self.assertEqual(course.get_name(), 'Renamed Course')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_batch_edit(self, client: Client,
+                                 server: StandInServer) -> None:
+        course = client.fetch_course(100)
+        assert course is not None
+        course.get_name()
+        server.reset_requests()
+        with course.batch_edit():
+            course.set_short_name('SYN 900')
+            course.set_name('Renamed Course')
+            course.update(term=Term(Term.Season.FALL, 2021),
+                          description='New description.')
+            self.assertEqual(server.requests, [])
+        self.assertEqual(server.requests, [('POST', '/courses/100')],
+                         'Batched edits should be sent as one PATCH')
+
+        # The cached fields were updated from the submitted values.
+        self.assertEqual(course.get_short_name(), 'SYN 900')
+        self.assertEqual(course.get_term(), Term(Term.Season.FALL, 2021))
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(course.get_name(force_update=True), 'Renamed Course')
+        self.assertEqual(course.get_description(), 'New description.')
+
+        server.reset_requests()
+        with self.assertRaises(ValueError):
+            with course.batch_edit():
+                course.set_name('Discarded')
+                raise ValueError
+        self.assertEqual(server.requests, [])
+        self.assertEqual(course.get_name(), 'Renamed Course')
+
+        # Other threads share the course object but not the batch.
+        with course.batch_edit():
+            course.set_short_name('SYN 901')
+            thread = threading.Thread(target=course.set_name,
+                                      args=('Renamed Elsewhere',))
+            thread.start()
+            thread.join()
+            self.assertEqual(server.site.find_course(100).name,
+                             'Renamed Elsewhere')
+            self.assertEqual(server.site.find_course(100).short_name,
+                             'SYN 900')
+        self.assertEqual(server.site.find_course(100).short_name, 'SYN 901')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_student_attempt_update(self, client: Client,
+                                             server: StandInServer) -> None:
+        course = Course(102, client)
+        with self.assertRaises(GSNotAuthorizedException):
+            course.set_name('Renamed Course')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_role_probe(self, client: Client,
+                                 server: StandInServer) -> None:
+        course = Course(100, client)
+        self.assertTrue(course.is_instructor)
+        self.assertEqual(len(course.get_assignments()), 5)
+        self.assertEqual(server.requests, [('GET', '/courses/100/assignments')],
+                         'The role probe should also read the assignments')
+
+        self.assertFalse(Course(102, client).is_instructor)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_get_assignment(self, client: Client,
+                                     server: StandInServer) -> None:
+        course = Course(100, client)
+        for _ in range(3):
+            for assignment_id in range(5000, 5005):
+                assignment = course.get_assignment(assignment_id)
+                assert assignment is not None
+                self.assertEqual(assignment.id, assignment_id)
+        self.assertIsNone(course.get_assignment(4999))
+        self.assertEqual(server.count('GET', '/courses/100/assignments/4999/edit'), 1,
+                         'Cache miss should probe the assignment directly')
+        self.assertEqual(sum(1 for method, path in server.requests
+                             if path.endswith('/edit')), 1,
+                         'Cached assignments should not be probed')
+
+    @utils.with_stand_in_client()
+    def test_stand_in_members(self, client: Client,
+                              server: StandInServer) -> None:
+        course = Course(100, client)
+        members = course.get_members()
+        self.assertEqual(len(members), 10)
+        self.assertEqual(members[0].get_role(), Member.Role.INSTRUCTOR)
+        self.assertIsNone(members[0].get_sid())
+
+        # One refresh updates every member in place with one request.
+        server.reset_requests()
+        members[3].get_email(force=True)
+        self.assertEqual(server.requests,
+                         [('GET', '/courses/100/memberships')])
+        refreshed = course.refresh_members()
+        for old, new in zip(members, refreshed):
+            self.assertIs(old, new)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_apply_roster_changes(self, client: Client,
+                                           server: StandInServer) -> None:
+        Status = RosterChangeResult.Status
+        course = Course(100, client)
+        members = course.get_members()
+        student = next(member for member in members
+                       if member.get_role() == Member.Role.STUDENT)
+        server.reset_requests()
+        results = course.apply_roster_changes([
+            RosterChange.add('new1@example.com', 'New One'),
+            RosterChange.add('new2@example.com', 'New Two', sid='123'),
+            RosterChange.add('new3@example.com', 'New Three',
+                             role=Member.Role.TA),
+            RosterChange.remove(members[1].get_email()),
+            RosterChange.set_role(student.get_email(), Member.Role.READER),
+            RosterChange.set_role(members[0].get_email(),
+                                  Member.Role.INSTRUCTOR),
+            RosterChange.remove('nobody@example.com'),
+        ])
+        self.assertEqual([result.status for result in results],
+                         [Status.APPLIED] * 5
+                         + [Status.UNCHANGED, Status.FAILED])
+        self.assertEqual(server.count('POST', '/courses/100/memberships/many'),
+                         2, 'Adds should be sent in bulk, one per role')
+        self.assertEqual(server.count('POST', '/courses/100/memberships'), 0)
+
+        self.assertEqual(len(course.get_members()), 12)
+        self.assertNotIn(members[1], course.get_members())
+        new_member = results[2].member
+        assert new_member is not None
+        self.assertEqual(new_member.get_role(), Member.Role.TA)
+        self.assertIs(student, results[4].member)
+        self.assertEqual(student.get_role(), Member.Role.READER)
+        self.assertEqual(student.get_role(force=True), Member.Role.READER)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_apply_roster_changes_without_bulk(
+            self, client: Client, server: StandInServer) -> None:
+        server.bulk_roster = False
+        course = Course(100, client)
+        results = course.apply_roster_changes([
+            RosterChange.add('new1@example.com', 'New One'),
+            RosterChange.add('new2@example.com', 'New Two'),
+        ])
+        self.assertEqual([result.status for result in results],
+                         [RosterChangeResult.Status.APPLIED] * 2)
+        self.assertEqual(server.count('POST', '/courses/100/memberships'), 2,
+                         'Adds should fall back to one request per member')
+        self.assertEqual(len(course.get_members()), 12)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_sync_members(self, client: Client,
+                                   server: StandInServer) -> None:
+        course = Course(100, client)
+        first = course.sync_members()
+        self.assertEqual(len(first.added), 10)
+        with client.profile() as metrics:
+            self.assertFalse(course.sync_members())
+        self.assertEqual(
+                metrics.endpoints['COURSE_MEMBERSHIP'].parse_time.count, 0,
+                'An unchanged roster should not be parsed')
+
+        assert server.site is not None
+        synthetic = server.site.courses[0]
+        synthetic.members[2].name = 'Renamed Member'
+        removed = synthetic.members.pop(5)
+        synthetic.members.append(fixtures.SyntheticMember(
+                id=server.site.next_member_id(), name='New Member',
+                email='new@example.com', sid='', role=Member.Role.STUDENT,
+                canvas_connected=False))
+        result = course.sync_members()
+        self.assertEqual([member.get_email() for member in result.added],
+                         ['new@example.com'])
+        self.assertEqual([member.id for member in result.removed],
+                         [removed.id])
+        self.assertEqual([member.get_name() for member in result.changed],
+                         ['Renamed Member'])
+        self.assertIs(result.changed[0], first.added[2])
+
+    @utils.with_stand_in_client()
+    def test_stand_in_sync_assignments(self, client: Client,
+                                       server: StandInServer) -> None:
+        course = Course(100, client)
+        self.assertEqual(len(course.sync_assignments().added), 5)
+        self.assertFalse(course.sync_assignments())
+        assert server.site is not None
+        server.site.courses[0].assignments[0].name = 'Renamed Assignment'
+        result = course.sync_assignments()
+        self.assertEqual([assignment.id for assignment in result.changed],
+                         [5000])
+        self.assertEqual(result.added, [])
+        self.assertEqual(result.removed, [])
+
+    @utils.with_stand_in_client(cache=ResponseCache(ttl=60))
+    def test_stand_in_sync_with_cache(self, client: Client,
+                                      server: StandInServer) -> None:
+        course = Course(100, client)
+        self.assertEqual(len(course.sync_assignments().added), 5)
+        self.assertEqual(server.count('GET', '/courses/100/assignments'), 1,
+                         'The role probe should be reused')
+        self.assertEqual(len(course.sync_members().added), 10)
+
+        # Polls within the cache's TTL still see changes on the site.
+        assert server.site is not None
+        server.site.courses[0].assignments[0].name = 'Renamed Assignment'
+        server.site.courses[0].members[1].name = 'Renamed Member'
+        self.assertEqual([assignment.id for assignment
+                          in course.sync_assignments().changed], [5000])
+        self.assertEqual([member.get_name() for member
+                          in course.sync_members().changed],
+                         ['Renamed Member'])
+
+        # Unchanged pages are revalidated rather than downloaded again.
+        server.reset_requests()
+        self.assertFalse(course.sync_assignments())
+        self.assertFalse(course.sync_members())
+        self.assertEqual(len(server.requests), 2)
+        self.assertTrue(all('If-None-Match' in headers
+                            for headers in server.request_headers[-2:]))
+
+    @utils.with_stand_in_client(
+            lambda: fixtures.generate_site(members=500))
+    def test_stand_in_iter_members(self, client: Client,
+                                   server: StandInServer) -> None:
+        course = Course(100, client)
+        streamed = [(member.id, member.get_name(), member.get_role())
+                    for member in course.iter_members(chunk_size=1024)]
+        self.assertIsNone(course._members,
+                          'Streamed members should not be collected')
+        parsed = [(member.id, member.get_name(), member.get_role())
+                  for member in course.get_members()]
+        self.assertEqual(streamed, parsed)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_iter_members_expired_session(
+            self, client: Client, server: StandInServer) -> None:
+        course = Course(100, client)
+        server.expire_sessions()
+        self.assertEqual(len(list(course.iter_members())), 10)
+        self.assertEqual(server.count('POST', '/login'), 1)
+        self.assertEqual(server.count('GET', '/courses/100/memberships'), 2)
+
+        server.fail_next('GET', '/courses/100/memberships', 404)
+        with self.assertRaises(GSInvalidRequestException):
+            list(course.iter_members())
+
+    @utils.with_stand_in_client(
+            lambda: fixtures.generate_site(members=300))
+    def test_stand_in_fetch_roster(self, client: Client,
+                                   server: StandInServer) -> None:
+        course = Course(100, client)
+        roster = course.fetch_roster(chunk_size=1024)
+        self.assertIsNone(course._members)
+        members = course.get_members()
+        self.assertEqual(len(roster), len(members))
+        server.reset_requests()
+        for looked_up, member in zip(roster, members):
+            self.assertIs(looked_up, member)
+            self.assertEqual((looked_up.get_name(), looked_up.get_email(),
+                              looked_up.get_sid(), looked_up.get_role(),
+                              looked_up.get_canvas_connected()),
+                             (member.get_name(), member.get_email(),
+                              member.get_sid(), member.get_role(),
+                              member.get_canvas_connected()))
+        self.assertEqual(roster.count(Member.Role.INSTRUCTOR), 1)
+        self.assertIs(roster.find(members[7].id), members[7])
+        self.assertIsNone(roster.find(1))
+        self.assertEqual(server.requests, [])
+
+    def test_slots(self) -> None:
+        course = Course(100, None) # type: ignore[arg-type]
+        member = Member(1000, None, course) # type: ignore[arg-type]
+        for obj in (course, member, Assignment(5000, None, course)): # type: ignore[arg-type]
+            self.assertFalse(hasattr(obj, '__dict__'))
+            self.assertIs(weakref.ref(obj)(), obj)
+
+    @utils.with_stand_in_client()
+    def test_stand_in_hydrate_all(self, client: Client,
+                                  server: StandInServer) -> None:
+        course = Course(100, client)
+        assignments = list(course.hydrate_all())
+        self.assertEqual(len(assignments), 5)
+        server.reset_requests()
+        self.assertEqual({ assignment.get_type()
+                           for assignment in assignments },
+                         set(Assignment.Type))
+        course.get_name()
+        course.get_members()
+        self.assertEqual(server.requests, [],
+                         'Hydrated course should not make requests')
+
+    @utils.with_stand_in_client(cache=ResponseCache(ttl=60))
+    def test_stand_in_response_cache(self, client: Client,
+                                     server: StandInServer) -> None:
+        for _ in range(3):
+            client.fetch_course(100)
+        self.assertEqual(server.count('GET', '/'), 1)
+
+        course = Course(100, client)
+        course.get_name()
+        course.set_name('Renamed Course')
+        self.assertEqual(course.get_name(), 'Renamed Course',
+                         'POST should invalidate the cached dashboard')
+        fetched = client.fetch_course(100)
+        assert fetched is not None
+        self.assertEqual(fetched.get_name(), 'Renamed Course',
+                         'POST should invalidate the cached home page')
+
+    @utils.with_stand_in_client(cache=ResponseCache(ttl=0),
+                                course_index_max_age=0)
+    def test_stand_in_response_cache_revalidation(
+            self, client: Client, server: StandInServer) -> None:
+        events: List[RequestEvent] = []
+        client.add_hook(lambda event: events.append(event)
+                        if isinstance(event, RequestEvent) else None)
+        first = client.fetch_course(100)
+        second = client.fetch_course(100)
+        self.assertEqual(server.count('GET', '/'), 2,
+                         'Stale entries should be revalidated')
+        self.assertEqual([(event.status, event.cache) for event in events],
+                         [(200, 'miss'), (304, 'revalidated')],
+                         'The second GET should be answered with 304')
+        self.assertIs(second, first)
+        assert second is not None
+        self.assertEqual(second.get_short_name(), 'SYN 100',
+                         'The cached body should be used after a 304')
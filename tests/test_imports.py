@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('aiohttp', 'lxml', 'requests', 'urllib3')
+
+def _loaded_heavy_modules(code: str) -> str:
+    """Runs the code in a fresh interpreter and returns the heavy modules it
+    left imported.
+    """
+    check = (f'{code}\nimport sys\n'
+             f'print(",".join(m for m in {HEAVY_MODULES!r} '
+             'if m in sys.modules))')
+    res = subprocess.run([sys.executable, '-c', check], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return res.stdout.strip()
+
+class TestImports(unittest.TestCase):
+    def test_model_imports_are_light(self) -> None:
+        self.assertEqual(_loaded_heavy_modules(
+                'from gradescope import (Assignment, Course, Member, '
+                'RosterChange, Term)\n'
+                'Assignment.Type.EXAM, Member.Role.TA, Term.parse("Fall 2020")'),
+                '')
+
+    def test_client_import_loads_requests(self) -> None:
+        self.assertIn('requests', _loaded_heavy_modules(
+                'from gradescope import Client'))
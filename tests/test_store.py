@@ -0,0 +1,120 @@
+import os
+import tempfile
+from typing import Any
+import unittest
+
+import requests
+
+from gradescope import (Client, Course, MetadataStore, Member, RosterChange,
+                        RosterChangeResult, Term)
+
+from . import fixtures
+from .server import StandInAdapter, StandInServer
+
+class TestMetadataStore(unittest.TestCase):
+    def test_stand_in_shared_store(self) -> None:
+        with tempfile.TemporaryDirectory() as directory, \
+                StandInServer() as server:
+            path = os.path.join(directory, 'metadata.db')
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=server.adapter(),
+                        store=MetadataStore(path)) as client:
+                list(Course(100, client).hydrate_all())
+
+            # A new client, as if in another process, answers from disk.
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=server.adapter(),
+                        store=MetadataStore(path)) as client:
+                course = Course(100, client)
+                self.assertTrue(course.is_instructor)
+                server.reset_requests()
+                self.assertEqual(course.get_name(), 'Synthetic Course 0')
+                self.assertEqual(course.get_term(),
+                                 Term(Term.Season.SPRING, 2020))
+                members = course.get_members()
+                self.assertEqual(len(members), 10)
+                self.assertEqual(members[0].get_role(),
+                                 Member.Role.INSTRUCTOR)
+                self.assertIsNone(members[0].get_sid())
+                assignment = course.get_assignment(5002)
+                assert assignment is not None
+                self.assertEqual(assignment.get_name(), 'Assignment 2')
+                self.assertEqual(assignment.get_type().name, 'BUBBLE_SHEET')
+                self.assertEqual(server.requests, [])
+
+                # Forced updates still go to the site, and are written back.
+                assert server.site is not None
+                server.site.courses[0].name = 'Renamed Course'
+                self.assertEqual(course.get_name(force_update=True),
+                                 'Renamed Course')
+                self.assertEqual(server.count('GET', '/courses/100'), 1)
+                self.assertEqual(Course(100, client).get_name(),
+                                 'Renamed Course')
+
+    def test_stand_in_stale_store(self) -> None:
+        with tempfile.TemporaryDirectory() as directory, \
+                StandInServer() as server:
+            store = MetadataStore(os.path.join(directory, 'metadata.db'),
+                                  max_age=0)
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=server.adapter(), store=store) as client:
+                Course(100, client).get_members()
+                Course(100, client).get_members()
+                self.assertEqual(
+                        server.count('GET', '/courses/100/memberships'), 2,
+                        'Stale data should not be used')
+
+    def test_stand_in_failed_roster_change(self) -> None:
+        with tempfile.TemporaryDirectory() as directory, \
+                StandInServer() as server:
+            store = MetadataStore(os.path.join(directory, 'metadata.db'))
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=server.adapter(), store=store) as client:
+                course = Course(100, client)
+                member = course.get_members()[1]
+                self.assertIsNotNone(store.load_roster(100))
+                server.fail_next('POST',
+                                 f'/courses/100/memberships/{member.id}', 422)
+                results = course.apply_roster_changes(
+                        [RosterChange.remove(member.get_email())])
+                self.assertEqual(results[0].status,
+                                 RosterChangeResult.Status.FAILED)
+                self.assertIsNone(store.load_roster(100),
+                                  'A failed change should drop the stored '
+                                  'roster')
+
+    def test_stand_in_unanswered_bulk_roster_upload(self) -> None:
+        class TimingOutBulkAdapter(StandInAdapter):
+            def send(self, request: requests.PreparedRequest,
+                     **kwargs: Any) -> requests.Response:
+                if str(request.url).endswith('/memberships/many'):
+                    raise requests.ReadTimeout('The bulk upload timed out')
+                return super().send(request, **kwargs)
+
+        Status = RosterChangeResult.Status
+        with tempfile.TemporaryDirectory() as directory, \
+                StandInServer() as server:
+            store = MetadataStore(os.path.join(directory, 'metadata.db'))
+            with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                        adapter=TimingOutBulkAdapter(server.base_url),
+                        store=store) as client:
+                course = Course(100, client)
+                member = course.get_members()[1]
+                server.reset_requests()
+                results = course.apply_roster_changes([
+                    RosterChange.add('new1@example.com', 'New One'),
+                    RosterChange.add('new2@example.com', 'New Two'),
+                    RosterChange.remove(member.get_email()),
+                ])
+                self.assertEqual([result.status for result in results],
+                                 [Status.FAILED, Status.FAILED,
+                                  Status.APPLIED])
+                self.assertIn('timed out', str(results[0].error))
+                self.assertEqual(
+                        server.count('POST', '/courses/100/memberships'), 0,
+                        'An unanswered upload may have been applied, so '
+                        'members should not be added one by one')
+                self.assertEqual(server.count(
+                        'POST', f'/courses/100/memberships/{member.id}'), 1)
+                self.assertIsNone(store.load_roster(100),
+                                  'The stored roster should be dropped')
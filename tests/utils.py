@@ -1,9 +1,13 @@
+import asyncio
 import functools
 import os
-from typing import Callable, TypeVar
+from typing import Any, Awaitable, Callable, TypeVar
 import unittest
 
-from gradescope import Assignment, Client, Course
+from gradescope import Assignment, AsyncClient, Client, Course
+
+from . import fixtures
+from .server import StandInServer
 
 T = TypeVar('T', bound=unittest.TestCase)
 
@@ -48,3 +52,53 @@ def with_assignment_and_course(course_id: int, assignment_id: int) \
             func(self, client, course, assignment)
         return wrapper
     return with_assignment_and_course_decorator
+
+def with_stand_in_client(site_factory: Callable[[], fixtures.SyntheticSite]
+                                 =fixtures.generate_site,
+                         **client_kwargs: Any) \
+        -> Callable[[Callable[[T, Client, StandInServer], None]],
+                    Callable[[T], None]]:
+    """Runs the test against a local stand-in server serving a synthetic site,
+    with a client logged into it. Extra keyword arguments are passed to the
+    Client constructor.
+    """
+    def with_stand_in_client_decorator(
+            func: Callable[[T, Client, StandInServer], None]) \
+            -> Callable[[T], None]:
+        @functools.wraps(func)
+        def wrapper(self: T) -> None:
+            with StandInServer(site_factory()) as server:
+                with Client(fixtures.USERNAME, fixtures.PASSWORD,
+                            adapter=server.adapter(),
+                            **client_kwargs) as client:
+                    server.reset_requests()
+                    func(self, client, server)
+        return wrapper
+    return with_stand_in_client_decorator
+
+def with_stand_in_async_client(site_factory: Callable[[], fixtures.SyntheticSite]
+                                       =fixtures.generate_site,
+                               **client_kwargs: Any) \
+        -> Callable[[Callable[[T, AsyncClient, StandInServer], Awaitable[None]]],
+                    Callable[[T], None]]:
+    """Runs the coroutine test against a local stand-in server serving a
+    synthetic site, with an AsyncClient logged into it. Extra keyword
+    arguments are passed to the AsyncClient constructor.
+    """
+    def with_stand_in_async_client_decorator(
+            func: Callable[[T, AsyncClient, StandInServer], Awaitable[None]]) \
+            -> Callable[[T], None]:
+        @functools.wraps(func)
+        def wrapper(self: T) -> None:
+            async def run(server: StandInServer) -> None:
+                # aiohttp keeps no cookies for IP addresses, so name the host.
+                base_url = server.base_url.replace('127.0.0.1', 'localhost')
+                async with AsyncClient(fixtures.USERNAME, fixtures.PASSWORD,
+                                       base_url=base_url,
+                                       **client_kwargs) as client:
+                    server.reset_requests()
+                    await func(self, client, server)
+            with StandInServer(site_factory()) as server:
+                asyncio.run(run(server))
+        return wrapper
+    return with_stand_in_async_client_decorator